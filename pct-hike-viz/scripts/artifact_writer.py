@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Publish a JSON artifact once: atomically and to every mirror.
+
+:func:`publish_json` encodes the payload a single time as minified JSON and
+writes it through :func:`write_bytes`, so readers never see a torn file.
+Mirrors, such as ``src/hike_data.json`` and the iOS bundle copy, are
+hard-linked to the canonical file. Where a link is impossible (another
+filesystem, or no permission) they get a copy. Either way the mirror is
+swapped in with a rename, never rewritten in place.
+
+No ``.gz``/``.br`` siblings are written: GitHub Pages compresses responses
+itself and would not serve them. Siblings left by earlier versions are
+removed so that a local server cannot hand out an old payload.
+
+    python scripts/artifact_writer.py                 # republish hike_data.json minified
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = ROOT.parent
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+HIKE_DATA_MIRRORS = (
+    ROOT / "src" / "hike_data.json",
+    REPO_ROOT / "DDG-Mobile" / "DDG-Mobile" / "Resources" / "hike_data.json",
+)
+
+STALE_SIBLING_SUFFIXES = (".gz", ".br")
+
+
+@dataclass(frozen=True)
+class PublishResult:
+    path: Path
+    bytes: int
+    changed: bool
+    mirrors: Tuple[Path, ...]
+
+
+def encode_json(data, indent: Optional[int] = None) -> bytes:
+    """The one serialization every copy shares; minified unless ``indent`` is given."""
+    with route_trace.span("json_encode"):
+        if indent is None:
+            return json.dumps(data, separators=(",", ":")).encode("utf-8")
+        return json.dumps(data, indent=indent).encode("utf-8")
+
+
+def write_bytes(path, data: bytes) -> None:
+    """Write a file inside a ``write`` span that counts ``bytes_written``.
+
+    The bytes go to a temporary file beside ``path``, are fsynced, and then
+    renamed over it. Readers therefore see the old file or the new one, never
+    a torn one.
+    """
+    path = Path(path)
+    with route_trace.span("write", path=str(path)) as current:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, "wb") as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        current.count("bytes_written", len(data))
+
+
+def _unchanged(path: Path, payload: bytes) -> bool:
+    try:
+        return path.stat().st_size == len(payload) and path.read_bytes() == payload
+    except FileNotFoundError:
+        return False
+
+
+def link_or_copy(source: Path, target: Path) -> None:
+    """Make ``target`` the same bytes as ``source``, swapping it in with one rename."""
+    with route_trace.span("mirror", path=str(target)):
+        try:
+            if os.path.samefile(source, target):
+                return
+        except FileNotFoundError:
+            pass
+        tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+        tmp_path.unlink(missing_ok=True)
+        try:
+            try:
+                os.link(source, tmp_path)
+            except OSError:
+                shutil.copyfile(source, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+
+def publish_bytes(path, payload: bytes, mirrors: Sequence = ()) -> PublishResult:
+    """Write ``payload`` to ``path``, then point every mirror at it.
+
+    An unchanged canonical file is left alone. A mirror is refreshed whenever
+    it is not already the same file. Mirrors whose directory does not exist
+    are skipped.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    changed = not _unchanged(path, payload)
+    if changed:
+        write_bytes(path, payload)
+
+    for suffix in STALE_SIBLING_SUFFIXES:
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+    linked = []
+    for mirror in map(Path, mirrors):
+        if mirror.parent.is_dir():
+            link_or_copy(path, mirror)
+            linked.append(mirror)
+    return PublishResult(path, len(payload), changed, tuple(linked))
+
+
+def publish_json(path, data, mirrors: Sequence = (), indent: Optional[int] = None) -> PublishResult:
+    """Serialize ``data`` once and publish it with :func:`publish_bytes`."""
+    return publish_bytes(path, encode_json(data, indent), mirrors)
+
+
+def describe(result: PublishResult) -> str:
+    """One line per file written, for the scripts' console output."""
+    state = "wrote" if result.changed else "unchanged"
+    lines = [f"{result.path}: {result.bytes:,} bytes ({state})"]
+    lines += [f"  mirror {mirror}" for mirror in result.mirrors]
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Republish a JSON artifact minified and atomically.")
+    parser.add_argument("path", nargs="?", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--mirror", type=Path, action="append",
+                        help="mirror path (repeatable; default: the hike_data.json mirrors)")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    mirrors = args.mirror if args.mirror is not None else (HIKE_DATA_MIRRORS if args.path == HIKE_DATA_PATH else ())
+    result = publish_json(args.path, route_trace.load_json(args.path), mirrors)
+    print(describe(result))
+
+
+if __name__ == "__main__":
+    main()
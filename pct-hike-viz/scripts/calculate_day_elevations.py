@@ -1,11 +1,39 @@
 #!/usr/bin/env python3
 """Display the normalized per-day elevation contract in hike_data.json."""
 
+import argparse
 import json
 from pathlib import Path
 
 
+def audit(segments):
+    """Recompute the selected model from the canonical terrain profile and diff it per day."""
+    from elevation_metrics import Profile
+
+    metrics = Profile.from_canonical().metrics()
+    print(f"RECOMPUTED ({metrics.window_m:g} m window, {metrics.threshold_ft:g} ft threshold) vs EMBEDDED")
+    print("=" * 80)
+    mismatches = 0
+    for segment, day in zip(segments, metrics.days):
+        pairs = {
+            "gain": (day.gain_ft, segment["gain"]),
+            "loss": (day.loss_ft, segment["loss"]),
+            "high": (day.high_ft, segment["highPoint"]),
+            "low": (day.low_ft, segment.get("lowPoint", day.low_ft)),
+        }
+        diffs = {name: ours - theirs for name, (ours, theirs) in pairs.items() if ours != theirs}
+        mismatches += bool(diffs)
+        detail = ", ".join(f"{name} {delta:+d}" for name, delta in diffs.items()) or "matches"
+        print(f"Day {day.day}: +{day.gain_ft} / -{day.loss_ft} ft, high {day.high_ft} ft ({detail})")
+    print(f"Total: +{metrics.total_gain_ft} / -{metrics.total_loss_ft} ft; {mismatches} day(s) differ")
+
+
 def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--audit", action="store_true",
+                        help="recompute per-day metrics from the canonical terrain profile and compare")
+    args = parser.parse_args()
+
     data_path = Path(__file__).parent.parent / "public" / "data" / "hike_data.json"
     with data_path.open(encoding="utf-8") as source:
         data = json.load(source)
@@ -41,6 +69,10 @@ def main():
         f"-{properties.get('total_loss_feet', 0):.0f} ft"
     )
 
+    if args.audit:
+        print()
+        audit(segments)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Offline elevation sampling from local DEM tiles.
+
+Supported tile formats, all opened lazily and memory-mapped where possible:
+
+* ``.npy`` arrays with a ``<stem>.json`` sidecar giving ``west``, ``north``,
+  ``dx``, ``dy`` (degrees per pixel), optional ``nodata`` and ``units``;
+* ESRI ``.bil`` rasters with their ``.hdr`` file (USGS GridFloat/BIL);
+* GeoTIFF. Uncompressed, single-band, stripped files are parsed here and
+  memory-mapped. Anything else (e.g. LZW tiles) is decoded with the optional
+  ``tifffile`` package.
+
+:class:`DemSampler` keeps an LRU cache of opened tiles and samples whole
+coordinate arrays with vectorized bilinear interpolation. Results are meters,
+so ``[lon, lat, ele_m]`` rows feed straight into ``update_elevation.points_to_path``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import mmap
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import FEET_PER_METER, as_coords
+
+TILE_SUFFIXES = (".npy", ".bil", ".tif", ".tiff")
+
+
+class DemFormatError(ValueError):
+    """Raised when a tile cannot be read as a single-band DEM."""
+
+
+@dataclass(frozen=True)
+class TileGrid:
+    """Georeferencing for a north-up raster; ``west``/``north`` are outer pixel edges."""
+
+    west: float
+    north: float
+    dx: float
+    dy: float
+    width: int
+    height: int
+    nodata: Optional[float] = None
+    meters_per_unit: float = 1.0
+
+    @property
+    def east(self) -> float:
+        return self.west + self.width * self.dx
+
+    @property
+    def south(self) -> float:
+        return self.north - self.height * self.dy
+
+    def contains(self, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        return (lons >= self.west) & (lons <= self.east) & (lats >= self.south) & (lats <= self.north)
+
+    def sample(self, array: np.ndarray, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """Bilinearly interpolate ``array`` at each point, in meters.
+
+        Pixel values sit at pixel centers; points in the outer half pixel are
+        clamped to the edge. Any nodata corner makes the result NaN.
+        """
+        col = np.clip((lons - self.west) / self.dx - 0.5, 0.0, self.width - 1)
+        row = np.clip((self.north - lats) / self.dy - 0.5, 0.0, self.height - 1)
+        c0 = np.minimum(col.astype(np.intp), max(self.width - 2, 0))
+        r0 = np.minimum(row.astype(np.intp), max(self.height - 2, 0))
+        c1 = np.minimum(c0 + 1, self.width - 1)
+        r1 = np.minimum(r0 + 1, self.height - 1)
+        fc = col - c0
+        fr = row - r0
+        corners = [np.asarray(array[r, c], dtype=np.float64) for r, c in ((r0, c0), (r0, c1), (r1, c0), (r1, c1))]
+        if self.nodata is not None:
+            for values in corners:
+                values[values == self.nodata] = np.nan
+        top = corners[0] + (corners[1] - corners[0]) * fc
+        bottom = corners[2] + (corners[3] - corners[2]) * fc
+        return (top + (bottom - top) * fr) * self.meters_per_unit
+
+
+@dataclass(frozen=True)
+class TileSource:
+    path: Path
+    grid: TileGrid
+    load: Callable[[], np.ndarray]
+
+
+def _units_to_meters(units: str) -> float:
+    units = units.lower()
+    if units in ("m", "meter", "meters", "metre", "metres"):
+        return 1.0
+    if units in ("ft", "foot", "feet"):
+        return 1.0 / FEET_PER_METER
+    raise DemFormatError(f"Unknown elevation units {units!r}")
+
+
+def read_npy_source(path: Path) -> TileSource:
+    meta_path = path.with_suffix(".json")
+    if not meta_path.exists():
+        raise DemFormatError(f"{path} needs a {meta_path.name} georeferencing sidecar")
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    array = np.load(path, mmap_mode="r")
+    if array.ndim != 2:
+        raise DemFormatError(f"{path} is not a 2-D raster")
+    grid = TileGrid(
+        float(meta["west"]), float(meta["north"]), float(meta["dx"]), float(meta["dy"]),
+        array.shape[1], array.shape[0], meta.get("nodata"), _units_to_meters(meta.get("units", "m")),
+    )
+    return TileSource(path, grid, lambda: np.load(path, mmap_mode="r"))
+
+
+BIL_TYPES = {("SIGNEDINT", 16): "i2", ("SIGNEDINT", 32): "i4", ("UNSIGNEDINT", 16): "u2",
+             ("UNSIGNEDINT", 8): "u1", ("FLOAT", 32): "f4", ("FLOAT", 64): "f8"}
+
+
+def read_bil_source(path: Path) -> TileSource:
+    header_path = path.with_suffix(".hdr")
+    if not header_path.exists():
+        raise DemFormatError(f"{path} has no {header_path.name}")
+    header: Dict[str, str] = {}
+    for line in header_path.read_text(encoding="ascii").splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            header[parts[0].upper()] = parts[1]
+    if int(header.get("NBANDS", 1)) != 1:
+        raise DemFormatError(f"{path} has more than one band")
+    width, height = int(header["NCOLS"]), int(header["NROWS"])
+    bits = int(header.get("NBITS", 32 if header.get("PIXELTYPE", "").upper() == "FLOAT" else 16))
+    kind = header.get("PIXELTYPE", "FLOAT" if bits == 32 else "SIGNEDINT").upper()
+    if (kind, bits) not in BIL_TYPES:
+        raise DemFormatError(f"{path}: unsupported pixel type {kind}/{bits}")
+    order = ">" if header.get("BYTEORDER", "I").upper() in ("M", "MSBFIRST") else "<"
+    dtype = np.dtype(order + BIL_TYPES[(kind, bits)])
+    dx, dy = float(header["XDIM"]), float(header["YDIM"])
+    # ULXMAP/ULYMAP locate the center of the upper-left pixel.
+    grid = TileGrid(
+        float(header["ULXMAP"]) - dx / 2, float(header["ULYMAP"]) + dy / 2, dx, dy, width, height,
+        float(header["NODATA"]) if "NODATA" in header else None,
+    )
+    return TileSource(path, grid, lambda: np.memmap(path, dtype=dtype, mode="r", shape=(height, width)))
+
+
+# -- GeoTIFF ------------------------------------------------------------------
+
+TIFF_TYPES = {1: "B", 2: "s", 3: "H", 4: "I", 6: "b", 8: "h", 9: "i", 11: "f", 12: "d", 16: "Q"}
+TAG_WIDTH, TAG_HEIGHT, TAG_BITS, TAG_COMPRESSION = 256, 257, 258, 259
+TAG_STRIP_OFFSETS, TAG_SAMPLES, TAG_ROWS_PER_STRIP, TAG_STRIP_COUNTS = 273, 277, 278, 279
+TAG_SAMPLE_FORMAT, TAG_TILE_WIDTH = 339, 322
+TAG_PIXEL_SCALE, TAG_TIEPOINT, TAG_GEOKEYS, TAG_NODATA = 33550, 33922, 34735, 42113
+GEOKEY_RASTER_TYPE, RASTER_PIXEL_IS_POINT = 1025, 2
+SAMPLE_FORMATS = {1: "u", 2: "i", 3: "f"}
+
+
+def _tiff_tags(buffer: bytes) -> Tuple[str, Dict[int, tuple]]:
+    order = {b"II": "<", b"MM": ">"}.get(bytes(buffer[:2]))
+    if order is None:
+        raise DemFormatError("not a TIFF file")
+    magic = struct.unpack_from(order + "H", buffer, 2)[0]
+    if magic == 42:
+        offset = struct.unpack_from(order + "I", buffer, 4)[0]
+        count_fmt, entry_fmt, inline = "H", "HHI", 4
+    elif magic == 43:
+        offset = struct.unpack_from(order + "Q", buffer, 8)[0]
+        count_fmt, entry_fmt, inline = "Q", "HHQ", 8
+    else:
+        raise DemFormatError("not a TIFF file")
+    (count,) = struct.unpack_from(order + count_fmt, buffer, offset)
+    position = offset + struct.calcsize(count_fmt)
+    entry_size = struct.calcsize(order + entry_fmt) + inline
+    tags: Dict[int, tuple] = {}
+    for _ in range(count):
+        tag, kind, n = struct.unpack_from(order + entry_fmt, buffer, position)
+        code = TIFF_TYPES.get(kind)
+        value_at = position + entry_size - inline
+        position += entry_size
+        if code is None:
+            continue
+        size = struct.calcsize(code) * n
+        if size > inline:
+            value_at = struct.unpack_from(order + ("I" if inline == 4 else "Q"), buffer, value_at)[0]
+        if code == "s":
+            tags[tag] = (bytes(buffer[value_at:value_at + n]).rstrip(b"\0").decode("ascii"),)
+        else:
+            tags[tag] = struct.unpack_from(f"{order}{n}{code}", buffer, value_at)
+    return order, tags
+
+
+def read_geotiff_source(path: Path) -> TileSource:
+    with open(path, "rb") as handle:
+        buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        order, tags = _tiff_tags(buffer)
+    finally:
+        buffer.close()
+    if TAG_PIXEL_SCALE not in tags or TAG_TIEPOINT not in tags:
+        raise DemFormatError(f"{path} has no GeoTIFF pixel scale/tiepoint")
+    if tags.get(TAG_SAMPLES, (1,))[0] != 1:
+        raise DemFormatError(f"{path} has more than one band")
+    width, height = tags[TAG_WIDTH][0], tags[TAG_HEIGHT][0]
+    dx, dy = tags[TAG_PIXEL_SCALE][:2]
+    i, j, _, x, y, _ = tags[TAG_TIEPOINT][:6]
+    west, north = x - i * dx, y + j * dy
+    geokeys = tags.get(TAG_GEOKEYS, ())
+    for index in range(4, len(geokeys) - 3, 4):
+        if geokeys[index] == GEOKEY_RASTER_TYPE and geokeys[index + 3] == RASTER_PIXEL_IS_POINT:
+            west, north = west - dx / 2, north + dy / 2
+    nodata = float(tags[TAG_NODATA][0]) if TAG_NODATA in tags else None
+    grid = TileGrid(west, north, dx, dy, width, height, nodata)
+
+    bits = tags.get(TAG_BITS, (8,))[0]
+    dtype = np.dtype(f"{order}{SAMPLE_FORMATS.get(tags.get(TAG_SAMPLE_FORMAT, (1,))[0], 'u')}{bits // 8}")
+    offsets = tags.get(TAG_STRIP_OFFSETS, ())
+    counts = tags.get(TAG_STRIP_COUNTS, ())
+    contiguous = (
+        tags.get(TAG_COMPRESSION, (1,))[0] == 1
+        and TAG_TILE_WIDTH not in tags
+        and len(offsets) == len(counts) > 0
+        and all(offsets[k] + counts[k] == offsets[k + 1] for k in range(len(offsets) - 1))
+        and sum(counts) == width * height * dtype.itemsize
+    )
+    if contiguous:
+        start = offsets[0]
+        return TileSource(path, grid, lambda: np.memmap(path, dtype=dtype, mode="r", offset=start, shape=(height, width)))
+    return TileSource(path, grid, lambda: _decode_with_tifffile(path))
+
+
+def _decode_with_tifffile(path: Path) -> np.ndarray:
+    try:
+        import tifffile
+    except ImportError as exc:
+        raise DemFormatError(
+            f"{path} is compressed or tiled; install tifffile to decode it, or convert it to .npy/.bil"
+        ) from exc
+    array = tifffile.imread(path)
+    return array if array.ndim == 2 else array[..., 0]
+
+
+READERS = {".npy": read_npy_source, ".bil": read_bil_source, ".tif": read_geotiff_source, ".tiff": read_geotiff_source}
+
+
+def read_tile_source(path: Path) -> TileSource:
+    path = Path(path)
+    reader = READERS.get(path.suffix.lower())
+    if reader is None:
+        raise DemFormatError(f"Unsupported DEM tile {path}")
+    return reader(path)
+
+
+def find_tiles(paths: Iterable[Path]) -> List[Path]:
+    """Expand directories to the DEM tiles they contain, in sorted order."""
+    found: List[Path] = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in TILE_SUFFIXES))
+        else:
+            found.append(path)
+    return found
+
+
+class DemSampler:
+    """Sample elevations in meters from a set of DEM tiles."""
+
+    def __init__(self, sources: Sequence[TileSource], cache_size: int = 4) -> None:
+        self.sources = list(sources)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Path, np.ndarray]" = OrderedDict()
+        self.loads = 0
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[Path], cache_size: int = 4) -> "DemSampler":
+        return cls([read_tile_source(path) for path in find_tiles(paths)], cache_size)
+
+    def array(self, source: TileSource) -> np.ndarray:
+        """Return the tile's raster, opening or decoding it at most once while cached."""
+        cached = self._cache.get(source.path)
+        if cached is not None:
+            self._cache.move_to_end(source.path)
+            return cached
+        array = source.load()
+        self.loads += 1
+        self._cache[source.path] = array
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return array
+
+    def sample(self, lons, lats) -> np.ndarray:
+        """Return meters at each point; NaN where no tile has data.
+
+        Where tiles overlap the first listed tile with data wins.
+        """
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        result = np.full(lons.shape, np.nan)
+        for source in self.sources:
+            todo = np.isnan(result)
+            if not todo.any():
+                break
+            inside = todo & source.grid.contains(lons, lats)
+            if inside.any():
+                result[inside] = source.grid.sample(self.array(source), lons[inside], lats[inside])
+        return result
+
+    def profile(self, coords) -> np.ndarray:
+        """Return ``[lon, lat, ele_m]`` rows for ``[lon, lat, ...]`` input rows."""
+        coords = as_coords(coords)
+        return np.column_stack((coords[:, 0], coords[:, 1], self.sample(coords[:, 0], coords[:, 1])))
+
+
+def reprofile_path(path: Sequence[Sequence[float]], ele_ft: np.ndarray) -> List[list]:
+    """Return ``route.path`` rows with column 2 replaced by ``ele_ft``.
+
+    Longitude, latitude, ``routeMile`` and any further columns are kept as
+    they are. Vertices the tiles do not cover (NaN) keep their elevation.
+    """
+    rows = []
+    for row, ele in zip(path, np.round(ele_ft, 1).tolist()):
+        row = list(row)
+        if ele == ele:
+            row[2:3] = [ele]
+        rows.append(row)
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    import artifact_writer
+    from route_binary import load_route_columns
+    import route_trace
+
+    parser = argparse.ArgumentParser(description="Re-profile route.path from local DEM tiles.")
+    parser.add_argument("tiles", nargs="+", type=Path, help="DEM tiles or directories of tiles")
+    parser.add_argument("--hike-data", type=Path, default=artifact_writer.HIKE_DATA_PATH)
+    parser.add_argument("--cache-size", type=int, default=4, help="tiles kept open at once")
+    parser.add_argument("--write", action="store_true",
+                        help="write the DEM elevations into route.path, keeping routeMile, and republish")
+    args = parser.parse_args(argv)
+
+    route = load_route_columns(args.hike_data)
+    started = time.perf_counter()
+    sampler = DemSampler.from_paths(args.tiles, args.cache_size)
+    ele_ft = sampler.sample(route.lon, route.lat) * FEET_PER_METER
+    seconds = time.perf_counter() - started
+
+    covered = ~np.isnan(ele_ft)
+    print(
+        f"Sampled {len(route):,} vertices from {len(sampler.sources)} tile(s) in {seconds * 1000:.1f} ms "
+        f"({int(covered.sum()):,} covered, {sampler.loads} tile load(s))."
+    )
+    diff = ele_ft[covered] - np.asarray(route.ele_ft)[covered]
+    diff = diff[~np.isnan(diff)]
+    if diff.size:
+        print(f"DEM - route.path: mean {diff.mean():+.1f} ft, mean |diff| {np.abs(diff).mean():.1f} ft, "
+              f"max |diff| {np.abs(diff).max():.1f} ft")
+    if not args.write:
+        return
+
+    data = route_trace.load_json(args.hike_data)
+    path = reprofile_path(data["route"]["path"], ele_ft)
+    data["route"]["path"] = path
+    eles = [row[2] for row in path if len(row) > 2]
+    if eles:
+        properties = data["route"].setdefault("properties", {})
+        properties["min_elevation"] = min(eles)
+        properties["max_elevation"] = max(eles)
+    mirrors = artifact_writer.HIKE_DATA_MIRRORS if args.hike_data.resolve() == artifact_writer.HIKE_DATA_PATH else ()
+    print(artifact_writer.describe(artifact_writer.publish_json(args.hike_data, data, mirrors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""Per-day distance, gain/loss and high/low metrics for the itinerary.
+
+Python port of the elevation accumulation model that
+``scripts/build_canonical_terrain.mjs`` bakes into ``total_gain_feet``:
+
+1. sample the profile every 25 m, with every day boundary inserted as an
+   exact sample, so export point density cannot change totals;
+2. smooth with a centered moving mean over a fixed distance window
+   (prefix sums, window bounds from ``searchsorted``);
+3. count gain/loss with one continuous hysteresis threshold carried across
+   day boundaries, attributing each counted change to the day it falls in.
+
+:func:`sweep` evaluates many ``(window, threshold)`` pairs, smoothing each
+window once and spreading windows over a process pool.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import FEET_PER_METER, METERS_PER_MILE, as_coords, cumulative_stations, nearest_vertex
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = ROOT.parent
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+CANONICAL_TERRAIN_PATH = REPO_ROOT / "docs" / "data" / "canonical" / "burney-ash-terrain-2026.json"
+
+RESAMPLE_INTERVAL_M = 25.0
+SELECTED_MODEL = (200.0, 20.0)
+SENSITIVITY_GRID = ((100, 10), (150, 10), (200, 10), (300, 10), (150, 20), (200, 20))
+
+
+@dataclass(frozen=True)
+class DayMetrics:
+    day: int
+    distance_mi: float
+    start_ft: int
+    end_ft: int
+    high_ft: int
+    low_ft: int
+    gain_ft: int
+    loss_ft: int
+
+
+@dataclass(frozen=True)
+class RouteMetrics:
+    window_m: float
+    threshold_ft: float
+    min_ft: int
+    max_ft: int
+    days: Tuple[DayMetrics, ...]
+
+    @property
+    def total_gain_ft(self) -> int:
+        return sum(day.gain_ft for day in self.days)
+
+    @property
+    def total_loss_ft(self) -> int:
+        return sum(day.loss_ft for day in self.days)
+
+
+def round_half_up(value: float) -> int:
+    """Round like JavaScript's ``Math.round`` so totals match the Node build exactly."""
+    return int(np.floor(value + 0.5))
+
+
+def smooth(stations_m: np.ndarray, elevations: np.ndarray, window_m: float) -> np.ndarray:
+    """Centered moving mean of every sample within ``window_m / 2`` meters."""
+    radius = window_m / 2.0
+    prefix = np.concatenate(([0.0], np.cumsum(elevations)))
+    lower = np.searchsorted(stations_m, stations_m - radius, side="left")
+    upper = np.searchsorted(stations_m, stations_m + radius, side="right")
+    return (prefix[upper] - prefix[lower]) / (upper - lower)
+
+
+def hysteresis_changes(elevations: np.ndarray, threshold: float, start: int = 0, stop: Optional[int] = None):
+    """Return ``(indices, changes)`` for every move of at least ``threshold``.
+
+    The reference level only moves when a change is counted, so oscillations
+    smaller than the threshold never accumulate. The scan is inherently
+    sequential; it runs over a plain list, which is much faster than
+    indexing NumPy scalars one at a time.
+    """
+    stop = len(elevations) - 1 if stop is None else stop
+    values = elevations[start:stop + 1].tolist()
+    indices: List[int] = []
+    changes: List[float] = []
+    last = values[0]
+    for index, value in enumerate(values[1:], start=start + 1):
+        change = value - last
+        if change >= threshold or -change >= threshold:
+            indices.append(index)
+            changes.append(change)
+            last = value
+    return np.asarray(indices, dtype=np.intp), np.asarray(changes, dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class Profile:
+    """A sampled elevation profile (feet) with the sample index of every day stop."""
+
+    stations_m: np.ndarray
+    elevations_ft: np.ndarray
+    boundaries: np.ndarray
+    route_miles: Optional[np.ndarray] = None
+    first_day: int = 1
+
+    @classmethod
+    def resampled(
+        cls,
+        stations_m,
+        elevations_ft,
+        stop_stations_m,
+        interval_m: float = RESAMPLE_INTERVAL_M,
+        first_day: int = 1,
+    ) -> "Profile":
+        """Sample every ``interval_m`` plus the final station and each stop station."""
+        stations_m = np.asarray(stations_m, dtype=np.float64)
+        stop_stations_m = np.clip(np.asarray(stop_stations_m, dtype=np.float64), stations_m[0], stations_m[-1])
+        grid = np.unique(np.concatenate((
+            np.arange(stations_m[0], stations_m[-1], interval_m), [stations_m[-1]], stop_stations_m,
+        )))
+        elevations = np.interp(grid, stations_m, np.asarray(elevations_ft, dtype=np.float64))
+        return cls(grid, elevations, np.searchsorted(grid, stop_stations_m), first_day=first_day)
+
+    @classmethod
+    def from_canonical(cls, path: Path = CANONICAL_TERRAIN_PATH) -> "Profile":
+        """Load the 25 m USGS profile and exact day boundaries of the canonical terrain contract."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        points = data["points"]
+        boundaries = sorted(
+            (point["boundaryDay"], index) for index, point in enumerate(points) if point.get("boundaryDay") is not None
+        )
+        return cls(
+            np.array([point["stationMeters"] for point in points], dtype=np.float64),
+            np.array([point["usgsElevationFeet"] for point in points], dtype=np.float64),
+            np.array([index for _, index in boundaries], dtype=np.intp),
+            np.array([point["routeMile"] for point in points], dtype=np.float64),
+            first_day=boundaries[0][0] + 1,
+        )
+
+    @classmethod
+    def from_gpx(cls, source: Path, hike_data: Path = HIKE_DATA_PATH) -> "Profile":
+        """Profile a GPX export between the express itinerary's first and last stops."""
+        from gpx_stream import read_gpx
+
+        data = json.loads(Path(hike_data).read_text(encoding="utf-8"))
+        stops = sorted(
+            (
+                feature for feature in data["features"]
+                if feature["properties"].get("itinerary") == "express"
+                and isinstance(feature["properties"].get("day"), int)
+                and feature["properties"]["day"] >= 0
+            ),
+            key=lambda feature: feature["properties"]["day"],
+        )
+        gpx, _ = read_gpx(source)
+        coords = as_coords(gpx.coords[~np.isnan(gpx.coords[:, 2])])
+        start, _ = nearest_vertex(coords, *stops[0]["geometry"]["coordinates"][:2])
+        finish, _ = nearest_vertex(coords, *stops[-1]["geometry"]["coordinates"][:2])
+        coords = coords[start:finish + 1]
+        stations = cumulative_stations(coords[:, 0], coords[:, 1])
+        stop_stations = [stations[nearest_vertex(coords, *stop["geometry"]["coordinates"][:2])[0]] for stop in stops]
+        return cls.resampled(
+            stations, coords[:, 2] * FEET_PER_METER, stop_stations, first_day=stops[0]["properties"]["day"] + 1
+        )
+
+    def smoothed(self, window_m: float) -> np.ndarray:
+        return smooth(self.stations_m, self.elevations_ft, window_m)
+
+    def metrics(self, window_m: float = SELECTED_MODEL[0], threshold_ft: float = SELECTED_MODEL[1],
+                smoothed: Optional[np.ndarray] = None) -> RouteMetrics:
+        """Evaluate one model; pass ``smoothed`` to reuse a window across thresholds."""
+        smoothed = self.smoothed(window_m) if smoothed is None else smoothed
+        starts, ends = self.boundaries[:-1], self.boundaries[1:]
+        indices, changes = hysteresis_changes(smoothed, threshold_ft, int(starts[0]), int(ends[-1]))
+        # A counted sample belongs to the first day whose end index reaches it.
+        day_of = np.minimum(np.searchsorted(ends, indices, side="left"), len(ends) - 1)
+        gains = np.bincount(day_of, weights=np.maximum(changes, 0.0), minlength=len(ends))
+        losses = np.bincount(day_of, weights=np.maximum(-changes, 0.0), minlength=len(ends))
+        days = []
+        for day, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+            if self.route_miles is not None:
+                distance = self.route_miles[end] - self.route_miles[start]
+            else:
+                distance = (self.stations_m[end] - self.stations_m[start]) / METERS_PER_MILE
+            segment = smoothed[start:end + 1]
+            days.append(DayMetrics(
+                day=self.first_day + day,
+                distance_mi=round(float(distance), 3),
+                start_ft=round_half_up(float(smoothed[start])),
+                end_ft=round_half_up(float(smoothed[end])),
+                high_ft=round_half_up(float(segment.max())),
+                low_ft=round_half_up(float(segment.min())),
+                gain_ft=round_half_up(float(gains[day])),
+                loss_ft=round_half_up(float(losses[day])),
+            ))
+        return RouteMetrics(
+            float(window_m), float(threshold_ft), round_half_up(float(smoothed.min())), round_half_up(float(smoothed.max())),
+            tuple(days),
+        )
+
+
+def _evaluate_window(args) -> List[RouteMetrics]:
+    profile, window_m, thresholds = args
+    smoothed = profile.smoothed(window_m)
+    return [profile.metrics(window_m, threshold, smoothed) for threshold in thresholds]
+
+
+def sweep(profile: Profile, pairs: Iterable[Tuple[float, float]] = SENSITIVITY_GRID, jobs: int = 1) -> List[RouteMetrics]:
+    """Evaluate every ``(window_m, threshold_ft)`` pair, returned in input order.
+
+    Each distinct window is smoothed once; windows are spread over ``jobs``
+    processes.
+    """
+    pairs = [(float(window), float(threshold)) for window, threshold in pairs]
+    by_window: Dict[float, List[float]] = defaultdict(list)
+    for window, threshold in pairs:
+        if threshold not in by_window[window]:
+            by_window[window].append(threshold)
+    tasks = [(profile, window, thresholds) for window, thresholds in by_window.items()]
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            batches = list(executor.map(_evaluate_window, tasks, chunksize=max(1, len(tasks) // (jobs * 4))))
+    else:
+        batches = [_evaluate_window(task) for task in tasks]
+    found = {(metrics.window_m, metrics.threshold_ft): metrics for batch in batches for metrics in batch}
+    return [found[pair] for pair in pairs]
+
+
+def parse_range(text: str) -> List[float]:
+    """Parse ``start:stop:step`` (inclusive) or a comma-separated list."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        return np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+    return [float(part) for part in text.split(",")]
+
+
+def model_grid(windows: Optional[Sequence[float]], thresholds: Optional[Sequence[float]]) -> List[Tuple[float, float]]:
+    """Return the requested grid (or the published sensitivity grid), always including the selected model."""
+    if windows or thresholds:
+        pairs = [(w, t) for w in windows or [SELECTED_MODEL[0]] for t in thresholds or [SELECTED_MODEL[1]]]
+    else:
+        pairs = [(float(w), float(t)) for w, t in SENSITIVITY_GRID]
+    if SELECTED_MODEL not in pairs:
+        pairs.append(SELECTED_MODEL)
+    return pairs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Recompute per-day elevation metrics and sweep model parameters.")
+    parser.add_argument("--canonical", type=Path, default=CANONICAL_TERRAIN_PATH,
+                        help="canonical terrain contract (default source)")
+    parser.add_argument("--gpx", type=Path, help="profile a GPX export instead, cropped to the express itinerary")
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH, help="day stops for --gpx")
+    parser.add_argument("--windows", type=parse_range, help="smoothing windows in m, e.g. 50:400:25")
+    parser.add_argument("--thresholds", type=parse_range, help="hysteresis thresholds in ft, e.g. 5:40:5")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="processes for the sweep")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    profile = Profile.from_gpx(args.gpx, args.hike_data) if args.gpx else Profile.from_canonical(args.canonical)
+    pairs = model_grid(args.windows, args.thresholds)
+    results = sweep(profile, pairs, jobs=args.jobs)
+    selected = results[pairs.index(SELECTED_MODEL)]
+
+    if args.json:
+        print(json.dumps({
+            "selected": {**asdict(selected), "total_gain_ft": selected.total_gain_ft,
+                         "total_loss_ft": selected.total_loss_ft},
+            "sensitivity": [
+                {"window_m": m.window_m, "threshold_ft": m.threshold_ft,
+                 "total_gain_ft": m.total_gain_ft, "total_loss_ft": m.total_loss_ft}
+                for m in results
+            ],
+        }, indent=2))
+        return
+
+    print(f"Selected model: {selected.window_m:g} m window, {selected.threshold_ft:g} ft threshold")
+    print(f"{'Day':>3} {'Miles':>7} {'Start':>6} {'End':>6} {'High':>6} {'Low':>6} {'Gain':>6} {'Loss':>6}")
+    for day in selected.days:
+        print(f"{day.day:>3} {day.distance_mi:>7.3f} {day.start_ft:>6} {day.end_ft:>6} {day.high_ft:>6} "
+              f"{day.low_ft:>6} {day.gain_ft:>+6} {-day.loss_ft:>6}")
+    print(f"Total: +{selected.total_gain_ft} / -{selected.total_loss_ft} ft")
+    print(f"\nSweep over {len(results)} model(s):")
+    for metrics in results:
+        print(f"  {metrics.window_m:>6g} m  {metrics.threshold_ft:>5g} ft  "
+              f"+{metrics.total_gain_ft} / -{metrics.total_loss_ft} ft")
+
+
+if __name__ == "__main__":
+    main()
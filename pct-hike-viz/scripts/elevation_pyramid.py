@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""Min/max/mean elevation pyramid for drawing the route profile.
+
+The profile is the piecewise-linear elevation of ``route.path`` against
+station. Level 0 cuts it into equal ``base_m`` buckets. Each bucket stores
+the exact minimum, maximum and distance-weighted mean of the line over its
+span. Extremes of a polyline sit at a vertex or at a span end, so each
+bucket looks at its own vertices plus the line interpolated at both edges.
+Every higher level merges pairs of buckets from the level below, up to one
+bucket for the whole route.
+
+Drawing a vertical min-max bar per pixel (as in M4 downsampling) from a
+level with about one bucket per pixel gives the same envelope as drawing
+every vertex. :meth:`ElevationPyramid.window` picks that level for a
+station range and slices it, so cost scales with the pixels drawn, not the
+route length. The profile chart does not load it yet, so the output goes to
+``.route-build/`` rather than ``public/``, where the PWA would precache it.
+
+    python scripts/elevation_pyramid.py              # writes .route-build/hike_data.profile.json
+    python scripts/elevation_pyramid.py --base 10
+"""
+from __future__ import annotations
+
+import argparse
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from geodesy import METERS_PER_MILE, as_coords, locate_stations, path_stations
+import artifact_writer
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+PYRAMID_PATH = ROOT / ".route-build" / "hike_data.profile.json"
+
+BASE_BUCKET_M = 25.0
+
+
+@dataclass(frozen=True)
+class PyramidLevel:
+    bucket_m: float
+    min_ft: np.ndarray
+    max_ft: np.ndarray
+    mean_ft: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.min_ft)
+
+
+@dataclass(frozen=True)
+class ProfileWindow:
+    """Buckets of one level covering a station range; ``starts_m[i]`` opens bucket ``i``."""
+
+    level: int
+    bucket_m: float
+    starts_m: np.ndarray
+    min_ft: np.ndarray
+    max_ft: np.ndarray
+    mean_ft: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.starts_m)
+
+
+def base_buckets(stations_m, elevations_ft, base_m: float = BASE_BUCKET_M) -> Tuple[PyramidLevel, np.ndarray]:
+    """Exact per-bucket min, max and mean of the profile polyline on a ``base_m`` grid.
+
+    Returns the level and the route meters each bucket covers.
+    ``stations_m`` must be non-decreasing. The last bucket is clipped to the
+    final station, so its mean covers only the route it contains.
+    """
+    stations = np.asarray(stations_m, dtype=np.float64)
+    z = np.asarray(elevations_ft, dtype=np.float64)
+    if len(stations) != len(z):
+        raise ValueError("stations_m and elevations_ft must have the same length")
+    if len(stations) < 2:
+        raise ValueError("a profile needs at least two points")
+    if base_m <= 0:
+        raise ValueError("base_m must be positive")
+    origin, end = stations[0], stations[-1]
+    count = max(1, math.ceil((end - origin) / base_m))
+    edges = np.minimum(origin + np.arange(count + 1) * base_m, end)
+    edges[-1] = end
+
+    # Running trapezoid integral at every vertex, then at each edge.
+    lengths = np.diff(stations)
+    integral = np.concatenate(([0.0], np.cumsum(lengths * (z[:-1] + z[1:]) / 2)))
+    segment, fraction = locate_stations(stations, edges)
+    z_edges = z[segment] + (z[segment + 1] - z[segment]) * fraction
+    into = fraction * lengths[segment]
+    integral_edges = integral[segment] + into * (z[segment] + z_edges) / 2
+
+    # A vertex on an edge belongs to the bucket it opens; the final vertex to the last bucket.
+    bucket = np.minimum(((stations - origin) // base_m).astype(np.intp), count - 1)
+    low = np.minimum(z_edges[:-1], z_edges[1:])
+    high = np.maximum(z_edges[:-1], z_edges[1:])
+    np.minimum.at(low, bucket, z)
+    np.maximum.at(high, bucket, z)
+
+    widths = np.diff(edges)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(widths > 0, np.diff(integral_edges) / widths, (low + high) / 2)
+    return PyramidLevel(float(base_m), low, high, mean), widths
+
+
+def _merge(level: PyramidLevel, widths: np.ndarray) -> Tuple[PyramidLevel, np.ndarray]:
+    """Pair up adjacent buckets; an odd last bucket is carried up alone."""
+    n = len(level)
+    pairs = n // 2
+    low = np.minimum(level.min_ft[0:2 * pairs:2], level.min_ft[1:2 * pairs:2])
+    high = np.maximum(level.max_ft[0:2 * pairs:2], level.max_ft[1:2 * pairs:2])
+    weighted = level.mean_ft * widths
+    area = weighted[0:2 * pairs:2] + weighted[1:2 * pairs:2]
+    merged_widths = widths[0:2 * pairs:2] + widths[1:2 * pairs:2]
+    if n % 2:
+        low = np.append(low, level.min_ft[-1])
+        high = np.append(high, level.max_ft[-1])
+        area = np.append(area, weighted[-1])
+        merged_widths = np.append(merged_widths, widths[-1])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(merged_widths > 0, area / merged_widths, (low + high) / 2)
+    return PyramidLevel(level.bucket_m * 2, low, high, mean), merged_widths
+
+
+class ElevationPyramid:
+    """Every level from ``base_m`` buckets up to a single bucket, anchored at ``origin_m``."""
+
+    def __init__(self, origin_m: float, end_m: float, levels: List[PyramidLevel]) -> None:
+        if not levels:
+            raise ValueError("a pyramid needs at least one level")
+        self.origin_m = float(origin_m)
+        self.end_m = float(end_m)
+        self.levels = levels
+
+    @classmethod
+    def build(cls, stations_m, elevations_ft, base_m: float = BASE_BUCKET_M) -> "ElevationPyramid":
+        level, widths = base_buckets(stations_m, elevations_ft, base_m)
+        levels = [level]
+        while len(level) > 1:
+            level, widths = _merge(level, widths)
+            levels.append(level)
+        return cls(float(stations_m[0]), float(stations_m[-1]), levels)
+
+    @classmethod
+    def from_path(cls, path, base_m: float = BASE_BUCKET_M) -> "ElevationPyramid":
+        """Build from ``[lon, lat, ele_ft, routeMile?]`` rows, skipping rows without elevation."""
+        rows = [row for row in path if len(row) > 2]
+        coords = as_coords(rows)
+        return cls.build(path_stations(coords), coords[:, 2], base_m)
+
+    @property
+    def base_m(self) -> float:
+        return self.levels[0].bucket_m
+
+    def level_for(self, start_m: float, end_m: float, width_px: int) -> int:
+        """Finest level that spends at most one bucket per pixel on ``start_m``..``end_m``."""
+        if width_px < 1:
+            raise ValueError("width_px must be at least 1")
+        span = max(float(end_m) - float(start_m), 0.0)
+        if span <= self.base_m * width_px:
+            return 0
+        return min(math.ceil(math.log2(span / (self.base_m * width_px))), len(self.levels) - 1)
+
+    def window(self, start_m: float, end_m: float, width_px: int) -> ProfileWindow:
+        """Buckets overlapping ``start_m``..``end_m`` at the level :meth:`level_for` picks.
+
+        The arrays are views into the level, so this is O(buckets returned).
+        """
+        index = self.level_for(start_m, end_m, width_px)
+        level = self.levels[index]
+        last = len(level) - 1
+        first = min(max(int((float(start_m) - self.origin_m) // level.bucket_m), 0), last)
+        stop = min(max(math.ceil((float(end_m) - self.origin_m) / level.bucket_m), first + 1), last + 1)
+        return ProfileWindow(
+            index,
+            level.bucket_m,
+            self.origin_m + np.arange(first, stop) * level.bucket_m,
+            level.min_ft[first:stop],
+            level.max_ft[first:stop],
+            level.mean_ft[first:stop],
+        )
+
+    def to_payload(self) -> dict:
+        """JSON form; stations in route miles to match the profile axis."""
+        return {
+            "originMile": round(self.origin_m / METERS_PER_MILE, 6),
+            "endMile": round(self.end_m / METERS_PER_MILE, 6),
+            "baseBucketMeters": self.base_m,
+            "levels": [
+                {
+                    "bucketMeters": level.bucket_m,
+                    "minFeet": np.round(level.min_ft, 1).tolist(),
+                    "maxFeet": np.round(level.max_ft, 1).tolist(),
+                    "meanFeet": np.round(level.mean_ft, 1).tolist(),
+                }
+                for level in self.levels
+            ],
+        }
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "ElevationPyramid":
+        levels = [
+            PyramidLevel(
+                float(level["bucketMeters"]),
+                np.asarray(level["minFeet"], dtype=np.float64),
+                np.asarray(level["maxFeet"], dtype=np.float64),
+                np.asarray(level["meanFeet"], dtype=np.float64),
+            )
+            for level in payload["levels"]
+        ]
+        return cls(payload["originMile"] * METERS_PER_MILE, payload["endMile"] * METERS_PER_MILE, levels)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the min/max/mean elevation pyramid for route.path.")
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--output", type=Path, default=PYRAMID_PATH)
+    parser.add_argument("--base", type=float, default=BASE_BUCKET_M, help="level-0 bucket width in meters")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    data = route_trace.load_json(args.hike_data)
+    with route_trace.span("pyramid") as span:
+        pyramid = ElevationPyramid.from_path(data["route"]["path"], args.base)
+        span.count("points", len(data["route"]["path"]))
+    artifact_writer.publish_json(args.output, pyramid.to_payload())
+
+    print(f"{len(data['route']['path']):,} route points -> {len(pyramid.levels)} levels")
+    print(f"{'level':>5} {'bucket m':>10} {'buckets':>8}")
+    for index, level in enumerate(pyramid.levels):
+        print(f"{index:>5} {level.bucket_m:>10g} {len(level):>8,}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
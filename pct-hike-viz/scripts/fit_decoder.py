@@ -0,0 +1,237 @@
+"""Pure-Python decoder for Garmin FIT course files.
+
+Only the pieces the route tooling needs are interpreted: ``record`` messages
+(track points) and ``course_point`` messages (named turns, water, camps). Every
+definition message is compiled once into a :class:`struct.Struct`, and data
+messages are unpacked straight out of a ``memoryview`` over the file bytes, so
+no per-record slices are copied.
+
+Reference: Garmin FIT SDK "Flexible and Interoperable Data Transfer" protocol.
+"""
+from __future__ import annotations
+
+import os
+import struct
+import time
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from gpx_stream import IngestStats
+
+MESG_RECORD = 20
+MESG_COURSE = 31
+MESG_COURSE_POINT = 32
+RAW_FIELD = -1
+
+SEMICIRCLES_TO_DEGREES = 180.0 / 2**31
+
+# base type byte -> (struct code, byte size, invalid value)
+BASE_TYPES: Dict[int, Tuple[str, int, Optional[int]]] = {
+    0x00: ("B", 1, 0xFF),  # enum
+    0x01: ("b", 1, 0x7F),  # sint8
+    0x02: ("B", 1, 0xFF),  # uint8
+    0x83: ("h", 2, 0x7FFF),  # sint16
+    0x84: ("H", 2, 0xFFFF),  # uint16
+    0x85: ("i", 4, 0x7FFFFFFF),  # sint32
+    0x86: ("I", 4, 0xFFFFFFFF),  # uint32
+    0x88: ("f", 4, None),  # float32
+    0x89: ("d", 8, None),  # float64
+    0x0A: ("B", 1, 0x00),  # uint8z
+    0x8B: ("H", 2, 0x0000),  # uint16z
+    0x8C: ("I", 4, 0x00000000),  # uint32z
+    0x8E: ("q", 8, 0x7FFFFFFFFFFFFFFF),  # sint64
+    0x8F: ("Q", 8, 0xFFFFFFFFFFFFFFFF),  # uint64
+    0x90: ("Q", 8, 0x0000000000000000),  # uint64z
+}
+
+# record: field number -> name
+RECORD_FIELDS = {0: "lat", 1: "lon", 2: "altitude", 5: "distance", 78: "enhanced_altitude"}
+# course_point: field number -> name
+COURSE_POINT_FIELDS = {2: "lat", 3: "lon", 4: "distance", 5: "type", 6: "name"}
+
+
+def _crc_table() -> Tuple[int, ...]:
+    # FIT uses CRC-16/ARC (reflected polynomial 0xA001); one lookup per byte.
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _crc_table()
+
+
+class FitDecodeError(ValueError):
+    """Raised when a file is not a well-formed FIT stream."""
+
+
+def fit_crc(data: bytes | memoryview, crc: int = 0) -> int:
+    """Return the FIT CRC-16 of ``data``."""
+    table = _CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+@dataclass
+class _Definition:
+    global_num: int
+    unpacker: struct.Struct
+    size: int
+    # (field number, tuple slot, invalid value); the invalid value is None for floats, RAW_FIELD for bytes
+    fields: List[Tuple[int, int, Optional[int]]]
+
+
+@dataclass
+class FitCourse:
+    """Decoded course geometry.
+
+    ``coords`` rows are ``[lon, lat, ele_m]`` (NaN where a record had no
+    altitude) and ``distance_m`` is the device-reported distance per record.
+    """
+
+    name: str = ""
+    coords: np.ndarray = field(default_factory=lambda: np.empty((0, 3)))
+    distance_m: np.ndarray = field(default_factory=lambda: np.empty(0))
+    course_points: List[dict] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+
+def _compile_definition(view: memoryview, offset: int, has_dev: bool) -> Tuple[_Definition, int]:
+    architecture = view[offset + 1]
+    endian = ">" if architecture == 1 else "<"
+    global_num = struct.unpack_from(endian + "H", view, offset + 2)[0]
+    field_count = view[offset + 4]
+    offset += 5
+
+    codes = [endian]
+    fields: List[Tuple[int, int, Optional[int]]] = []
+    size = 0
+    for slot in range(field_count):
+        number, field_size, base_type = view[offset], view[offset + 1], view[offset + 2]
+        offset += 3
+        code, base_size, invalid = BASE_TYPES.get(base_type, ("s", 1, None))
+        if code == "s" or field_size != base_size:
+            # Strings, byte blobs and arrays are kept raw; callers decode what they need.
+            codes.append(f"{field_size}s")
+            fields.append((number, slot, RAW_FIELD))
+        else:
+            codes.append(code)
+            fields.append((number, slot, invalid))
+        size += field_size
+
+    if has_dev:
+        dev_count = view[offset]
+        offset += 1
+        dev_size = sum(view[offset + 3 * i + 1] for i in range(dev_count))
+        offset += 3 * dev_count
+        if dev_size:
+            codes.append(f"{dev_size}x")
+            size += dev_size
+
+    return _Definition(global_num, struct.Struct("".join(codes)), size, fields), offset
+
+
+def _field_values(definition: _Definition, values: tuple, wanted: Dict[int, str]) -> Dict[str, object]:
+    decoded: Dict[str, object] = {}
+    for number, slot, invalid in definition.fields:
+        name = wanted.get(number)
+        if name is None:
+            continue
+        value = values[slot]
+        if invalid == RAW_FIELD:
+            if isinstance(value, bytes):
+                value = value.split(b"\0", 1)[0].decode("utf-8", "replace")
+        elif value == invalid:
+            continue
+        decoded[name] = value
+    return decoded
+
+
+def decode_fit(source: Union[str, os.PathLike, bytes], check_crc: bool = True) -> Tuple[FitCourse, IngestStats]:
+    """Decode ``record`` and ``course_point`` messages from a FIT file."""
+    started = time.perf_counter()
+    data = Path(source).read_bytes() if isinstance(source, (str, os.PathLike)) else source
+    view = memoryview(data)
+    if len(view) < 12:
+        raise FitDecodeError("File too short for a FIT header")
+    header_size = view[0]
+    data_size = struct.unpack_from("<I", view, 4)[0]
+    if bytes(view[8:12]) != b".FIT":
+        raise FitDecodeError("Missing .FIT signature")
+    end = header_size + data_size
+    if end + 2 > len(view):
+        raise FitDecodeError("FIT data size exceeds file length")
+    if check_crc and fit_crc(view[: end + 2]) != 0:
+        raise FitDecodeError("FIT file CRC mismatch")
+
+    definitions: Dict[int, _Definition] = {}
+    lons, lats, eles, dists = array("d"), array("d"), array("d"), array("d")
+    course_points: List[dict] = []
+    course_name = ""
+    offset = header_size
+
+    while offset < end:
+        header = view[offset]
+        offset += 1
+        if header & 0x80:
+            local = (header >> 5) & 0x3
+        elif header & 0x40:
+            definition, offset = _compile_definition(view, offset, bool(header & 0x20))
+            definitions[header & 0x0F] = definition
+            continue
+        else:
+            local = header & 0x0F
+
+        definition = definitions.get(local)
+        if definition is None:
+            raise FitDecodeError(f"Data message for undefined local type {local} at byte {offset - 1}")
+        if definition.global_num == MESG_RECORD:
+            values = _field_values(definition, definition.unpacker.unpack_from(view, offset), RECORD_FIELDS)
+            if "lat" in values and "lon" in values:
+                lons.append(values["lon"] * SEMICIRCLES_TO_DEGREES)
+                lats.append(values["lat"] * SEMICIRCLES_TO_DEGREES)
+                altitude = values.get("enhanced_altitude", values.get("altitude"))
+                eles.append(altitude / 5.0 - 500.0 if altitude is not None else np.nan)
+                distance = values.get("distance")
+                dists.append(distance / 100.0 if distance is not None else np.nan)
+        elif definition.global_num == MESG_COURSE_POINT:
+            values = _field_values(definition, definition.unpacker.unpack_from(view, offset), COURSE_POINT_FIELDS)
+            if "lat" in values and "lon" in values:
+                course_points.append({
+                    "name": values.get("name", ""),
+                    "type": values.get("type"),
+                    "coordinates": [
+                        values["lon"] * SEMICIRCLES_TO_DEGREES,
+                        values["lat"] * SEMICIRCLES_TO_DEGREES,
+                    ],
+                    "distance_m": values["distance"] / 100.0 if "distance" in values else None,
+                })
+        elif definition.global_num == MESG_COURSE and not course_name:
+            course_name = _field_values(
+                definition, definition.unpacker.unpack_from(view, offset), {5: "name"}
+            ).get("name", "")
+        offset += definition.size
+
+    coords = np.column_stack((
+        np.frombuffer(lons, dtype=np.float64),
+        np.frombuffer(lats, dtype=np.float64),
+        np.frombuffer(eles, dtype=np.float64),
+    )) if lons else np.empty((0, 3), dtype=np.float64)
+    course = FitCourse(
+        name=course_name,
+        coords=coords,
+        distance_m=np.frombuffer(dists, dtype=np.float64).copy(),
+        course_points=course_points,
+    )
+    stats = IngestStats(points=len(coords), bytes_read=len(view), seconds=time.perf_counter() - started)
+    return course, stats
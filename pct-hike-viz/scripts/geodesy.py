@@ -0,0 +1,133 @@
+"""Array-at-a-time geodesy shared by the Python route scripts.
+
+Every helper accepts scalars or NumPy arrays and broadcasts like a ufunc, so a
+whole ``route.path`` can be measured without a Python-level loop.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6_371_000.0
+METERS_PER_MILE = 1609.34
+FEET_PER_METER = 3.28084
+METERS_PER_DEG_LAT = 111_132.92  # WGS84 meridional radius approx
+
+
+def as_coords(path: Sequence[Sequence[float]] | np.ndarray) -> np.ndarray:
+    """Return ``path`` as a 2-D float64 array of ``[lon, lat, ...]`` rows."""
+    coords = np.asarray(path, dtype=np.float64)
+    if coords.ndim != 2 or coords.shape[1] < 2:
+        raise ValueError("Expected an (n, 2+) array of [lon, lat, ...] rows")
+    return coords
+
+
+def haversine(lon1, lat1, lon2, lat2):
+    """Great-circle distance in meters between two points or point arrays."""
+    lon1, lat1, lon2, lat2 = (np.radians(value) for value in (lon1, lat1, lon2, lat2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def segment_lengths(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Return the ``n - 1`` haversine lengths between consecutive vertices."""
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    return haversine(lons[:-1], lats[:-1], lons[1:], lats[1:])
+
+
+def cumulative_stations(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Return the distance in meters from the first vertex to every vertex."""
+    lengths = segment_lengths(lons, lats)
+    stations = np.empty(lengths.size + 1, dtype=np.float64)
+    stations[0] = 0.0
+    np.cumsum(lengths, out=stations[1:])
+    return stations
+
+
+def path_stations(coords: np.ndarray) -> np.ndarray:
+    """Stations in meters for ``[lon, lat, ele?, routeMile?]`` rows.
+
+    Rows that carry a routeMile keep it, so stations line up with the mile
+    axis the UI draws; otherwise they are measured along the path.
+    """
+    if coords.shape[1] > 3:
+        return coords[:, 3] * METERS_PER_MILE
+    return cumulative_stations(coords[:, 0], coords[:, 1])
+
+
+def bearings(lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+    """Return the initial bearing (degrees clockwise from north) of each segment."""
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    dlon = lon[1:] - lon[:-1]
+    y = np.sin(dlon) * np.cos(lat[1:])
+    x = np.cos(lat[:-1]) * np.sin(lat[1:]) - np.sin(lat[:-1]) * np.cos(lat[1:]) * np.cos(dlon)
+    return np.degrees(np.arctan2(y, x)) % 360.0
+
+
+def locate_stations(stations: np.ndarray, targets) -> Tuple[np.ndarray, np.ndarray]:
+    """Return ``(segment, fraction)`` arrays placing each target station on the path.
+
+    ``stations`` must be non-decreasing. Targets are clamped to the path ends,
+    so every result satisfies ``0 <= fraction <= 1``. Cost is
+    ``O(len(targets) * log(len(stations)))`` via one ``searchsorted`` call.
+    """
+    stations = np.asarray(stations, dtype=np.float64)
+    targets = np.clip(np.asarray(targets, dtype=np.float64), stations[0], stations[-1])
+    segment = np.clip(np.searchsorted(stations, targets, side="left") - 1, 0, len(stations) - 2)
+    start = stations[segment]
+    span = stations[segment + 1] - start
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(span > 0, (targets - start) / span, 0.0)
+    return segment, np.clip(fraction, 0.0, 1.0)
+
+
+def points_at_stations(values: np.ndarray, stations: np.ndarray, targets) -> np.ndarray:
+    """Linearly interpolate the rows of ``values`` at each target station."""
+    values = np.asarray(values, dtype=np.float64)
+    segment, fraction = locate_stations(stations, targets)
+    if values.ndim > 1:
+        fraction = fraction[:, None]
+    return values[segment] + (values[segment + 1] - values[segment]) * fraction
+
+
+def nearest_vertex(coords: np.ndarray, lon: float, lat: float) -> Tuple[int, float]:
+    """Return ``(index, meters)`` of the vertex closest to ``lon``/``lat``."""
+    distances = haversine(lon, lat, coords[:, 0], coords[:, 1])
+    index = int(np.argmin(distances))
+    return index, float(distances[index])
+
+
+@dataclass(frozen=True)
+class LocalProjection:
+    """Equirectangular lon/lat <-> planar meters around a fixed origin."""
+
+    lon0: float
+    lat0: float
+
+    @classmethod
+    def from_path(cls, path: Sequence[Sequence[float]] | np.ndarray) -> "LocalProjection":
+        coords = as_coords(path)
+        return cls(float(coords[:, 0].mean()), float(coords[:, 1].mean()))
+
+    @property
+    def meters_per_deg_lon(self) -> float:
+        return METERS_PER_DEG_LAT * float(np.cos(np.radians(self.lat0)))
+
+    def to_xy(self, lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+        x = (np.asarray(lon, dtype=np.float64) - self.lon0) * self.meters_per_deg_lon
+        y = (np.asarray(lat, dtype=np.float64) - self.lat0) * METERS_PER_DEG_LAT
+        return x, y
+
+    def to_lonlat(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        lon = np.asarray(x, dtype=np.float64) / self.meters_per_deg_lon + self.lon0
+        lat = np.asarray(y, dtype=np.float64) / METERS_PER_DEG_LAT + self.lat0
+        return lon, lat
+
+    def project(self, coords: np.ndarray) -> np.ndarray:
+        """Return an ``(n, 2)`` array of planar meters for ``[lon, lat, ...]`` rows."""
+        x, y = self.to_xy(coords[:, 0], coords[:, 1])
+        return np.column_stack((x, y))
@@ -0,0 +1,160 @@
+"""Incremental GPX reader with bounded memory.
+
+``ET.parse`` materialises the whole document tree before a single point can be
+read, so a season archive costs several times its file size in RAM. This reader
+walks the document with ``iterparse``, drops every ``<trkpt>``/``<rtept>`` as
+soon as it has been copied into a preallocated float64 buffer, and hands out
+fixed-size chunks. Peak memory is one chunk plus the current XML element,
+independent of file size.
+"""
+from __future__ import annotations
+
+import os
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import IO, Iterator, List, Tuple, Union
+
+import numpy as np
+
+POINT_TAGS = {"trkpt", "rtept"}
+PART_TAGS = {"trkseg", "rte"}
+DEFAULT_CHUNK_POINTS = 65_536
+
+Source = Union[str, os.PathLike, IO[bytes]]
+
+
+@dataclass(frozen=True)
+class GpxPart:
+    """One ``<trkseg>`` or ``<rte>`` block as a ``[start, stop)`` row range."""
+
+    kind: str
+    name: str
+    start: int
+    stop: int
+
+
+@dataclass
+class GpxPoints:
+    """Columnar GPX content: ``coords`` rows are ``[lon, lat, ele_m]``.
+
+    Missing elevations are stored as NaN so the array stays rectangular.
+    """
+
+    coords: np.ndarray
+    parts: List[GpxPart] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+
+@dataclass
+class IngestStats:
+    points: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        return self.points / self.seconds if self.seconds > 0 else float("inf")
+
+    def summary(self) -> str:
+        return (
+            f"{self.points:,} points from {self.bytes_read / 1e6:.1f} MB in "
+            f"{self.seconds:.2f}s ({self.points_per_second:,.0f} pts/s)"
+        )
+
+
+def _local_name(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def iter_gpx_chunks(
+    source: Source,
+    chunk_points: int = DEFAULT_CHUNK_POINTS,
+    parts: List[GpxPart] | None = None,
+) -> Iterator[np.ndarray]:
+    """Yield ``(k, 3)`` float64 views of ``[lon, lat, ele_m]`` rows.
+
+    Every yielded view aliases one reused buffer, so callers must copy (or
+    consume) a chunk before advancing the iterator. When ``parts`` is given it
+    is filled with one :class:`GpxPart` per ``<trkseg>``/``<rte>`` block,
+    numbered in document order.
+    """
+    buffer = np.empty((chunk_points, 3), dtype=np.float64)
+    filled = 0
+    total = 0
+    stack: List[ET.Element] = []
+    part_kind = ""
+    part_name = ""
+    part_start = 0
+    track_name = ""
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            name = _local_name(elem.tag)
+            if name in PART_TAGS:
+                part_kind = "rte" if name == "rte" else "trk"
+                part_name = track_name
+                part_start = total
+            elif name == "trk":
+                track_name = ""
+            continue
+
+        stack.pop()
+        name = _local_name(elem.tag)
+        if name in POINT_TAGS:
+            lat = elem.get("lat")
+            lon = elem.get("lon")
+            if lat is not None and lon is not None:
+                ele = np.nan
+                for child in elem:
+                    if _local_name(child.tag) == "ele" and child.text:
+                        ele = float(child.text)
+                        break
+                buffer[filled, 0] = float(lon)
+                buffer[filled, 1] = float(lat)
+                buffer[filled, 2] = ele
+                filled += 1
+                total += 1
+                if filled == chunk_points:
+                    yield buffer
+                    filled = 0
+            # Detach the finished point from its parent so the tree never grows.
+            if stack:
+                del stack[-1][:]
+        elif name == "name" and stack:
+            parent = _local_name(stack[-1].tag)
+            if parent == "trk":
+                track_name = (elem.text or "").strip()
+            elif parent == "rte":
+                part_name = (elem.text or "").strip()
+        elif name in PART_TAGS:
+            if parts is not None and total > part_start:
+                parts.append(GpxPart(part_kind, part_name, part_start, total))
+            if stack:
+                del stack[-1][:]
+        elif name in {"trk", "wpt", "metadata"} and stack:
+            del stack[-1][:]
+
+    if filled:
+        yield buffer[:filled]
+
+
+def read_gpx(
+    source: Source, chunk_points: int = DEFAULT_CHUNK_POINTS
+) -> Tuple[GpxPoints, IngestStats]:
+    """Read every track and route point of ``source`` into one array."""
+    stats = IngestStats()
+    if isinstance(source, (str, os.PathLike)):
+        stats.bytes_read = os.path.getsize(source)
+    parts: List[GpxPart] = []
+    chunks = []
+    started = time.perf_counter()
+    for chunk in iter_gpx_chunks(source, chunk_points, parts):
+        chunks.append(chunk.copy())
+    coords = np.concatenate(chunks) if chunks else np.empty((0, 3), dtype=np.float64)
+    stats.seconds = time.perf_counter() - started
+    stats.points = len(coords)
+    return GpxPoints(coords, parts), stats
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""One entry point for the route tools, cheap to start and able to chain.
+
+    python hike_cli.py stats
+    python hike_cli.py water 1420 1472.5 --since 2026-07-01
+    python hike_cli.py --trace ingest + snap-water + day-split --days 8 9 + stats
+
+Each subcommand is the ``main(argv)`` of an existing script, imported only
+when it runs, so ``--help`` and the quick SQLite queries never import NumPy.
+Commands separated by ``+`` run in order in one process and share the parsed
+route data through :mod:`route_data`, which reloads a file only after a
+command has rewritten it. ``<command> --help`` shows that command's options.
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import importlib.util
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+REPO_SCRIPTS_DIR = ROOT.parent / "scripts"
+CHAIN = "+"
+
+
+class Command(NamedTuple):
+    module: str
+    prefix: Tuple[str, ...]
+    help: str
+    path: Optional[Path] = None
+
+
+COMMANDS = {
+    "ingest": Command("water_reports", ("ingest",), "apply pctwater.com CSVs to the water history"),
+    "water": Command("water_reports", ("query",), "water sources between two miles from the history"),
+    "snap": Command("snap_camps_to_route", (), "snap day-stop camps onto the route and republish"),
+    "snap-water": Command("parse_water_csv", (), "snap water report sources onto the PCTA centerline"),
+    "stats": Command("validate_stats", (), "distance and elevation checks for hike_data.json"),
+    "validate-elevations": Command("validate_elevations_usgs", (), "compare route elevations with USGS EPQS",
+                                   REPO_SCRIPTS_DIR / "validate_elevations_usgs.py"),
+    "day-split": Command("itinerary_solver", (), "split the route into N days of balanced effort"),
+    "day6-gap": Command("find_correct_day6_camp", (), "historical six-day narrative diagnostic"),
+    "replace-route": Command("update_elevation", (), "overwrite route.path with a GPX or FIT track (guarded)",
+                             ROOT / "update_elevation.py"),
+}
+
+
+def load(command: Command):
+    """Import the module behind ``command`` on first use."""
+    if command.path is None:
+        return importlib.import_module(command.module)
+    module = sys.modules.get(command.module)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(command.module, command.path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[command.module] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+def split_chain(argv: Sequence[str]) -> List[List[str]]:
+    """``a x + b y`` -> ``[[a, x], [b, y]]``; empty segments are dropped."""
+    segments: List[List[str]] = [[]]
+    for arg in argv:
+        if arg == CHAIN:
+            segments.append([])
+        else:
+            segments[-1].append(arg)
+    return [segment for segment in segments if segment]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    width = max(map(len, COMMANDS))
+    parser = argparse.ArgumentParser(
+        prog="hike_cli.py",
+        description=__doc__.splitlines()[0],
+        epilog="commands:\n" + "\n".join(f"  {name:<{width}}  {command.help}" for name, command in COMMANDS.items())
+        + f"\n\nchain commands with a lone '{CHAIN}'; '<command> --help' lists its options",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--trace", nargs="?", const="1", metavar="DIR",
+                        help="write one JSON stage trace covering every command (same as ROUTE_TRACE=DIR)")
+    parser.add_argument("--profile", action="store_true", help="with --trace, dump cProfile stats per stage")
+    parser.add_argument("command", metavar="command", choices=COMMANDS, help="see below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = build_parser()
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    chain = split_chain([args.command, *args.args])
+    for segment in chain:
+        if segment[0] not in COMMANDS:
+            parser.error(f"unknown command {segment[0]!r} after '{CHAIN}' (choose from {', '.join(COMMANDS)})")
+    if args.trace:
+        import route_trace
+
+        route_trace.configure(args)
+    for name, *rest in chain:
+        command = COMMANDS[name]
+        load(command).main([*command.prefix, *rest])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Split the route into N days of balanced effort at candidate camp stations.
+
+A day's effort is its miles, plus ``gain_weight`` miles per 1,000 ft
+climbed and ``loss_weight`` miles per 1,000 ft descended. Gain and loss come
+from the itinerary's own model, one continuous hysteresis accumulator over
+the smoothed profile (see :mod:`elevation_metrics`). A candidate split
+point is a camp or water source on the route, or optionally a regular mile
+grid. Its station is inserted as an exact profile sample, and prefix sums
+of miles, gain and loss at the candidates make any day's effort an O(1)
+difference.
+
+For a fixed number of days N, the total effort is fixed. Minimizing the
+squared spread around the mean daily effort is therefore the same as
+minimizing the sum of squared daily efforts. That cost satisfies the
+quadrangle inequality, so the best split for each day layer is monotone in
+the end station. Each layer is filled by divide and conquer over that
+monotone split, with every recursion level evaluated as one batch of array
+operations. That is O(N K log K) for K candidates. The DP returns the best
+plan for every day count up to N at once, and :class:`ItinerarySolver`
+keeps its layers, so asking what one more day looks like costs a single
+further layer.
+
+    python scripts/itinerary_solver.py --days 9
+    python scripts/itinerary_solver.py --days 8 9 10 --max-day-miles 9 --every 0.25
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from elevation_metrics import (
+    CANONICAL_TERRAIN_PATH,
+    HIKE_DATA_PATH,
+    SELECTED_MODEL,
+    Profile,
+    hysteresis_changes,
+)
+from geodesy import METERS_PER_MILE
+import route_data
+import route_trace
+
+# Naismith: an hour per 3 miles plus an hour per 2,000 ft of ascent.
+GAIN_MILES_PER_1000FT = 1.5
+LOSS_MILES_PER_1000FT = 0.0
+# Effort added per mile a day runs over --max-day-miles; large enough to dominate any imbalance.
+OVERRUN_PENALTY = 1e6
+
+
+@dataclass(frozen=True)
+class Candidate:
+    route_mile: float
+    label: str
+    kind: str
+
+
+@dataclass(frozen=True)
+class DayPlan:
+    day: int
+    start: Candidate
+    end: Candidate
+    miles: float
+    gain_ft: float
+    loss_ft: float
+    effort: float
+
+
+@dataclass(frozen=True)
+class Itinerary:
+    days: Tuple[DayPlan, ...]
+    mean_effort: float
+    spread: float
+    feasible: bool
+
+    @property
+    def max_deviation(self) -> float:
+        return max(abs(day.effort - self.mean_effort) for day in self.days)
+
+
+def route_candidates(data: dict, every_mi: Optional[float] = None, route_miles: float = 0.0) -> List[Candidate]:
+    """Camps, trailheads and water sources with a ``routeMile``, plus an optional mile grid."""
+    candidates = []
+    for feature in data.get("features", []):
+        properties = feature.get("properties") or {}
+        if (feature.get("geometry") or {}).get("type") == "Point" and properties.get("routeMile") is not None:
+            kind = str(properties.get("type", "waypoint")).lower()
+            candidates.append(Candidate(properties["routeMile"], properties.get("name", kind), kind))
+    for source in data.get("waterSources", []):
+        if source.get("routeMile") is not None:
+            candidates.append(Candidate(source["routeMile"], source.get("name", "water"), "water"))
+    if every_mi:
+        for mile in np.arange(every_mi, route_miles, every_mi).tolist():
+            candidates.append(Candidate(mile, f"mile {mile:.2f}", "grid"))
+    return candidates
+
+
+def _layer(prev: np.ndarray, effort: np.ndarray, miles: np.ndarray, lo_j: int, max_day_miles: Optional[float]):
+    """``best[j] = min_{i<j} prev[i] + cost(i, j)`` for ``j >= lo_j``, by monotone divide and conquer.
+
+    Each recursion level evaluates the middle column of every open interval
+    in one batch. The candidate rows of those columns are laid end to end,
+    and the segment minima are found with ``np.minimum.reduceat``.
+    """
+    k = len(prev)
+    best = np.full(k, np.inf)
+    arg = np.zeros(k, dtype=np.intp)
+    # Open intervals: columns [j_lo, j_hi] whose best split lies in rows [i_lo, i_hi].
+    j_lo = np.array([lo_j]); j_hi = np.array([k - 1])
+    i_lo = np.array([lo_j - 1]); i_hi = np.array([k - 2])
+    while j_lo.size:
+        mid = (j_lo + j_hi) // 2
+        top = np.minimum(i_hi, mid - 1)
+        counts = top - i_lo + 1
+        offsets = np.cumsum(counts) - counts
+        rows = np.repeat(i_lo - offsets, counts) + np.arange(counts.sum())
+        cols = np.repeat(mid, counts)
+        span = effort[cols] - effort[rows]
+        values = prev[rows] + span * span
+        if max_day_miles is not None:
+            values = values + OVERRUN_PENALTY * np.maximum(miles[cols] - miles[rows] - max_day_miles, 0.0)
+        minima = np.minimum.reduceat(values, offsets)
+        # The first row reaching each segment's minimum keeps the split monotone.
+        hits = np.flatnonzero(values == np.repeat(minima, counts))
+        segment = np.searchsorted(offsets, hits, side="right") - 1
+        first = np.unique(segment, return_index=True)[1]
+        split = rows[hits[first]]
+        best[mid], arg[mid] = minima, split
+
+        left = mid > j_lo
+        right = mid < j_hi
+        j_lo, j_hi, i_lo, i_hi = (
+            np.concatenate((j_lo[left], mid[right] + 1)),
+            np.concatenate((mid[left] - 1, j_hi[right])),
+            np.concatenate((i_lo[left], split[right])),
+            np.concatenate((split[left], i_hi[right])),
+        )
+    return best, arg
+
+
+class ItinerarySolver:
+    """Prefix sums over a profile's candidate stations, and the DP layers solved so far."""
+
+    def __init__(
+        self,
+        profile: Profile,
+        candidates: Sequence[Candidate],
+        gain_weight: float = GAIN_MILES_PER_1000FT,
+        loss_weight: float = LOSS_MILES_PER_1000FT,
+        max_day_miles: Optional[float] = None,
+        window_m: float = SELECTED_MODEL[0],
+        threshold_ft: float = SELECTED_MODEL[1],
+    ) -> None:
+        if profile.route_miles is not None:
+            route_miles = profile.route_miles
+        else:
+            route_miles = (profile.stations_m - profile.stations_m[0]) / METERS_PER_MILE
+        start, end = float(route_miles[0]), float(route_miles[-1])
+        # One candidate per mile (to 1e-4); camps sort ahead of water and grid points.
+        rank = {"trailhead": 0, "camp": 1, "finish": 1, "water": 3, "grid": 4}
+        unique = {}
+        for candidate in sorted(candidates, key=lambda c: (c.route_mile, rank.get(c.kind, 2))):
+            if start <= candidate.route_mile <= end:
+                unique.setdefault(round(candidate.route_mile, 4), candidate)
+        unique.setdefault(round(start, 4), Candidate(start, "start", "start"))
+        unique.setdefault(round(end, 4), Candidate(end, "finish", "finish"))
+        self.candidates = [unique[key] for key in sorted(unique)]
+        miles = np.array([c.route_mile for c in self.candidates])
+        miles[[0, -1]] = start, end
+        stations = np.interp(miles, route_miles, profile.stations_m)
+
+        resampled = Profile.resampled(profile.stations_m, profile.elevations_ft, stations)
+        smoothed = resampled.smoothed(window_m)
+        indices, changes = hysteresis_changes(smoothed, threshold_ft)
+        gain = np.zeros(len(smoothed))
+        loss = np.zeros(len(smoothed))
+        np.add.at(gain, indices, np.maximum(changes, 0.0))
+        np.add.at(loss, indices, np.maximum(-changes, 0.0))
+        # A change counted at a candidate's own sample belongs to the day ending there.
+        self.gain_ft = np.cumsum(gain)[resampled.boundaries]
+        self.loss_ft = np.cumsum(loss)[resampled.boundaries]
+        self.miles = miles - start
+        self.effort = self.miles + (gain_weight * self.gain_ft + loss_weight * self.loss_ft) / 1000.0
+        self.max_day_miles = max_day_miles
+
+        first = np.full(len(stations), np.inf)
+        first[0] = 0.0
+        self._best: List[np.ndarray] = [first]
+        self._split: List[np.ndarray] = [np.zeros(len(stations), dtype=np.intp)]
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def _extend(self, days: int) -> None:
+        if days > len(self.candidates) - 1:
+            raise ValueError(f"{days} days need at least {days + 1} candidate stops; have {len(self.candidates)}")
+        while len(self._best) <= days:
+            layer = len(self._best)
+            best, split = _layer(self._best[-1], self.effort, self.miles, layer, self.max_day_miles)
+            self._best.append(best)
+            self._split.append(split)
+
+    def plan(self, days: int) -> Itinerary:
+        """The most balanced ``days``-day itinerary from start to finish."""
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        self._extend(days)
+        stops = [len(self.candidates) - 1]
+        for layer in range(days, 0, -1):
+            stops.append(int(self._split[layer][stops[-1]]))
+        stops.reverse()
+        return self.evaluate(stops)
+
+    def evaluate(self, stops: Sequence[int]) -> Itinerary:
+        """Score a plan given as candidate indices, from 0 to the last candidate."""
+        stops = np.asarray(stops, dtype=np.intp)
+        miles = np.diff(self.miles[stops])
+        gain = np.diff(self.gain_ft[stops])
+        loss = np.diff(self.loss_ft[stops])
+        effort = np.diff(self.effort[stops])
+        mean = float(effort.mean())
+        plans = tuple(
+            DayPlan(day + 1, self.candidates[stops[day]], self.candidates[stops[day + 1]],
+                    float(miles[day]), float(gain[day]), float(loss[day]), float(effort[day]))
+            for day in range(len(effort))
+        )
+        feasible = self.max_day_miles is None or bool(miles.max() <= self.max_day_miles + 1e-9)
+        return Itinerary(plans, mean, float(np.sqrt(np.mean((effort - mean) ** 2))), feasible)
+
+
+def load_solver(
+    terrain: Path = CANONICAL_TERRAIN_PATH,
+    hike_data: Path = HIKE_DATA_PATH,
+    every_mi: Optional[float] = None,
+    **options,
+) -> ItinerarySolver:
+    """Solver over the canonical 25 m terrain profile and the bundle's camps and water."""
+    profile = route_data.canonical_profile(terrain)
+    route_miles = float(profile.route_miles[-1])
+    return ItinerarySolver(profile, route_candidates(route_data.hike_data(hike_data), every_mi, route_miles), **options)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Split the route into N days of balanced effort.")
+    parser.add_argument("--days", type=int, nargs="+", default=[9], help="one or more day counts to plan")
+    parser.add_argument("--terrain", type=Path, default=CANONICAL_TERRAIN_PATH)
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--every", type=float, help="also allow a stop every this many miles")
+    parser.add_argument("--gain-weight", type=float, default=GAIN_MILES_PER_1000FT, help="miles per 1,000 ft gain")
+    parser.add_argument("--loss-weight", type=float, default=LOSS_MILES_PER_1000FT, help="miles per 1,000 ft loss")
+    parser.add_argument("--max-day-miles", type=float)
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    route_trace.configure(args)
+
+    with route_trace.span("prefix_sums") as span:
+        solver = load_solver(args.terrain, args.hike_data, args.every, gain_weight=args.gain_weight,
+                             loss_weight=args.loss_weight, max_day_miles=args.max_day_miles)
+        span.count("candidates", len(solver))
+    for days in args.days:
+        started = time.perf_counter()
+        with route_trace.span("solve") as span:
+            itinerary = solver.plan(days)
+            span.count("days", days)
+        elapsed = time.perf_counter() - started
+        note = "" if itinerary.feasible else f"  (no split keeps every day under {args.max_day_miles} mi)"
+        print(f"\n{days} days over {len(solver)} candidate stops, solved in {elapsed * 1000:.1f} ms: "
+              f"mean effort {itinerary.mean_effort:.2f} mi, spread {itinerary.spread:.2f}, "
+              f"worst {itinerary.max_deviation:+.2f}{note}")
+        print(f"{'day':>3} {'from mi':>8} {'to mi':>7} {'miles':>6} {'gain':>6} {'loss':>6} {'effort':>7}  stop")
+        for day in itinerary.days:
+            print(f"{day.day:>3} {day.start.route_mile:>8.2f} {day.end.route_mile:>7.2f} "
+                  f"{day.miles:>6.2f} {day.gain_ft:>6.0f} {day.loss_ft:>6.0f} {day.effort:>7.2f}  "
+                  f"{day.end.label} ({day.end.kind})")
+
+
+if __name__ == "__main__":
+    main()
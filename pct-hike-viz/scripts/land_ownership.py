@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""Which agency or owner holds each mile of the route, and each camp and water source.
+
+:class:`ParcelIndex` answers point-in-parcel queries for a whole batch of
+points at once, in two stages:
+
+1. A bounding-box R-tree, bulk-loaded with Sort-Tile-Recursive packing,
+   prefilters candidate polygon parts. The tree is walked one level at a
+   time for all points together.
+2. Each candidate part is tested by even-odd ray casting. The test only
+   uses the edges of that part that cross the point's horizontal slab.
+   Parts are cut into about sqrt(edges) slabs when the index is built.
+
+Holes need no special case, because the even-odd count runs over every ring
+of a part. Where parcels overlap, the first feature in file order wins, as
+in ``scripts/audit_camp_ownership.mjs``.
+
+    python scripts/land_ownership.py                  # runs by owner, then camps and water
+    python scripts/land_ownership.py --json report.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+OVERLAY_PATH = ROOT / "public" / "data" / "land_ownership.geojson"
+REPORT_PATH = ROOT / ".route-build" / "reports" / "land_ownership.json"
+
+NO_PARCEL = "no-parcel"
+_NODE_CAPACITY = 16
+_BLOCK_POINTS = 1 << 15
+
+
+@dataclass(frozen=True)
+class OwnershipRun:
+    """Consecutive route vertices with the same ownership class and owner."""
+
+    first: int
+    last: int
+    start_mile: float
+    end_mile: float
+    ownership: str
+    owner: Optional[str]
+    parcels: Tuple[str, ...]
+
+    @property
+    def miles(self) -> float:
+        return self.end_mile - self.start_mile
+
+
+def _str_order(boxes: np.ndarray) -> np.ndarray:
+    """Sort-Tile-Recursive order: vertical strips by x, then y inside each strip."""
+    count = len(boxes)
+    leaves = -(-count // _NODE_CAPACITY)
+    strips = max(1, int(np.ceil(np.sqrt(leaves))))
+    per_strip = strips * _NODE_CAPACITY
+    cx = (boxes[:, 0] + boxes[:, 2]) / 2
+    cy = (boxes[:, 1] + boxes[:, 3]) / 2
+    by_x = np.argsort(cx, kind="stable")
+    strip = np.empty(count, dtype=np.intp)
+    strip[by_x] = np.arange(count) // per_strip
+    return np.lexsort((cy, strip))
+
+
+class ParcelIndex:
+    """Batched point-in-parcel lookups over GeoJSON Polygon/MultiPolygon features."""
+
+    def __init__(self, features: Sequence[dict]) -> None:
+        self.features = list(features)
+        part_feature: List[int] = []
+        rings: List[np.ndarray] = []
+        ring_part: List[int] = []
+        for feature_id, feature in enumerate(self.features):
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") == "Polygon":
+                polygons = [geometry["coordinates"]]
+            elif geometry.get("type") == "MultiPolygon":
+                polygons = geometry["coordinates"]
+            else:
+                continue
+            for polygon in polygons:
+                part = len(part_feature)
+                part_feature.append(feature_id)
+                for ring in polygon:
+                    rings.append(np.asarray(ring, dtype=np.float64)[:, :2])
+                    ring_part.append(part)
+        if not part_feature:
+            raise ValueError("no Polygon or MultiPolygon features to index")
+        self.part_feature = np.asarray(part_feature, dtype=np.intp)
+
+        # Every ring edge, closing each ring even when its last point repeats the first.
+        starts = np.concatenate(rings)
+        ends = np.concatenate([np.roll(ring, -1, axis=0) for ring in rings])
+        edge_part = np.repeat(ring_part, [len(ring) for ring in rings])
+        keep = np.any(starts != ends, axis=1)
+        self._x0, self._y0 = starts[keep, 0], starts[keep, 1]
+        self._x1, self._y1 = ends[keep, 0], ends[keep, 1]
+        edge_part = edge_part[keep]
+
+        parts = len(part_feature)
+        self.boxes = np.empty((parts, 4))
+        lo_x, lo_y = np.minimum(self._x0, self._x1), np.minimum(self._y0, self._y1)
+        hi_x, hi_y = np.maximum(self._x0, self._x1), np.maximum(self._y0, self._y1)
+        for column, values, reduce in ((0, lo_x, np.minimum), (1, lo_y, np.minimum),
+                                       (2, hi_x, np.maximum), (3, hi_y, np.maximum)):
+            self.boxes[:, column] = np.inf if reduce is np.minimum else -np.inf
+            reduce.at(self.boxes[:, column], edge_part, values)
+
+        # Horizontal slabs per part; an edge is listed in every slab its y-range touches.
+        edges_per_part = np.bincount(edge_part, minlength=parts)
+        self._slabs = np.maximum(1, np.sqrt(edges_per_part).astype(np.intp))
+        height = self.boxes[:, 3] - self.boxes[:, 1]
+        self._slab_height = np.where(height > 0, height / self._slabs, 1.0)
+        self._slab_base = np.concatenate(([0], np.cumsum(self._slabs)))
+        first = self._slab_of(edge_part, lo_y)
+        last = self._slab_of(edge_part, hi_y)
+        spans = last - first + 1
+        edge_ids = np.repeat(np.arange(len(edge_part)), spans)
+        slab_ids = self._slab_base[edge_part[edge_ids]] + np.repeat(first, spans) + (
+            np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans)
+        )
+        order = np.argsort(slab_ids, kind="stable")
+        self._slab_edges = edge_ids[order]
+        self._slab_starts = np.searchsorted(slab_ids[order], np.arange(self._slab_base[-1] + 1))
+
+        # STR-packed R-tree, stored bottom-up as (boxes, child offsets) per level.
+        order = _str_order(self.boxes)
+        self._leaf_parts = order
+        level_boxes = self.boxes[order]
+        self._levels: List[Tuple[np.ndarray, np.ndarray]] = []
+        while True:
+            groups = np.arange(0, len(level_boxes), _NODE_CAPACITY)
+            node_boxes = np.column_stack((
+                np.minimum.reduceat(level_boxes[:, 0], groups), np.minimum.reduceat(level_boxes[:, 1], groups),
+                np.maximum.reduceat(level_boxes[:, 2], groups), np.maximum.reduceat(level_boxes[:, 3], groups),
+            ))
+            self._levels.append((node_boxes, np.append(groups, len(level_boxes))))
+            if len(node_boxes) <= _NODE_CAPACITY:
+                break
+            # Leaves are already in STR order, so grouping consecutive
+            # nodes keeps parents compact and their children contiguous.
+            level_boxes = node_boxes
+
+    @classmethod
+    def from_geojson(cls, path: Path = OVERLAY_PATH) -> "ParcelIndex":
+        return cls(json.loads(Path(path).read_text(encoding="utf-8"))["features"])
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def _slab_of(self, part: np.ndarray, y: np.ndarray) -> np.ndarray:
+        slab = np.floor((y - self.boxes[part, 1]) / self._slab_height[part]).astype(np.intp)
+        return np.clip(slab, 0, self._slabs[part] - 1)
+
+    def candidates(self, lons: np.ndarray, lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """``(point, part)`` pairs whose part bounding box contains the point."""
+        n = len(lons)
+        top_boxes, _ = self._levels[-1]
+        point = np.repeat(np.arange(n), len(top_boxes))
+        node = np.tile(np.arange(len(top_boxes)), n)
+        for depth in range(len(self._levels) - 1, -1, -1):
+            boxes, children = self._levels[depth]
+            x, y = lons[point], lats[point]
+            inside = (boxes[node, 0] <= x) & (x <= boxes[node, 2]) & (boxes[node, 1] <= y) & (y <= boxes[node, 3])
+            point, node = point[inside], node[inside]
+            counts = children[node + 1] - children[node]
+            point = np.repeat(point, counts)
+            node = np.repeat(children[node] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        part = self._leaf_parts[node]
+        box = self.boxes[part]
+        x, y = lons[point], lats[point]
+        inside = (box[:, 0] <= x) & (x <= box[:, 2]) & (box[:, 1] <= y) & (y <= box[:, 3])
+        return point[inside], part[inside]
+
+    def classify(self, lons, lats) -> np.ndarray:
+        """Feature index containing each point, or -1 where no parcel does."""
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        if len(lons) > _BLOCK_POINTS:
+            # Blocks bound the (point, candidate edge) pairs held at once.
+            return np.concatenate([
+                self.classify(lons[start:start + _BLOCK_POINTS], lats[start:start + _BLOCK_POINTS])
+                for start in range(0, len(lons), _BLOCK_POINTS)
+            ])
+        point, part = self.candidates(lons, lats)
+        result = np.full(len(lons), len(self.features), dtype=np.intp)
+        if point.size:
+            slab = self._slab_base[part] + self._slab_of(part, lats[point])
+            lo = self._slab_starts[slab]
+            counts = self._slab_starts[slab + 1] - lo
+            pair = np.repeat(np.arange(len(point)), counts)
+            edge = self._slab_edges[np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())]
+            x, y = lons[point[pair]], lats[point[pair]]
+            y0, y1 = self._y0[edge], self._y1[edge]
+            straddles = (y0 > y) != (y1 > y)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                crossing_x = self._x0[edge] + (y - y0) * (self._x1[edge] - self._x0[edge]) / (y1 - y0)
+            crossings = np.bincount(pair, weights=straddles & (x < crossing_x), minlength=len(point))
+            inside = crossings.astype(np.intp) % 2 == 1
+            np.minimum.at(result, point[inside], self.part_feature[part[inside]])
+        result[result == len(self.features)] = -1
+        return result
+
+    def owner_at(self, lon: float, lat: float) -> Optional[dict]:
+        """Properties of the parcel at one point, or ``None``."""
+        feature = int(self.classify([lon], [lat])[0])
+        return self.features[feature]["properties"] if feature >= 0 else None
+
+    def describe(self, feature: int) -> Tuple[str, Optional[str]]:
+        """``(ownership class, owner)`` for a feature index from :meth:`classify`."""
+        if feature < 0:
+            return NO_PARCEL, None
+        properties = self.features[feature]["properties"]
+        return properties.get("ownership", "unknown"), properties.get("assessee") or properties.get("label")
+
+
+def ownership_runs(index: ParcelIndex, owners: np.ndarray, miles: np.ndarray) -> List[OwnershipRun]:
+    """Split route vertices into runs of one ownership class and owner.
+
+    A run ends at the first vertex of the next run, so runs cover the route
+    without gaps.
+    """
+    keys = [index.describe(int(feature)) for feature in range(-1, len(index))]
+    _, key_ids = np.unique([f"{ownership}\0{owner}" for ownership, owner in keys], return_inverse=True)
+    vertex_keys = key_ids[owners + 1]
+    firsts = np.concatenate(([0], np.flatnonzero(np.diff(vertex_keys)) + 1))
+    lasts = np.append(firsts[1:] - 1, len(owners) - 1)
+    runs = []
+    for first, last in zip(firsts.tolist(), lasts.tolist()):
+        ownership, owner = index.describe(int(owners[first]))
+        parcels = [index.features[f]["properties"].get("apn", str(f)) for f in np.unique(owners[first:last + 1]) if f >= 0]
+        end = miles[last + 1] if last + 1 < len(miles) else miles[last]
+        runs.append(OwnershipRun(first, last, float(miles[first]), float(end), ownership, owner, tuple(parcels)))
+    return runs
+
+
+def run_at(runs: Sequence[OwnershipRun], mile: float) -> OwnershipRun:
+    """The run covering ``mile`` (clamped to the route ends)."""
+    starts = [run.start_mile for run in runs]
+    return runs[max(0, int(np.searchsorted(starts, mile, side="right")) - 1)]
+
+
+def route_waypoints(data: dict) -> List[dict]:
+    """Point features and water sources as ``{name, kind, day, pctMile, coordinates}`` rows."""
+    start_mile = data["route"].get("metadata", {}).get("start_pct_mile", 0.0)
+    waypoints = []
+    for feature in data.get("features", []):
+        geometry = feature.get("geometry") or {}
+        properties = feature.get("properties") or {}
+        if geometry.get("type") != "Point" or properties.get("day", -1) < 0:
+            continue
+        route_mile = properties.get("routeMile")
+        waypoints.append({
+            "name": properties.get("name"),
+            "kind": properties.get("type"),
+            "day": properties.get("day"),
+            "pctMile": properties.get("pctMile", None if route_mile is None else round(start_mile + route_mile, 3)),
+            "coordinates": geometry["coordinates"][:2],
+        })
+    for source in data.get("waterSources", []):
+        waypoints.append({
+            "name": source.get("name"),
+            "kind": "water",
+            "day": None,
+            "pctMile": source.get("pctMile", source.get("mile")),
+            "coordinates": source["coordinates"][:2],
+        })
+    return waypoints
+
+
+def classify_route(data: dict, index: ParcelIndex) -> Tuple[List[OwnershipRun], List[dict]]:
+    """Classify every route vertex and waypoint in one batched pass."""
+    path = data["route"]["path"]
+    start_mile = data["route"].get("metadata", {}).get("start_pct_mile", 0.0)
+    waypoints = route_waypoints(data)
+    lons = np.array([row[0] for row in path] + [w["coordinates"][0] for w in waypoints], dtype=np.float64)
+    lats = np.array([row[1] for row in path] + [w["coordinates"][1] for w in waypoints], dtype=np.float64)
+    owners = index.classify(lons, lats)
+    if all(len(row) > 3 for row in path):
+        miles = start_mile + np.array([row[3] for row in path], dtype=np.float64)
+    else:
+        from geodesy import METERS_PER_MILE, as_coords, cumulative_stations
+
+        coords = as_coords(path)
+        miles = start_mile + cumulative_stations(coords[:, 0], coords[:, 1]) / METERS_PER_MILE
+    runs = ownership_runs(index, owners[:len(path)], miles)
+    for waypoint, feature in zip(waypoints, owners[len(path):].tolist()):
+        ownership, owner = index.describe(feature)
+        parcel = index.features[feature]["properties"].get("apn") if feature >= 0 else None
+        waypoint.update(ownership=ownership, owner=owner, apn=parcel)
+    return runs, waypoints
+
+
+def summarize(runs: Iterable[OwnershipRun]) -> dict:
+    """Route miles per ownership class."""
+    totals: dict = {}
+    for run in runs:
+        totals[run.ownership] = totals.get(run.ownership, 0.0) + run.miles
+    return {ownership: round(miles, 3) for ownership, miles in sorted(totals.items())}
+
+
+def report_payload(index: ParcelIndex, runs: Sequence[OwnershipRun], waypoints: List[dict], overlay: Path) -> dict:
+    """JSON form of :func:`classify_route` output."""
+    return {
+        "overlay": str(overlay),
+        "parcels": len(index),
+        "milesByOwnership": summarize(runs),
+        "runs": [
+            {
+                "startPctMile": round(run.start_mile, 3),
+                "endPctMile": round(run.end_mile, 3),
+                "miles": round(run.miles, 3),
+                "ownership": run.ownership,
+                "owner": run.owner,
+                "parcels": list(run.parcels),
+            }
+            for run in runs
+        ],
+        "waypoints": waypoints,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Classify route miles, camps and water by land ownership.")
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--overlay", type=Path, default=OVERLAY_PATH, help="land-ownership GeoJSON")
+    parser.add_argument("--json", type=Path, nargs="?", const=REPORT_PATH, help="also write a JSON report")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    data = route_trace.load_json(args.hike_data)
+    with route_trace.span("index") as span:
+        index = ParcelIndex.from_geojson(args.overlay)
+        span.count("parcels", len(index))
+    with route_trace.span("classify") as span:
+        runs, waypoints = classify_route(data, index)
+        span.count("points", len(data["route"]["path"]) + len(waypoints))
+
+    print(f"{len(index)} parcels, {len(runs)} ownership runs along {len(data['route']['path']):,} route vertices")
+    print(f"{'PCT from':>9} {'PCT to':>9} {'miles':>7}  {'ownership':<20} owner")
+    for run in runs:
+        print(f"{run.start_mile:>9.3f} {run.end_mile:>9.3f} {run.miles:>7.3f}  {run.ownership:<20} {run.owner or ''}")
+    print("Miles by class: " + ", ".join(f"{key} {value:.2f}" for key, value in summarize(runs).items()))
+    print(f"\n{'PCT':>9}  {'kind':<10} {'ownership':<20} name")
+    for waypoint in waypoints:
+        mile = waypoint["pctMile"]
+        print(f"{'' if mile is None else f'{mile:.3f}':>9}  {str(waypoint['kind']):<10} "
+              f"{waypoint['ownership']:<20} {waypoint['name']}")
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        route_trace.dump_json(args.json, report_payload(index, runs, waypoints, args.overlay), indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
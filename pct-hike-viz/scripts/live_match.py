@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Match a live stream of GPS fixes to route miles, keeping one state per hiker.
+
+A :class:`Fix` is a hiker, a time and a position. It may come from an
+ops-log check-in, a satellite messenger ping or a replayed track.
+:class:`LiveMatcher` remembers each hiker's last on-route station. It then
+searches only the segments within ``window_m`` of that station, widened by
+how far the hiker could have walked since. A window match keeps a fix on
+the leg the hiker is actually on where the route doubles back near itself.
+These cases go to the :class:`route_index.RouteIndex` grid search over the
+whole route instead:
+
+- the first fix from a hiker;
+- a fix landing more than ``off_route_m`` from its window;
+- any fix from a hiker whose last fix was off route;
+- a fix after a silence long enough to widen the window past
+  :data:`MAX_WINDOW_M`.
+
+Fixes are matched in batches. Each round of a batch takes at most one fix
+per hiker, and all of a round's window searches run as one ragged array
+operation. A whole group, or many groups, therefore costs a few numpy calls
+per round rather than per fix. :meth:`LiveMatcher.stream` wraps a plain
+iterator. :func:`match_async` wraps an async one and flushes a partial batch
+when the source goes quiet.
+
+Each :class:`Match` carries:
+
+- the PCT mile;
+- the distance off route;
+- the next camp, with an ETA from the hiker's smoothed along-route pace.
+
+    python scripts/live_match.py fixes.jsonl            # JSON lines in, JSON lines out
+    python scripts/live_match.py --replay ../COURSE_334289912.fit --hikers 8 --summary
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import METERS_PER_MILE, as_coords, cumulative_stations
+from route_index import RouteIndex
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+
+# Searched either side of the last match, before allowing for elapsed time.
+WINDOW_M = 1_000.0
+# A fast hiker; the window widens by this much per second since the last match.
+MAX_SPEED_MPS = 3.0
+# Past this the grid search over the whole route is as cheap as the window.
+MAX_WINDOW_M = 20_000.0
+OFF_ROUTE_M = 150.0
+DEFAULT_PACE_MPH = 2.0
+# Weight of the newest along-route speed in the pace average.
+PACE_SMOOTHING = 0.3
+# Paces below this are a hiker in camp, not one walking slowly.
+MIN_PACE_MPH = 0.2
+BATCH_SIZE = 1024
+
+TRACKING = "tracking"
+ACQUIRED = "acquired"
+REACQUIRED = "reacquired"
+OFF_ROUTE = "off-route"
+
+
+@dataclass(frozen=True)
+class Fix:
+    hiker: str
+    time_s: float
+    lon: float
+    lat: float
+
+
+@dataclass(frozen=True)
+class Match:
+    hiker: str
+    time_s: float
+    pct_mile: float
+    route_mile: float
+    off_route_m: float
+    status: str
+    next_camp: Optional[str]
+    camp_miles: Optional[float]
+    eta_s: Optional[float]
+    pace_mph: float
+
+    def to_payload(self) -> dict:
+        return {
+            "hiker": self.hiker,
+            "time": self.time_s,
+            "pctMile": round(self.pct_mile, 3),
+            "routeMile": round(self.route_mile, 3),
+            "offRouteMeters": round(self.off_route_m, 1),
+            "status": self.status,
+            "nextCamp": self.next_camp,
+            "campMiles": None if self.camp_miles is None else round(self.camp_miles, 2),
+            "etaSeconds": None if self.eta_s is None else round(self.eta_s),
+            "paceMph": round(self.pace_mph, 2),
+        }
+
+
+def parse_time(value) -> float:
+    """Epoch seconds from a number or an ISO-8601 timestamp."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def parse_fix(row: dict) -> Fix:
+    """A fix from a ``{hiker, time, lon, lat}`` JSON object."""
+    return Fix(str(row["hiker"]), parse_time(row["time"]), float(row["lon"]), float(row["lat"]))
+
+
+class LiveMatcher:
+    """Per-hiker map matching against one route, with state kept in slot arrays."""
+
+    def __init__(
+        self,
+        path: Sequence[Sequence[float]] | np.ndarray,
+        route_miles: Optional[np.ndarray] = None,
+        camps: Sequence[Tuple[float, str]] = (),
+        start_mile: float = 0.0,
+        window_m: float = WINDOW_M,
+        off_route_m: float = OFF_ROUTE_M,
+    ) -> None:
+        self.coords = as_coords(path)
+        stations = cumulative_stations(self.coords[:, 0], self.coords[:, 1])
+        self.index = RouteIndex(self.coords, stations_m=stations)
+        self.route_miles = (
+            np.asarray(route_miles, dtype=np.float64) if route_miles is not None else stations / METERS_PER_MILE
+        )
+        camps = sorted(camps)
+        self.camp_miles = np.array([mile for mile, _ in camps], dtype=np.float64)
+        self.camp_names = [name for _, name in camps]
+        self.start_mile = start_mile
+        self.window_m = window_m
+        self.off_route_m = off_route_m
+
+        self._slots: Dict[str, int] = {}
+        self._station = np.zeros(0)
+        self._mile = np.zeros(0)
+        self._time = np.zeros(0)
+        self._pace = np.zeros(0)
+        self._tracked = np.zeros(0, dtype=bool)
+        self._lost = np.zeros(0, dtype=bool)
+
+    @classmethod
+    def from_hike_data(cls, data: dict, **kwargs) -> "LiveMatcher":
+        """Route, calibrated miles and the day-stop camps of a ``hike_data.json`` bundle."""
+        path = data["route"]["path"]
+        route_miles = np.array([row[3] for row in path], dtype=np.float64) if all(len(row) > 3 for row in path) else None
+        camps = [
+            (float(feature["properties"]["routeMile"]), feature["properties"].get("name", "camp"))
+            for feature in data.get("features", [])
+            if (feature.get("properties") or {}).get("day", 0) >= 1
+            and feature["properties"].get("routeMile") is not None
+        ]
+        start_mile = data["route"].get("metadata", {}).get("start_pct_mile", 0.0)
+        return cls(path, route_miles, camps, start_mile, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _slot(self, hiker: str) -> int:
+        slot = self._slots.get(hiker)
+        if slot is None:
+            slot = self._slots[hiker] = len(self._slots)
+            if slot >= len(self._station):
+                size = max(16, 2 * len(self._station))
+                self._station = np.resize(self._station, size)
+                self._mile = np.resize(self._mile, size)
+                self._time = np.resize(self._time, size)
+                self._pace = np.resize(self._pace, size)
+                self._tracked = np.resize(self._tracked, size)
+                self._lost = np.resize(self._lost, size)
+            self._tracked[slot] = False
+            self._lost[slot] = False
+            self._pace[slot] = np.nan
+        return slot
+
+    def update(self, fix: Fix) -> Match:
+        """Match a single fix."""
+        return self.process([fix])[0]
+
+    def process(self, fixes: Sequence[Fix]) -> List[Match]:
+        """Match a batch of fixes, in order per hiker, returning one match per fix."""
+        fixes = list(fixes)
+        if not fixes:
+            return []
+        with route_trace.span("match") as span:
+            slots = np.array([self._slot(fix.hiker) for fix in fixes], dtype=np.int64)
+            times = np.array([fix.time_s for fix in fixes], dtype=np.float64)
+            lons = np.array([fix.lon for fix in fixes], dtype=np.float64)
+            lats = np.array([fix.lat for fix in fixes], dtype=np.float64)
+
+            # A fix's round is how many earlier fixes in the batch share its hiker.
+            by_slot = np.argsort(slots, kind="stable")
+            sorted_slots = slots[by_slot]
+            group_start = np.flatnonzero(np.concatenate(([True], sorted_slots[1:] != sorted_slots[:-1])))
+            sizes = np.diff(np.append(group_start, len(slots)))
+            rounds = np.empty(len(slots), dtype=np.int64)
+            rounds[by_slot] = np.arange(len(slots)) - np.repeat(group_start, sizes)
+            by_round = np.argsort(rounds, kind="stable")
+            bounds = np.searchsorted(rounds[by_round], np.arange(int(rounds.max()) + 2))
+
+            matches: List[Optional[Match]] = [None] * len(fixes)
+            for first, last in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+                batch = by_round[first:last]
+                for position, match in zip(batch.tolist(), self._round(slots[batch], times[batch], lons[batch],
+                                                                       lats[batch], fixes, batch)):
+                    matches[position] = match
+            span.count("fixes", len(fixes))
+            span.count("rounds", len(bounds) - 1)
+        return matches
+
+    def _round(self, slots, times, lons, lats, fixes, positions) -> List[Match]:
+        """Match fixes from distinct hikers and advance their state."""
+        known = self._tracked[slots]
+        elapsed = np.where(known, np.maximum(times - self._time[slots], 0.0), 0.0)
+        reach = self.window_m + MAX_SPEED_MPS * elapsed
+        distance = np.full(len(slots), np.inf)
+        station = np.zeros(len(slots))
+
+        # A hiker whose last fix was off route, or who has been silent long enough to be anywhere, is searched globally.
+        windowed = known & ~self._lost[slots] & (reach < MAX_WINDOW_M)
+        if windowed.any():
+            rows = np.flatnonzero(windowed)
+            reach = reach[rows]
+            centre = self._station[slots[rows]]
+            first = np.searchsorted(self.index.stations_m, centre - reach, side="right") - 1
+            last = np.searchsorted(self.index.stations_m, centre + reach, side="left")
+            hits = self.index.nearest_segments_between(lons[rows], lats[rows], first, last)
+            distance[rows] = hits.distance_m
+            station[rows] = hits.station_m
+
+        lost = distance > self.off_route_m
+        if lost.any():
+            rows = np.flatnonzero(lost)
+            hits = self.index.nearest_segments(lons[rows], lats[rows])
+            distance[rows] = hits.distance_m
+            station[rows] = hits.station_m
+
+        on_route = distance <= self.off_route_m
+        miles = np.interp(station, self.index.stations_m, self.route_miles)
+
+        # Along-route pace from consecutive on-route fixes, in miles per second.
+        moved = on_route & known & (elapsed > 0)
+        rate = np.where(moved, (miles - self._mile[slots]) / np.where(moved, elapsed, 1.0), np.nan)
+        pace = self._pace[slots]
+        pace = np.where(moved, np.where(np.isnan(pace), rate, pace + PACE_SMOOTHING * (rate - pace)), pace)
+        keep = on_route
+        self._station[slots[keep]] = station[keep]
+        self._mile[slots[keep]] = miles[keep]
+        self._time[slots[keep]] = times[keep]
+        self._tracked[slots[keep]] = True
+        self._lost[slots] = ~on_route
+        self._pace[slots] = pace
+
+        pace_mph = np.where(np.isnan(pace), DEFAULT_PACE_MPH, pace * 3600.0)
+        pace_mph = np.where(pace_mph < MIN_PACE_MPH, DEFAULT_PACE_MPH, pace_mph)
+        camp = np.searchsorted(self.camp_miles, miles, side="right")
+        has_camp = camp < len(self.camp_miles)
+        camp_miles = np.where(has_camp, self.camp_miles[np.minimum(camp, len(self.camp_miles) - 1)] - miles, np.nan) \
+            if len(self.camp_miles) else np.full(len(miles), np.nan)
+        eta = camp_miles / pace_mph * 3600.0
+
+        status = np.where(
+            ~on_route, OFF_ROUTE, np.where(~known, ACQUIRED, np.where(windowed & ~lost, TRACKING, REACQUIRED))
+        )
+        return [
+            Match(
+                fixes[position].hiker, time_s, self.start_mile + mile, mile, off, state,
+                self.camp_names[index] if ahead else None,
+                to_camp if ahead else None,
+                seconds if ahead else None,
+                mph,
+            )
+            for position, time_s, mile, off, state, index, ahead, to_camp, seconds, mph in zip(
+                positions.tolist(), times.tolist(), miles.tolist(), distance.tolist(), status.tolist(),
+                camp.tolist(), has_camp.tolist(), camp_miles.tolist(), eta.tolist(), pace_mph.tolist(),
+            )
+        ]
+
+    def stream(self, fixes: Iterable[Fix], batch_size: int = BATCH_SIZE) -> Iterator[Match]:
+        """Match an iterator of fixes in batches; ``batch_size=1`` yields each match as soon as it arrives."""
+        batch: List[Fix] = []
+        for fix in fixes:
+            batch.append(fix)
+            if len(batch) >= batch_size:
+                yield from self.process(batch)
+                batch = []
+        yield from self.process(batch)
+
+
+async def match_async(
+    matcher: LiveMatcher,
+    fixes: AsyncIterable[Fix],
+    batch_size: int = BATCH_SIZE,
+    linger_s: float = 0.05,
+) -> AsyncIterator[Match]:
+    """Match an async source, flushing a batch when it fills or no fix arrives for ``linger_s``."""
+    source = fixes.__aiter__()
+    batch: List[Fix] = []
+    pending: Optional[asyncio.Future] = None
+    while True:
+        if pending is None:
+            pending = asyncio.ensure_future(source.__anext__())
+        try:
+            fix = await asyncio.wait_for(asyncio.shield(pending), linger_s if batch else None)
+        except asyncio.TimeoutError:
+            for match in matcher.process(batch):
+                yield match
+            batch = []
+            continue
+        except StopAsyncIteration:
+            break
+        pending = None
+        batch.append(fix)
+        if len(batch) >= batch_size:
+            for match in matcher.process(batch):
+                yield match
+            batch = []
+    for match in matcher.process(batch):
+        yield match
+
+
+def replay_fixes(track: np.ndarray, hikers: int, pace_mph: float = DEFAULT_PACE_MPH, interval_s: float = 60.0,
+                 stagger_s: float = 600.0, jitter_m: float = 5.0, seed: int = 0) -> List[Fix]:
+    """Fixes for ``hikers`` walking ``track`` at ``pace_mph``, ``stagger_s`` apart, in time order."""
+    rng = np.random.default_rng(seed)
+    stations = cumulative_stations(track[:, 0], track[:, 1])
+    walk_s = stations / (pace_mph * METERS_PER_MILE / 3600.0)
+    samples = np.arange(0.0, walk_s[-1], interval_s)
+    lon = np.interp(samples, walk_s, track[:, 0])
+    lat = np.interp(samples, walk_s, track[:, 1])
+    fixes = []
+    for hiker in range(hikers):
+        # Roughly jitter_m of GPS noise; a degree of latitude is ~111 km.
+        noise = rng.normal(0.0, jitter_m / 111_000.0, (len(samples), 2))
+        noise[:, 0] /= np.cos(np.radians(lat))
+        fixes += [
+            Fix(f"hiker-{hiker + 1}", t, x, y)
+            for t, x, y in zip((samples + hiker * stagger_s).tolist(), (lon + noise[:, 0]).tolist(),
+                               (lat + noise[:, 1]).tolist())
+        ]
+    fixes.sort(key=lambda fix: fix.time_s)
+    return fixes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Match GPS fixes to route miles with per-hiker state.")
+    parser.add_argument("fixes", nargs="?", default="-", help="JSON-lines fixes {hiker, time, lon, lat} ('-' = stdin)")
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--replay", type=Path, help="replay a GPX/FIT track as --hikers staggered hikers instead")
+    parser.add_argument("--hikers", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between replayed fixes")
+    parser.add_argument("--window", type=float, default=WINDOW_M, help="meters searched around the last match")
+    parser.add_argument("--off-route", type=float, default=OFF_ROUTE_M, help="meters before a fix is off route")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE, help="fixes matched per batch (1 = no buffering)")
+    parser.add_argument("--summary", action="store_true", help="print each hiker's last match instead of every match")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    matcher = LiveMatcher.from_hike_data(route_trace.load_json(args.hike_data), window_m=args.window,
+                                         off_route_m=args.off_route)
+    if args.replay is not None:
+        from route_deviation import read_track
+
+        fixes: Iterable[Fix] = replay_fixes(read_track(args.replay), args.hikers, interval_s=args.interval)
+    else:
+        source = sys.stdin if args.fixes == "-" else open(args.fixes, encoding="utf-8")
+        fixes = (parse_fix(json.loads(line)) for line in source if line.strip())
+
+    started = time.perf_counter()
+    latest: Dict[str, Match] = {}
+    count = 0
+    for match in matcher.stream(fixes, args.batch):
+        count += 1
+        if args.summary:
+            latest[match.hiker] = match
+        else:
+            print(json.dumps(match.to_payload()), flush=args.batch == 1)
+    elapsed = time.perf_counter() - started
+    if args.summary:
+        for match in latest.values():
+            camp = f"{match.camp_miles:.1f} mi to {match.next_camp}" if match.next_camp else "past the last camp"
+            print(f"{match.hiker:>10}  PCT mile {match.pct_mile:8.2f}  {match.status:<10} "
+                  f"{match.off_route_m:6.0f} m off  {camp}")
+        print(f"{count:,} fixes from {len(matcher)} hikers in {elapsed:.2f} s "
+              f"({count / max(elapsed, 1e-9):,.0f} fixes/s)")
+
+
+if __name__ == "__main__":
+    main()
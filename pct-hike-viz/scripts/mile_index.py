@@ -0,0 +1,104 @@
+"""PCT mile -> centerline position lookups calibrated to PCTA mile markers.
+
+Vertex spacing along a centerline is uneven, so a mile cannot be mapped to a
+vertex by its array index. :class:`MileIndex` pairs each PCTA 2026 marker mile
+with its measured station (meters along the centerline) and interpolates
+between those control points, then resolves the station to a coordinate with
+the shared batched station lookup.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from geodesy import as_coords, cumulative_stations, points_at_stations
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+DEFAULT_CENTERLINE_PATH = REPO_ROOT / "docs" / "data" / "source" / "pcta-centerline-2026-burney-ash.geojson"
+
+
+class MileIndex:
+    """Calibrated PCT mile -> station -> coordinate index for one centerline."""
+
+    def __init__(
+        self,
+        coords: np.ndarray,
+        control_miles: np.ndarray,
+        control_stations_m: np.ndarray,
+        stations_m: np.ndarray | None = None,
+    ) -> None:
+        self.coords = as_coords(coords)
+        self.stations_m = (
+            np.asarray(stations_m, dtype=np.float64)
+            if stations_m is not None
+            else cumulative_stations(self.coords[:, 0], self.coords[:, 1])
+        )
+        order = np.argsort(control_miles, kind="stable")
+        self.control_miles = np.asarray(control_miles, dtype=np.float64)[order]
+        self.control_stations_m = np.asarray(control_stations_m, dtype=np.float64)[order]
+        if np.any(np.diff(self.control_stations_m) < 0):
+            raise ValueError("Mile-marker stations must increase with mileage")
+
+    @classmethod
+    def from_centerline_geojson(cls, path: Path = DEFAULT_CENTERLINE_PATH) -> "MileIndex":
+        """Build the index from a PCTA centerline crop with ``markerStations`` metadata."""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        line = next(
+            feature["geometry"]["coordinates"]
+            for feature in data["features"]
+            if feature["geometry"]["type"] == "LineString"
+        )
+        coords = as_coords(line)
+        stations = cumulative_stations(coords[:, 0], coords[:, 1])
+        metadata = data.get("metadata", {})
+        source = metadata.get("sourceMetadata", {})
+        miles = [source["startPctaMile"]] if "startPctaMile" in source else []
+        marker_stations = [0.0] if miles else []
+        for marker in metadata.get("markerStations", []):
+            miles.append(marker["mile"])
+            marker_stations.append(marker["stationMeters"])
+        if "finishPctaMile" in source:
+            miles.append(source["finishPctaMile"])
+            marker_stations.append(float(stations[-1]))
+        if len(miles) < 2:
+            raise ValueError(f"{path} has fewer than two mile control points")
+        return cls(coords, np.array(miles), np.array(marker_stations), stations)
+
+    @property
+    def start_mile(self) -> float:
+        return float(self.control_miles[0])
+
+    @property
+    def end_mile(self) -> float:
+        return float(self.control_miles[-1])
+
+    def covers(self, miles) -> np.ndarray:
+        miles = np.asarray(miles, dtype=np.float64)
+        return (miles >= self.start_mile) & (miles <= self.end_mile)
+
+    def stations_for(self, miles) -> np.ndarray:
+        """Return the station in meters for each mile, NaN outside the calibrated range."""
+        miles = np.asarray(miles, dtype=np.float64)
+        stations = np.interp(miles, self.control_miles, self.control_stations_m)
+        return np.where(self.covers(miles), stations, np.nan)
+
+    def miles_for(self, stations_m) -> np.ndarray:
+        """Inverse of :meth:`stations_for`: the PCT mile at each centerline station."""
+        return np.interp(np.asarray(stations_m, dtype=np.float64), self.control_stations_m, self.control_miles)
+
+    def locate(self, miles) -> Tuple[np.ndarray, np.ndarray]:
+        """Return ``(coords, covered)`` for a batch of PCT miles.
+
+        ``coords`` has one ``[lon, lat]`` row per mile; rows outside the
+        calibrated range are NaN and flagged ``False`` in ``covered``.
+        """
+        miles = np.asarray(miles, dtype=np.float64)
+        covered = self.covers(miles)
+        coords = np.full((miles.size, 2), np.nan)
+        if covered.any():
+            stations = np.interp(miles[covered], self.control_miles, self.control_stations_m)
+            coords[covered] = points_at_stations(self.coords[:, :2], self.stations_m, stations)
+        return coords, covered
@@ -1,60 +1,98 @@
-import csv, json
+import argparse
+import csv
 from pathlib import Path
+from typing import Optional, Sequence
 
-csv_path = Path('/tmp/pct_water_northern_ca.csv')
-# Use canonical runtime artifact for geometry snaps
-route_path = Path(__file__).parent.parent / "public" / "data" / "hike_data.json"
-
-route_data = json.loads(route_path.read_text())
-route_coords = route_data.get('route', {}).get('path', [])
-
-def find_nearest_coord(mile_target):
-    """Snap to route geometry using simple linear interpolation by index."""
-    if not route_coords or len(route_coords) < 2:
-        return None
-    # Active PCTA 2026 corridor: actual Burney Falls access to Ash Camp.
-    # The bundled Garmin geometry is cropped to this same trip.
-    section_start_mile = 1420.653
-    section_end_mile = 1472.497
-    section_length = section_end_mile - section_start_mile
-    if mile_target < section_start_mile or mile_target > section_end_mile:
-        return None
-    normalized = (mile_target - section_start_mile) / section_length
-    idx = int(normalized * (len(route_coords) - 1))
-    idx = max(0, min(idx, len(route_coords) - 1))
-    return route_coords[idx]
-
-water_sources = []
-with csv_path.open('r', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    for i, row in enumerate(reader):
-        if i < 9 or not row or len(row) < 4:
-            continue
-        try:
-            mile = float(row[1])
-        except (ValueError, IndexError):
-            continue
-        if mile < 1420 or mile > 1502:
+import route_data
+import route_trace
+
+REPO_ROOT = route_data.REPO_ROOT
+CSV_PATH = REPO_ROOT / "docs" / "data" / "source" / "pct-water-norcal-2026-08-02.csv"
+OUT_PATH = Path('/tmp/water_sources_section_o.json')
+
+
+def iter_report_records(lines, preamble=None):
+    """Yield the CSV records after the ``Map,Mile,Waypoint,...`` header row.
+
+    The preamble above the header varies in length between sheets and
+    revisions, so the header is found by its content. Records before it are
+    appended to ``preamble`` when a list is given.
+    """
+    reader = csv.reader(lines)
+    for row in reader:
+        if len(row) > 2 and row[1].strip() == 'Mile' and row[2].strip() == 'Waypoint':
+            break
+        if preamble is not None:
+            preamble.append(row)
+    yield from reader
+
+
+def iter_water_rows(csv_path):
+    """Stream ``(mile, waypoint, location, report)`` tuples from a pctwater CSV."""
+    with Path(csv_path).open('r', encoding='utf-8', newline='') as f:
+        for row in iter_report_records(f):
+            if len(row) < 4:
+                continue
+            try:
+                mile = float(row[1])
+            except (ValueError, IndexError):
+                continue
+            waypoint_id = row[2].strip() if len(row) > 2 else ''
+            location = row[3].strip() if len(row) > 3 else 'Water source'
+            report = row[4].strip() if len(row) > 4 else ''
+            yield mile, waypoint_id, location, report
+
+
+def snap_water_sources(rows, mile_index):
+    """Place every row on the centerline with one batched, marker-calibrated lookup."""
+    rows = list(rows)
+    coords, covered = mile_index.locate([row[0] for row in rows])
+    water_sources = []
+    for (mile, waypoint_id, location, report), coord, inside in zip(rows, coords.tolist(), covered.tolist()):
+        if not inside:
             continue
-        waypoint_id = row[2].strip() if len(row) > 2 else ''
-        location = row[3].strip() if len(row) > 3 else 'Water source'
-        report = row[4].strip() if len(row) > 4 else ''
-        coords = find_nearest_coord(mile)
-        if coords:
-            water_sources.append({
-                'mile': mile,
-                'waypoint': waypoint_id,
-                'name': location[:80],
-                'coordinates': coords,
-                'report': report[:200] if report else 'No recent update',
-                'type': 'water'
-            })
-
-print(f"Extracted {len(water_sources)} water sources between mile 1420-1502")
-for w in water_sources[:10]:
-    print(f"  Mile {w['mile']}: {w['name']}")
-print('...')
-
-out_path = Path('/tmp/water_sources_section_o.json')
-out_path.write_text(json.dumps(water_sources, indent=2))
-print(f"\nWrote {len(water_sources)} sources to {out_path}")
+        water_sources.append({
+            'mile': mile,
+            'waypoint': waypoint_id,
+            'name': location[:80],
+            'coordinates': [round(coord[0], 6), round(coord[1], 6)],
+            'report': report[:200] if report else 'No recent update',
+            'type': 'water'
+        })
+    return water_sources, len(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Snap PCT Water Report sources onto the PCTA centerline.")
+    parser.add_argument('--csv', type=Path, default=CSV_PATH, help='pctwater.com CSV export')
+    parser.add_argument('--centerline', type=Path, default=route_data.CENTERLINE_PATH,
+                        help='PCTA centerline GeoJSON with markerStations metadata')
+    parser.add_argument('--output', type=Path, default=OUT_PATH)
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    route_trace.configure(args)
+
+    with route_trace.span('centerline_load', path=str(args.centerline)):
+        mile_index = route_data.mile_index(args.centerline)
+    with route_trace.span('csv_parse', path=str(args.csv)) as span:
+        rows = list(iter_water_rows(args.csv))
+        span.count('rows', len(rows))
+        span.count('bytes_read', args.csv.stat().st_size)
+    with route_trace.span('snap') as span:
+        water_sources, total = snap_water_sources(rows, mile_index)
+        span.count('points', total)
+
+    print(
+        f"Extracted {len(water_sources)} of {total} water sources between mile "
+        f"{mile_index.start_mile:.3f}-{mile_index.end_mile:.3f}"
+    )
+    for w in water_sources[:10]:
+        print(f"  Mile {w['mile']}: {w['name']}")
+    print('...')
+
+    route_trace.dump_json(args.output, water_sources, indent=2)
+    print(f"\nWrote {len(water_sources)} sources to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""Scaling benchmarks for the Python route stages.
+
+A seeded generator builds realistic tracks (GPS-like 5-40 m steps, a
+correlated heading random walk, long ridges plus short rollers for
+elevation) from 1k to 10M vertices. From each track it writes matching GPX,
+FIT and pctwater CSV fixtures under ``.route-build/bench/fixtures``. Every
+``(stage, size)`` pair runs in a fresh interpreter, so peak RSS belongs to
+that stage alone. Results are saved as JSON and compared with a stored
+baseline. Any stage slower (or larger) than the tolerance fails the run with
+exit status 1, and so does a compare run with no baseline, or with a
+``(stage, size)`` pair the baseline never measured. The baseline lives under
+the gitignored build directory because timings only compare on one machine;
+save one per machine (or CI runner) before comparing.
+
+    python scripts/route_bench.py --sizes 1k,10k,100k --save-baseline
+    python scripts/route_bench.py --sizes 1k,10k,100k        # compare
+    python scripts/route_bench.py --sizes 10M --stages gpx_parse,fit_decode
+
+Linux only: peak RSS comes from ``getrusage``.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import struct
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import METERS_PER_DEG_LAT, METERS_PER_MILE
+
+ROOT = Path(__file__).resolve().parents[1]
+BENCH_DIR = ROOT / ".route-build" / "bench"
+FIXTURE_DIR = BENCH_DIR / "fixtures"
+RESULTS_PATH = BENCH_DIR / "results.json"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+START_LON, START_LAT, START_MILE = -121.653274, 41.011148, 1420.653
+DEFAULT_SIZES = "1k,10k,100k,1M"
+QUERY_COUNT = 10_000
+
+
+# -- synthetic fixtures ---------------------------------------------------------
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def synthetic_route(n: int, seed: int = 0) -> np.ndarray:
+    """Return ``(n, 3)`` ``[lon, lat, ele_m]`` rows of a plausible trail recording."""
+    rng = np.random.default_rng(seed)
+    steps = rng.uniform(5.0, 40.0, n - 1)
+    heading = np.cumsum(rng.normal(0.0, 0.15, n - 1)) + rng.uniform(0, 2 * np.pi)
+    north = np.concatenate(([0.0], np.cumsum(steps * np.cos(heading))))
+    east = np.concatenate(([0.0], np.cumsum(steps * np.sin(heading))))
+    lat = START_LAT + north / METERS_PER_DEG_LAT
+    lon = START_LON + east / (METERS_PER_DEG_LAT * np.cos(np.radians(lat)))
+    station = np.concatenate(([0.0], np.cumsum(steps)))
+    ele = (
+        1500.0
+        + 600.0 * np.sin(station / 8_000.0)
+        + 150.0 * np.sin(station / 1_300.0 + 1.0)
+        + np.cumsum(rng.normal(0.0, 0.3, n)).clip(-200, 200)
+    )
+    return np.column_stack((lon, lat, ele.clip(-80.0, 4400.0)))
+
+
+def write_gpx(path: Path, coords: np.ndarray, chunk: int = 100_000) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<gpx version="1.1" creator="route_bench" xmlns="http://www.topografix.com/GPX/1/1">\n'
+                     "<trk><name>Synthetic</name><trkseg>\n")
+        for start in range(0, len(coords), chunk):
+            handle.write("".join(
+                f'<trkpt lat="{lat:.7f}" lon="{lon:.7f}"><ele>{ele:.1f}</ele></trkpt>\n'
+                for lon, lat, ele in coords[start:start + chunk].tolist()
+            ))
+        handle.write("</trkseg></trk>\n</gpx>\n")
+
+
+def write_fit(path: Path, coords: np.ndarray) -> None:
+    """Write a FIT course: one record definition, then lat/lon/enhanced_altitude/distance rows."""
+    from fit_decoder import MESG_RECORD, fit_crc
+    from geodesy import cumulative_stations
+
+    definition = bytes([0x40, 0, 0]) + struct.pack("<HB", MESG_RECORD, 4)
+    definition += bytes([0, 4, 0x85, 1, 4, 0x85, 78, 4, 0x86, 5, 4, 0x86])
+    rows = np.zeros(len(coords), dtype=[("header", "u1"), ("lat", "<i4"), ("lon", "<i4"),
+                                        ("alt", "<u4"), ("distance", "<u4")])
+    rows["lat"] = np.rint(coords[:, 1] * 2**31 / 180.0)
+    rows["lon"] = np.rint(coords[:, 0] * 2**31 / 180.0)
+    rows["alt"] = np.rint((coords[:, 2] + 500.0) * 5.0)
+    rows["distance"] = np.rint(cumulative_stations(coords[:, 0], coords[:, 1]) * 100.0)
+    body = definition + rows.tobytes()
+    payload = struct.pack("<BBHI4s", 12, 0x10, 2132, len(body), b".FIT") + body
+    path.write_bytes(payload + struct.pack("<H", fit_crc(payload)))
+
+
+def write_water_csv(path: Path, coords: np.ndarray, rows: int, seed: int = 0) -> None:
+    """Write a pctwater-style CSV whose miles fall on the synthetic route."""
+    import csv
+    from geodesy import cumulative_stations
+
+    rng = np.random.default_rng(seed)
+    total_miles = cumulative_stations(coords[:, 0], coords[:, 1])[-1] / METERS_PER_MILE
+    miles = np.sort(START_MILE + rng.uniform(-0.05, 1.05, rows) * total_miles)
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        for line in range(8):
+            writer.writerow([f"Synthetic water report preamble {line}", "", "", "", "", "", ""])
+        writer.writerow(["Map", "Mile", "Waypoint", "Location", "Report", "Date", "Reported By"])
+        for index, mile in enumerate(miles.tolist()):
+            writer.writerow(["", f"{mile:.1f}", f"WA{index:06d}", f"Creek {index}",
+                             "08/01/26 (bench): Flowing\n07/02/25: Trickle", "8/1/26", "bench"])
+
+
+@dataclass(frozen=True)
+class Fixtures:
+    directory: Path
+
+    @property
+    def route(self) -> Path:
+        return self.directory / "route.npy"
+
+    @property
+    def gpx(self) -> Path:
+        return self.directory / "route.gpx"
+
+    @property
+    def fit(self) -> Path:
+        return self.directory / "route.fit"
+
+    @property
+    def water(self) -> Path:
+        return self.directory / "water.csv"
+
+
+def ensure_fixtures(n: int, seed: int = 0, root: Path = FIXTURE_DIR) -> Fixtures:
+    """Generate (once) the route, GPX, FIT and water CSV fixtures for ``n`` vertices."""
+    fixtures = Fixtures(root / f"{n}-seed{seed}")
+    paths = (fixtures.route, fixtures.gpx, fixtures.fit, fixtures.water)
+    if all(path.exists() for path in paths):
+        return fixtures
+    fixtures.directory.mkdir(parents=True, exist_ok=True)
+    coords = synthetic_route(n, seed)
+    np.save(fixtures.route, coords)
+    write_gpx(fixtures.gpx, coords)
+    write_fit(fixtures.fit, coords)
+    write_water_csv(fixtures.water, coords, rows=max(100, n // 100), seed=seed)
+    return fixtures
+
+
+# -- stages -------------------------------------------------------------------
+# Each stage is ``(setup, run)``: setup loads inputs outside the timed region
+# and run returns how many points it processed.
+
+
+def _load_route(fixtures: Fixtures) -> np.ndarray:
+    return np.load(fixtures.route)
+
+
+def _queries(coords: np.ndarray, count: int = QUERY_COUNT) -> np.ndarray:
+    rng = np.random.default_rng(1)
+    picks = coords[rng.integers(0, len(coords), count), :2]
+    return picks + rng.normal(0.0, 2e-4, picks.shape)
+
+
+def _run_gpx(path: Path) -> int:
+    from gpx_stream import read_gpx
+
+    return len(read_gpx(path)[0].coords)
+
+
+def _run_fit(path: Path) -> int:
+    from fit_decoder import decode_fit
+
+    return len(decode_fit(path)[0].coords)
+
+
+def _run_stations(coords: np.ndarray) -> int:
+    from geodesy import cumulative_stations
+
+    cumulative_stations(coords[:, 0], coords[:, 1])
+    return len(coords)
+
+
+def _setup_point_at_distance(fixtures: Fixtures):
+    from geodesy import cumulative_stations
+
+    coords = _load_route(fixtures)
+    stations = cumulative_stations(coords[:, 0], coords[:, 1])
+    targets = np.random.default_rng(2).uniform(0, stations[-1], min(len(coords), 1_000_000))
+    return coords[:, :2], stations, targets
+
+
+def _run_point_at_distance(state) -> int:
+    from geodesy import points_at_stations
+
+    values, stations, targets = state
+    points_at_stations(values, stations, targets)
+    return len(targets)
+
+
+def _setup_route_index(fixtures: Fixtures):
+    coords = _load_route(fixtures)
+    return coords, _queries(coords)
+
+
+def _run_route_index(state) -> int:
+    from route_index import RouteIndex
+
+    coords, queries = state
+    RouteIndex(coords).snap_many(queries[:, 0], queries[:, 1])
+    return len(coords)
+
+
+def _setup_water(fixtures: Fixtures):
+    from geodesy import cumulative_stations
+    from mile_index import MileIndex
+
+    coords = _load_route(fixtures)
+    stations = cumulative_stations(coords[:, 0], coords[:, 1])
+    miles = START_MILE + stations[[0, -1]] / METERS_PER_MILE
+    return fixtures.water, MileIndex(coords[:, :2], miles, stations[[0, -1]], stations)
+
+
+def _run_water(state) -> int:
+    from parse_water_csv import iter_water_rows, snap_water_sources
+
+    csv_path, mile_index = state
+    return snap_water_sources(iter_water_rows(csv_path), mile_index)[1]
+
+
+def _setup_metrics(fixtures: Fixtures):
+    from elevation_metrics import Profile
+    from geodesy import FEET_PER_METER, cumulative_stations
+
+    coords = _load_route(fixtures)
+    stations = cumulative_stations(coords[:, 0], coords[:, 1])
+    stops = np.linspace(0, stations[-1], 9)
+    return Profile(stations, coords[:, 2] * FEET_PER_METER, np.searchsorted(stations, stops).clip(0, len(stations) - 1))
+
+
+def _run_metrics(profile) -> int:
+    profile.metrics()
+    return len(profile.stations_m)
+
+
+def _setup_lod(fixtures: Fixtures):
+    from geodesy import FEET_PER_METER
+    from route_lod import Simplifier, route_arrays
+
+    coords = _load_route(fixtures)
+    return Simplifier(*route_arrays(np.column_stack((coords[:, :2], coords[:, 2] * FEET_PER_METER))))
+
+
+def _run_lod(simplifier) -> int:
+    from route_lod import DEFAULT_LEVELS
+
+    simplifier.levels(DEFAULT_LEVELS)
+    return len(simplifier.xy)
+
+
+def _setup_pyramid(fixtures: Fixtures):
+    from geodesy import FEET_PER_METER, cumulative_stations
+
+    coords = _load_route(fixtures)
+    return cumulative_stations(coords[:, 0], coords[:, 1]), coords[:, 2] * FEET_PER_METER
+
+
+def _run_pyramid(state) -> int:
+    from elevation_pyramid import ElevationPyramid
+
+    stations, elevations = state
+    pyramid = ElevationPyramid.build(stations, elevations)
+    pyramid.window(stations[0], stations[-1], 1000)
+    return len(stations)
+
+
+def _setup_deviation(fixtures: Fixtures):
+    from geodesy import cumulative_stations
+    from mile_index import MileIndex
+
+    coords = _load_route(fixtures)
+    stations = cumulative_stations(coords[:, 0], coords[:, 1])
+    miles = START_MILE + stations[[0, -1]] / METERS_PER_MILE
+    # A sparser recording of the same line with a few meters of GPS noise.
+    track = coords[::3, :2] + np.random.default_rng(3).normal(0.0, 3.0 / METERS_PER_DEG_LAT, (len(coords[::3]), 2))
+    return track, MileIndex(coords[:, :2], miles, stations[[0, -1]], stations)
+
+
+def _run_deviation(state) -> int:
+    from route_deviation import audit
+
+    track, mile_index = state
+    audit(track, mile_index, crop=False)
+    return len(track)
+
+
+def _setup_sections(fixtures: Fixtures):
+    from geodesy import cumulative_stations
+    from mile_index import MileIndex
+    from route_sections import split_sections
+
+    coords = _load_route(fixtures)
+    stations = cumulative_stations(coords[:, 0], coords[:, 1])
+    mile_index = MileIndex(coords[:, :2], START_MILE + stations[[0, -1]] / METERS_PER_MILE, stations[[0, -1]], stations)
+    sections = split_sections(mile_index.start_mile, mile_index.end_mile, (mile_index.end_mile - mile_index.start_mile) / 8)
+    return sections, mile_index, coords
+
+
+def _run_sections(state) -> int:
+    from route_sections import run_sections
+
+    sections, mile_index, coords = state
+    run_sections(sections, mile_index, track=coords)
+    return len(coords)
+
+
+def _setup_ownership(fixtures: Fixtures):
+    from land_ownership import ParcelIndex
+
+    coords = _load_route(fixtures)
+    # A 64 x 64 grid of octagonal parcels tiling the route's bounding box.
+    (west, south), (east, north) = coords[:, :2].min(axis=0), coords[:, :2].max(axis=0)
+    width, height = (east - west) / 64, (north - south) / 64
+    angles = np.linspace(0, 2 * np.pi, 9)
+    ring = np.column_stack((0.5 + 0.7 * np.cos(angles), 0.5 + 0.7 * np.sin(angles)))
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": [((ring + (col, row)) * (width, height) + (west, south)).tolist()]},
+            "properties": {"apn": f"{row}-{col}", "ownership": "public" if (row + col) % 3 else "private"},
+        }
+        for row in range(64)
+        for col in range(64)
+    ]
+    return ParcelIndex(features), coords[:, 0], coords[:, 1]
+
+
+def _run_ownership(state) -> int:
+    index, lons, lats = state
+    index.classify(lons, lats)
+    return len(lons)
+
+
+def _setup_itinerary(fixtures: Fixtures):
+    from itinerary_solver import Candidate
+
+    profile = _setup_metrics(fixtures)
+    miles = profile.stations_m[-1] / METERS_PER_MILE
+    # A candidate camp every half mile; a month on trail.
+    candidates = [Candidate(mile, "camp", "camp") for mile in np.arange(0.5, miles, 0.5).tolist()]
+    return profile, candidates, min(30, len(candidates))
+
+
+def _run_itinerary(state) -> int:
+    from itinerary_solver import ItinerarySolver
+
+    profile, candidates, days = state
+    ItinerarySolver(profile, candidates).plan(days)
+    return len(profile.stations_m)
+
+
+def _setup_live_match(fixtures: Fixtures):
+    from live_match import Fix
+
+    coords = _load_route(fixtures)
+    # Sixteen hikers walking the route together, each reporting every sixteenth vertex, ten seconds apart.
+    fixes = [Fix(f"hiker-{i % 16}", i * 10.0, lon, lat) for i, (lon, lat) in enumerate(coords[:, :2].tolist())]
+    return coords, fixes
+
+
+def _run_live_match(state) -> int:
+    from live_match import LiveMatcher
+
+    coords, fixes = state
+    for _ in LiveMatcher(coords).stream(fixes):
+        pass
+    return len(fixes)
+
+
+STAGES: Dict[str, Tuple[Callable[[Fixtures], object], Callable[[object], int]]] = {
+    "gpx_parse": (lambda fixtures: fixtures.gpx, _run_gpx),
+    "fit_decode": (lambda fixtures: fixtures.fit, _run_fit),
+    "stations": (_load_route, _run_stations),
+    "point_at_distance": (_setup_point_at_distance, _run_point_at_distance),
+    "route_index": (_setup_route_index, _run_route_index),
+    "water_csv": (_setup_water, _run_water),
+    "metrics": (_setup_metrics, _run_metrics),
+    "lod": (_setup_lod, _run_lod),
+    "pyramid": (_setup_pyramid, _run_pyramid),
+    "deviation": (_setup_deviation, _run_deviation),
+    "ownership": (_setup_ownership, _run_ownership),
+    "sections": (_setup_sections, _run_sections),
+    "itinerary": (_setup_itinerary, _run_itinerary),
+    "live_match": (_setup_live_match, _run_live_match),
+}
+
+
+# -- measurement ----------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class StageResult:
+    stage: str
+    size: int
+    points: int
+    seconds: float
+    points_per_second: float
+    peak_rss_mb: float
+    setup_rss_mb: float
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure(stage: str, fixtures: Fixtures, size: int, repeat: int = 3) -> StageResult:
+    """Time ``stage`` in this process: best of ``repeat`` runs after one setup."""
+    setup, run = STAGES[stage]
+    state = setup(fixtures)
+    setup_rss = _peak_rss_mb()
+    best = float("inf")
+    points = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        points = run(state)
+        best = min(best, time.perf_counter() - started)
+    return StageResult(stage, size, points, best, points / best if best > 0 else float("inf"),
+                       _peak_rss_mb(), setup_rss)
+
+
+def measure_isolated(stage: str, fixtures: Fixtures, size: int, repeat: int = 3,
+                     timeout: Optional[float] = None) -> StageResult:
+    """Run :func:`measure` in a fresh interpreter so peak RSS is the stage's own."""
+    completed = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", stage, str(size),
+         str(fixtures.directory), "--repeat", str(repeat)],
+        capture_output=True, text=True, timeout=timeout, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{stage} at {size:,} points failed:\n{completed.stderr.strip()}")
+    return StageResult(**json.loads(completed.stdout.strip().splitlines()[-1]))
+
+
+def environment() -> Dict[str, object]:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(
+    results: Sequence[StageResult],
+    baseline: Dict[str, object],
+    time_tolerance: float = 1.5,
+    rss_tolerance: float = 1.25,
+    min_seconds: float = 0.02,
+) -> List[str]:
+    """Return a message per ``(stage, size)`` that regressed against ``baseline``.
+
+    Timings below ``min_seconds`` in both runs are too noisy to judge and
+    only RSS is checked for them.
+    """
+    reference = {(entry["stage"], entry["size"]): entry for entry in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = reference.get((result.stage, result.size))
+        if before is None:
+            continue
+        label = f"{result.stage} @ {result.size:,}"
+        if max(result.seconds, before["seconds"]) >= min_seconds and result.seconds > before["seconds"] * time_tolerance:
+            regressions.append(f"{label}: {result.seconds:.4f}s vs baseline {before['seconds']:.4f}s "
+                               f"({result.seconds / before['seconds']:.2f}x)")
+        if result.peak_rss_mb > before["peak_rss_mb"] * rss_tolerance:
+            regressions.append(f"{label}: peak RSS {result.peak_rss_mb:.0f} MB vs baseline "
+                               f"{before['peak_rss_mb']:.0f} MB")
+    return regressions
+
+
+def unmeasured(results: Sequence[StageResult], baseline: Dict[str, object]) -> List[str]:
+    """Labels of the ``(stage, size)`` pairs in ``results`` that ``baseline`` lacks."""
+    reference = {(entry["stage"], entry["size"]) for entry in baseline.get("results", [])}
+    return [f"{result.stage} @ {result.size:,}" for result in results if (result.stage, result.size) not in reference]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Python route stages at increasing track sizes.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated vertex counts, e.g. 1k,10k,1M,10M")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"subset of {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the best time is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=1.5, help="allowed slowdown factor")
+    parser.add_argument("--rss-tolerance", type=float, default=1.25, help="allowed peak RSS growth factor")
+    parser.add_argument("--timeout", type=float, help="seconds allowed per stage run")
+    parser.add_argument("--worker", nargs=3, metavar=("STAGE", "SIZE", "FIXTURES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        stage, size, directory = args.worker
+        print(json.dumps(asdict(measure(stage, Fixtures(Path(directory)), int(size), args.repeat))))
+        return
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    results: List[StageResult] = []
+    print(f"{'stage':<18} {'size':>11} {'seconds':>10} {'points/s':>14} {'peak RSS':>10}")
+    for size in map(parse_size, args.sizes.split(",")):
+        fixtures = ensure_fixtures(size, args.seed)
+        for stage in stages:
+            result = measure_isolated(stage, fixtures, size, args.repeat, args.timeout)
+            results.append(result)
+            print(f"{stage:<18} {size:>11,} {result.seconds:>10.4f} {result.points_per_second:>14,.0f} "
+                  f"{result.peak_rss_mb:>7.0f} MB")
+
+    report = {"environment": environment(), "seed": args.seed, "results": [asdict(result) for result in results]}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nWrote {args.output}")
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; rerun with --save-baseline to create one.", file=sys.stderr)
+        raise SystemExit(1)
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    missing = unmeasured(results, baseline)
+    if missing:
+        print(f"\nNot in the baseline at {args.baseline} (rerun with --save-baseline):", file=sys.stderr)
+        for label in missing:
+            print(f"  {label}", file=sys.stderr)
+        raise SystemExit(1)
+    regressions = compare(results, baseline, args.time_tolerance, args.rss_tolerance)
+    if regressions:
+        print("\nREGRESSIONS against baseline:", file=sys.stderr)
+        for message in regressions:
+            print(f"  {message}", file=sys.stderr)
+        raise SystemExit(1)
+    print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Columnar, memory-mappable sidecar for route geometry.
+
+Route tooling mostly needs ``route.path`` as four float columns, yet every
+script used to ``json.load`` the whole bundle to get them. This module writes
+those columns once to ``<name>.route.bin`` next to the JSON and maps them back
+without parsing:
+
+* a fixed 96-byte header: magic, version, encoding, point count, the SHA-256
+  of the source JSON, and its size/mtime for a cheap staleness check;
+* four columns (``lon``, ``lat``, ``ele_ft``, ``station_mi``), either raw
+  little-endian float64 or delta-encoded int32 at fixed precision.
+
+Readers use ``numpy.memmap``; :func:`open_route_memoryview` maps float64
+sidecars with ``mmap`` + ``memoryview`` for callers that must not import NumPy.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+MAGIC = b"DDGROUTE"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQ32sQq24x")
+HEADER_SIZE = 96
+# Source size and mtime, rewritten in place when a touched source still hashes the same.
+SOURCE_STAT = struct.Struct("<Qq")
+SOURCE_STAT_OFFSET = struct.calcsize("<8sHHIQ32s")
+COLUMNS = ("lon", "lat", "ele_ft", "station_mi")
+
+ENCODING_FLOAT64 = 0
+ENCODING_DELTA32 = 1
+ENCODINGS = {"float64": ENCODING_FLOAT64, "delta32": ENCODING_DELTA32}
+# Fixed-point step per column for delta32: ~1 cm, 0.01 ft and ~1.6 mm.
+DELTA_SCALES = (1e-7, 1e-7, 1e-2, 1e-6)
+
+SIDECAR_SUFFIX = ".route.bin"
+
+assert HEADER.size == HEADER_SIZE
+
+
+class StaleSidecarError(RuntimeError):
+    """Raised when a sidecar no longer matches its source JSON."""
+
+
+@dataclass(frozen=True)
+class SidecarHeader:
+    encoding: int
+    count: int
+    sha256: str
+    source_size: int
+    source_mtime_ns: int
+
+
+@dataclass
+class RouteColumns:
+    """Route columns backed by a memory map (float64) or decoded arrays (delta32)."""
+
+    lon: np.ndarray
+    lat: np.ndarray
+    ele_ft: np.ndarray
+    station_mi: np.ndarray
+    header: SidecarHeader
+
+    def __len__(self) -> int:
+        return self.header.count
+
+    def as_path(self) -> np.ndarray:
+        """Return an ``(n, 4)`` array shaped like ``route.path`` rows."""
+        return np.column_stack((self.lon, self.lat, self.ele_ft, self.station_mi))
+
+
+def sidecar_path(json_path: Path) -> Path:
+    json_path = Path(json_path)
+    return json_path.with_name(json_path.stem + SIDECAR_SUFFIX)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def extract_columns(data: dict) -> np.ndarray:
+    """Return ``[lon, lat, ele_ft, station_mi]`` rows from a route bundle.
+
+    Accepts ``hike_data.json`` (``route.path`` rows) and the canonical terrain
+    contract (``points`` objects). Missing elevations or stations become NaN.
+    """
+    if "points" in data and "route" in data and "path" not in data["route"]:
+        points = data["points"]
+        columns = np.full((len(points), 4), np.nan)
+        for row, point in zip(columns, points):
+            row[0], row[1] = point["coordinates"][:2]
+            row[2] = point.get("normalizedElevationFeet", point.get("usgsElevationFeet", np.nan))
+            row[3] = point.get("routeMile", np.nan)
+        return columns
+    path = data["route"]["path"]
+    columns = np.full((len(path), 4), np.nan)
+    try:
+        rectangular = np.asarray(path, dtype=np.float64)
+    except ValueError:
+        rectangular = None
+    if rectangular is not None and rectangular.ndim == 2:
+        width = min(rectangular.shape[1], 4)
+        columns[:, :width] = rectangular[:, :width]
+        return columns
+    for row, point in zip(columns, path):
+        width = min(len(point), 4)
+        row[:width] = point[:width]
+    return columns
+
+
+def _layout(encoding: int, count: int) -> Tuple[int, ...]:
+    """Return the byte offset of each column after the header."""
+    if encoding == ENCODING_FLOAT64:
+        column_bytes = count * 8
+    else:
+        # int64 base value followed by ``count`` int32 deltas, 8-byte aligned.
+        column_bytes = 8 + ((count * 4 + 7) // 8) * 8
+    return tuple(HEADER_SIZE + index * column_bytes for index in range(len(COLUMNS)))
+
+
+def write_sidecar(json_path: Path, out_path: Optional[Path] = None, encoding: str = "float64") -> Path:
+    """Convert a route JSON bundle to a binary sidecar and return its path."""
+    json_path = Path(json_path)
+    out_path = Path(out_path) if out_path is not None else sidecar_path(json_path)
+    code = ENCODINGS[encoding]
+    raw = json_path.read_bytes()
+    stat = json_path.stat()
+    columns = extract_columns(json.loads(raw))
+    count = len(columns)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, code, 0, count, hashlib.sha256(raw).digest(), stat.st_size, stat.st_mtime_ns
+    )
+    tmp_path = out_path.with_name(out_path.name + ".tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(header)
+        for index in range(len(COLUMNS)):
+            column = columns[:, index]
+            if code == ENCODING_FLOAT64:
+                handle.write(column.astype("<f8").tobytes())
+                continue
+            if np.isnan(column).any():
+                raise ValueError(f"delta32 cannot encode missing {COLUMNS[index]} values; use float64")
+            fixed = np.rint(column / DELTA_SCALES[index]).astype(np.int64)
+            deltas = np.diff(fixed, prepend=fixed[0] if count else 0)
+            if count and np.abs(deltas).max() > np.iinfo(np.int32).max:
+                raise ValueError(f"{COLUMNS[index]} step exceeds int32 delta range; use float64")
+            handle.write(struct.pack("<q", int(fixed[0]) if count else 0))
+            body = deltas.astype("<i4").tobytes()
+            handle.write(body + b"\0" * (-len(body) % 8))
+    os.replace(tmp_path, out_path)
+    return out_path
+
+
+def read_header(path: Path) -> SidecarHeader:
+    with open(path, "rb") as handle:
+        raw = handle.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"{path} is too short to be a route sidecar")
+    magic, version, encoding, _, count, digest, size, mtime_ns = HEADER.unpack(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} route sidecar")
+    return SidecarHeader(encoding, count, digest.hex(), size, mtime_ns)
+
+
+def is_fresh(json_path: Path, path: Optional[Path] = None) -> bool:
+    """Return whether the sidecar still describes ``json_path``.
+
+    Size and mtime are compared first; only when they differ is the source
+    hashed, so an unchanged bundle is never read. A matching hash records the
+    new size and mtime in the header, so the next call takes the fast path.
+    """
+    path = Path(path) if path is not None else sidecar_path(json_path)
+    if not path.exists():
+        return False
+    header = read_header(path)
+    stat = Path(json_path).stat()
+    if stat.st_size == header.source_size and stat.st_mtime_ns == header.source_mtime_ns:
+        return True
+    if file_sha256(json_path) != header.sha256:
+        return False
+    try:
+        with open(path, "r+b") as handle:
+            handle.seek(SOURCE_STAT_OFFSET)
+            handle.write(SOURCE_STAT.pack(stat.st_size, stat.st_mtime_ns))
+    except OSError:
+        pass  # a read-only sidecar stays correct, just slower to check
+    return True
+
+
+def open_sidecar(path: Path) -> RouteColumns:
+    """Memory-map a sidecar's columns (delta32 columns are decoded on open)."""
+    header = read_header(path)
+    count = header.count
+    offsets = _layout(header.encoding, count)
+    arrays = []
+    if count == 0:
+        arrays = [np.empty(0, dtype=np.float64) for _ in COLUMNS]
+    elif header.encoding == ENCODING_FLOAT64:
+        for offset in offsets:
+            arrays.append(np.memmap(path, dtype="<f8", mode="r", offset=offset, shape=(count,)))
+    else:
+        for offset, scale in zip(offsets, DELTA_SCALES):
+            base = np.memmap(path, dtype="<i8", mode="r", offset=offset, shape=(1,))
+            deltas = np.memmap(path, dtype="<i4", mode="r", offset=offset + 8, shape=(count,))
+            arrays.append((int(base[0]) + np.cumsum(deltas, dtype=np.int64)) * scale)
+    return RouteColumns(*arrays, header=header)
+
+
+def open_route_memoryview(path: Path) -> Dict[str, memoryview]:
+    """Map a float64 sidecar with ``mmap`` and return one ``memoryview`` per column."""
+    header = read_header(path)
+    if header.encoding != ENCODING_FLOAT64:
+        raise ValueError("memoryview access requires a float64 sidecar")
+    if sys.byteorder != "little":
+        raise ValueError("memoryview access requires a little-endian host")
+    with open(path, "rb") as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    size = header.count * 8
+    return {
+        name: view[offset:offset + size].cast("d")
+        for name, offset in zip(COLUMNS, _layout(header.encoding, header.count))
+    }
+
+
+def load_route_columns(json_path: Path, encoding: str = "float64", refresh: bool = True) -> RouteColumns:
+    """Open the sidecar for ``json_path``, (re)building it first if it is stale."""
+    path = sidecar_path(json_path)
+    if not is_fresh(json_path, path):
+        if not refresh:
+            raise StaleSidecarError(f"{path} is missing or older than {json_path}")
+        write_sidecar(json_path, path, encoding)
+    return open_sidecar(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write columnar .route.bin sidecars for route JSON bundles.")
+    parser.add_argument("json_paths", nargs="+", type=Path)
+    parser.add_argument("--encoding", choices=sorted(ENCODINGS), default="float64")
+    args = parser.parse_args()
+    for json_path in args.json_paths:
+        out_path = write_sidecar(json_path, encoding=args.encoding)
+        header = read_header(out_path)
+        print(
+            f"{json_path} -> {out_path} ({header.count} points, "
+            f"{out_path.stat().st_size / 1024:.0f} KB, sha256 {header.sha256[:12]})"
+        )
+
+
+if __name__ == "__main__":
+    main()
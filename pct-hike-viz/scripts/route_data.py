@@ -0,0 +1,73 @@
+"""Per-process memo of the parsed inputs that the scripts share.
+
+Each loader returns the same object for the same file until the file
+changes on disk, judged by its size and modification time. Subcommands
+chained in one ``hike_cli.py`` process therefore parse ``hike_data.json``,
+the canonical terrain and the centerline once between them. Results are
+shared, so callers treat them as read-only. A script that rewrites a file,
+like ``snap_camps_to_route.py``, loads its own copy with
+:func:`route_trace.load_json`.
+
+Only the standard library is imported here. NumPy and the route modules are
+imported by the loaders that need them, so importing this module costs
+nothing at startup.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Callable, Dict, Tuple, TypeVar
+
+ROOT = Path(__file__).resolve().parents[1]
+REPO_ROOT = ROOT.parent
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+CANONICAL_TERRAIN_PATH = REPO_ROOT / "docs" / "data" / "canonical" / "burney-ash-terrain-2026.json"
+CENTERLINE_PATH = REPO_ROOT / "docs" / "data" / "source" / "pcta-centerline-2026-burney-ash.geojson"
+
+T = TypeVar("T")
+_memo: Dict[Tuple[str, str], Tuple[Tuple[int, int], object]] = {}
+
+
+def memoized(kind: str, path, load: Callable[[Path], T]) -> T:
+    """``load(path)``, reused while ``path`` keeps its size and modification time."""
+    path = Path(path).resolve()
+    stat = os.stat(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _memo.get((kind, str(path)))
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    value = load(path)
+    _memo[(kind, str(path))] = (stamp, value)
+    return value
+
+
+def clear() -> None:
+    _memo.clear()
+
+
+def hike_data(path=HIKE_DATA_PATH) -> dict:
+    """The parsed ``hike_data.json`` bundle."""
+    import route_trace
+
+    return memoized("json", path, route_trace.load_json)
+
+
+def route_columns(path=HIKE_DATA_PATH):
+    """The memory-mapped :mod:`route_binary` columns for a route bundle."""
+    from route_binary import load_route_columns
+
+    return memoized("columns", path, load_route_columns)
+
+
+def canonical_profile(path=CANONICAL_TERRAIN_PATH):
+    """The canonical 25 m :class:`elevation_metrics.Profile`."""
+    from elevation_metrics import Profile
+
+    return memoized("profile", path, Profile.from_canonical)
+
+
+def mile_index(path=CENTERLINE_PATH):
+    """The marker-calibrated :class:`mile_index.MileIndex` for a centerline GeoJSON."""
+    from mile_index import MileIndex
+
+    return memoized("mile_index", path, MileIndex.from_centerline_geojson)
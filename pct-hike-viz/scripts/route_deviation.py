@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Where does a Garmin track leave the PCTA centerline, and by how much?
+
+``validate_stats.py`` only checks total length and end elevations. This audit
+compares the track with the centerline along its whole length:
+
+- the lateral offset of every track vertex from the centerline, with the PCT
+  mile it lies beside (one batched :class:`route_index.RouteIndex` query);
+- the discrete Hausdorff distance in both directions (batched nearest-vertex
+  queries on an index over each line);
+- the discrete Fréchet distance, which also respects the order of travel;
+- each contiguous run of vertices further than ``threshold_m`` off route.
+
+The Fréchet dynamic program only fills cells within ``band_m`` of where each
+track vertex projects onto the centerline. Any coupling it finds is a real
+one, so the result is an upper bound. It is reported as exact when it equals
+the Hausdorff/endpoint lower bound, which is the usual case for tracks that
+follow the trail.
+
+    python scripts/route_deviation.py                        # alternate GPX vs centerline
+    python scripts/route_deviation.py --track COURSE.fit --threshold 20
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from geodesy import as_coords, haversine
+from mile_index import DEFAULT_CENTERLINE_PATH, REPO_ROOT, MileIndex
+from route_index import RouteIndex
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+TRACK_PATH = REPO_ROOT / "docs" / "data" / "source" / "garmin-section-o-alternate.gpx"
+REPORT_PATH = ROOT / ".route-build" / "reports" / "route_deviation.json"
+
+OFF_ROUTE_THRESHOLD_M = 30.0
+FRECHET_BAND_M = 250.0
+_FRECHET_BLOCK = 1 << 18
+_MEDIAN_WINDOW = 9
+
+
+@dataclass(frozen=True)
+class OffRouteSpan:
+    first: int
+    last: int
+    start_mile: float
+    end_mile: float
+    length_m: float
+    max_offset_m: float
+
+    @property
+    def points(self) -> int:
+        return self.last - self.first + 1
+
+
+@dataclass(frozen=True)
+class DeviationReport:
+    track_stations_m: np.ndarray
+    pct_miles: np.ndarray
+    offsets_m: np.ndarray
+    hausdorff_track_m: float
+    hausdorff_centerline_m: float
+    frechet_m: float
+    frechet_exact: bool
+    spans: Tuple[OffRouteSpan, ...]
+    threshold_m: float
+    band_m: float
+    crop: Tuple[int, int]
+
+    @property
+    def hausdorff_m(self) -> float:
+        return max(self.hausdorff_track_m, self.hausdorff_centerline_m)
+
+    def to_payload(self) -> dict:
+        worst = int(np.argmax(self.offsets_m))
+        return {
+            "trackPoints": len(self.offsets_m),
+            "crop": list(self.crop),
+            "thresholdMeters": self.threshold_m,
+            "offset": {
+                "meanMeters": round(float(self.offsets_m.mean()), 2),
+                "medianMeters": round(float(np.median(self.offsets_m)), 2),
+                "p95Meters": round(float(np.percentile(self.offsets_m, 95)), 2),
+                "maxMeters": round(float(self.offsets_m[worst]), 2),
+                "maxAtPctMile": round(float(self.pct_miles[worst]), 3),
+            },
+            "hausdorff": {
+                "meters": round(self.hausdorff_m, 2),
+                "trackToCenterlineMeters": round(self.hausdorff_track_m, 2),
+                "centerlineToTrackMeters": round(self.hausdorff_centerline_m, 2),
+            },
+            "frechet": {"meters": round(self.frechet_m, 2), "exact": self.frechet_exact, "bandMeters": self.band_m},
+            "offRouteSpans": [
+                {
+                    "startPctMile": round(span.start_mile, 3),
+                    "endPctMile": round(span.end_mile, 3),
+                    "lengthMeters": round(span.length_m, 1),
+                    "maxOffsetMeters": round(span.max_offset_m, 2),
+                    "points": span.points,
+                }
+                for span in self.spans
+            ],
+            "stations": {
+                "trackStationMeters": np.round(self.track_stations_m, 1).tolist(),
+                "pctMile": np.round(self.pct_miles, 4).tolist(),
+                "offsetMeters": np.round(self.offsets_m, 2).tolist(),
+            },
+        }
+
+
+def read_track(path: Path) -> np.ndarray:
+    """``[lon, lat, ele_m]`` rows from a GPX or FIT file."""
+    if Path(path).suffix.lower() == ".fit":
+        from fit_decoder import decode_fit
+
+        course, _ = decode_fit(path)
+        return course.coords
+    from gpx_stream import read_gpx
+
+    gpx, _ = read_gpx(path)
+    return gpx.coords
+
+
+def crop_to_centerline(track: np.ndarray, centerline: np.ndarray) -> Tuple[int, int]:
+    """Track vertex indices nearest the centerline's first and last vertex."""
+    ends, _ = RouteIndex(track).nearest_vertices(centerline[[0, -1], 0], centerline[[0, -1], 1])
+    first, last = int(ends[0]), int(ends[1])
+    if last <= first:
+        raise ValueError("track does not run from the centerline start to its finish")
+    return first, last
+
+
+def off_route_spans(offsets_m, track_stations_m, pct_miles, threshold_m: float) -> List[OffRouteSpan]:
+    """Maximal runs of consecutive vertices whose offset exceeds ``threshold_m``."""
+    off = np.asarray(offsets_m) > threshold_m
+    edges = np.diff(np.concatenate(([0], off.view(np.int8), [0])))
+    firsts = np.flatnonzero(edges == 1)
+    lasts = np.flatnonzero(edges == -1) - 1
+    return [
+        OffRouteSpan(
+            int(first), int(last), float(pct_miles[first]), float(pct_miles[last]),
+            float(track_stations_m[last] - track_stations_m[first]), float(offsets_m[first:last + 1].max()),
+        )
+        for first, last in zip(firsts.tolist(), lasts.tolist())
+    ]
+
+
+def frechet_band(projected_m, centerline_stations_m, band_m: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Monotone ``[lo, hi]`` centerline column ranges, one per track vertex.
+
+    Columns are the centerline vertices within ``band_m`` of the vertex's
+    projected station. Projections are median-filtered first, so a vertex
+    snapped onto the other side of a switchback or crossing cannot widen
+    the band for every row around it. Bounds are then made non-decreasing,
+    and adjacent rows overlap, so a monotone coupling from corner to corner
+    exists.
+    """
+    projected_m = np.asarray(projected_m, dtype=np.float64)
+    if len(projected_m) > _MEDIAN_WINDOW:
+        half = _MEDIAN_WINDOW // 2
+        padded = np.pad(projected_m, half, mode="edge")
+        projected_m = np.median(np.lib.stride_tricks.sliding_window_view(padded, _MEDIAN_WINDOW), axis=1)
+    lo = np.searchsorted(centerline_stations_m, projected_m - band_m)
+    hi = np.searchsorted(centerline_stations_m, projected_m + band_m, side="right") - 1
+    lo = np.minimum.accumulate(lo[::-1])[::-1]
+    lo[0] = 0
+    hi[-1] = len(centerline_stations_m) - 1
+    hi[:-1] = np.maximum(hi[:-1], lo[1:] - 1)
+    hi = np.maximum(np.maximum.accumulate(hi), lo)
+    return lo, hi
+
+
+def discrete_frechet(p: np.ndarray, q: np.ndarray, lo: Optional[np.ndarray] = None,
+                     hi: Optional[np.ndarray] = None) -> float:
+    """Discrete Fréchet distance in meters between ``[lon, lat]`` rows ``p`` and ``q``.
+
+    Row ``i`` of the dynamic program only spans columns ``lo[i]..hi[i]``
+    (default: all of ``q``). Within a row the recurrence
+    ``c[j] = max(d[j], min(a[j], c[j - 1]))`` composes clamp functions,
+    ``x -> clamp(x, d[j], max(d[j], a[j]))``. A doubling scan therefore
+    solves each row in O(width log width) array operations.
+    """
+    n, m = len(p), len(q)
+    lo = np.zeros(n, dtype=np.intp) if lo is None else np.asarray(lo, dtype=np.intp)
+    hi = np.full(n, m - 1, dtype=np.intp) if hi is None else np.asarray(hi, dtype=np.intp)
+    widths = hi - lo + 1
+    offsets = np.concatenate(([0], np.cumsum(widths)))
+    block_start = block_stop = 0
+    distances = np.empty(0)
+
+    previous = None
+    for i in range(n):
+        a, b = int(lo[i]), int(hi[i]) + 1
+        if i == block_stop:
+            # Cell distances for as many rows as fit in _FRECHET_BLOCK cells.
+            block_start = i
+            block_stop = max(i + 1, int(np.searchsorted(offsets, offsets[i] + _FRECHET_BLOCK, side="right")) - 1)
+            block_stop = min(block_stop, n)
+            span = widths[block_start:block_stop]
+            rows = np.repeat(np.arange(block_start, block_stop), span)
+            cols = np.arange(offsets[block_stop] - offsets[block_start]) - np.repeat(
+                offsets[block_start:block_stop] - offsets[block_start] - lo[block_start:block_stop], span
+            )
+            distances = haversine(p[rows, 0], p[rows, 1], q[cols, 0], q[cols, 1])
+        d = distances[offsets[i] - offsets[block_start]:offsets[i + 1] - offsets[block_start]]
+        if previous is None:
+            previous = np.maximum.accumulate(d)
+            continue
+        # Previous row over columns a - 1 .. b - 1, inf outside its band.
+        above = np.full(b - a + 1, np.inf)
+        first, stop = max(a - 1, int(lo[i - 1])), min(b, int(hi[i - 1]) + 1)
+        if stop > first:
+            above[first - a + 1:stop - a + 1] = previous[first - lo[i - 1]:stop - lo[i - 1]]
+        low, high = d, np.maximum(d, np.minimum(above[1:], above[:-1]))
+        step = 1
+        while step < len(d):
+            low, high = (
+                np.concatenate((low[:step], np.minimum(np.maximum(low[:-step], low[step:]), high[step:]))),
+                np.concatenate((high[:step], np.minimum(np.maximum(high[:-step], low[step:]), high[step:]))),
+            )
+            step *= 2
+        previous = high
+    return float(previous[-1])
+
+
+def audit(track, mile_index: MileIndex, threshold_m: float = OFF_ROUTE_THRESHOLD_M,
+          band_m: float = FRECHET_BAND_M, crop: bool = True) -> DeviationReport:
+    """Compare ``[lon, lat, ...]`` track rows with the centerline held by ``mile_index``."""
+    track = as_coords(track)
+    centerline = mile_index.coords
+    first, last = crop_to_centerline(track, centerline) if crop else (0, len(track) - 1)
+    track = track[first:last + 1]
+
+    centerline_index = RouteIndex(centerline, stations_m=mile_index.stations_m)
+    track_index = RouteIndex(track)
+    with route_trace.span("offsets") as span:
+        hits = centerline_index.nearest_segments(track[:, 0], track[:, 1])
+        span.count("points", len(track))
+    with route_trace.span("hausdorff") as span:
+        _, track_to_centerline = centerline_index.nearest_vertices(track[:, 0], track[:, 1])
+        _, centerline_to_track = track_index.nearest_vertices(centerline[:, 0], centerline[:, 1])
+        span.count("points", len(track) + len(centerline))
+    with route_trace.span("frechet") as span:
+        lo, hi = frechet_band(hits.station_m, mile_index.stations_m, band_m)
+        frechet = discrete_frechet(track, centerline, lo, hi)
+        span.count("cells", int((hi - lo + 1).sum()))
+
+    lower_bound = max(
+        float(track_to_centerline.max()), float(centerline_to_track.max()),
+        float(haversine(*track[0, :2], *centerline[0, :2])), float(haversine(*track[-1, :2], *centerline[-1, :2])),
+    )
+    stations = track_index.stations_m
+    miles = mile_index.miles_for(hits.station_m)
+    return DeviationReport(
+        stations, miles, hits.distance_m,
+        float(track_to_centerline.max()), float(centerline_to_track.max()),
+        frechet, bool(np.isclose(frechet, lower_bound)),
+        tuple(off_route_spans(hits.distance_m, stations, miles, threshold_m)),
+        float(threshold_m), float(band_m), (first, last),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Audit where a GPX/FIT track departs from the PCTA centerline.")
+    parser.add_argument("--track", type=Path, default=TRACK_PATH, help="GPX or FIT track")
+    parser.add_argument("--centerline", type=Path, default=DEFAULT_CENTERLINE_PATH)
+    parser.add_argument("--threshold", type=float, default=OFF_ROUTE_THRESHOLD_M, help="off-route offset in meters")
+    parser.add_argument("--band", type=float, default=FRECHET_BAND_M, help="Fréchet search band in meters")
+    parser.add_argument("--no-crop", action="store_true", help="keep track points beyond the centerline ends")
+    parser.add_argument("--output", type=Path, default=REPORT_PATH)
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    with route_trace.span("load") as span:
+        track = read_track(args.track)
+        mile_index = MileIndex.from_centerline_geojson(args.centerline)
+        span.count("points", len(track) + len(mile_index.coords))
+    report = audit(track, mile_index, args.threshold, args.band, crop=not args.no_crop)
+    payload = {"track": str(args.track), "centerline": str(args.centerline), **report.to_payload()}
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    route_trace.dump_json(args.output, payload, indent=2)
+
+    offset = payload["offset"]
+    print(f"{payload['trackPoints']:,} track points (vertices {report.crop[0]}-{report.crop[1]}) "
+          f"over {report.track_stations_m[-1] / 1000:.1f} km")
+    print(f"Lateral offset: mean {offset['meanMeters']} m, p95 {offset['p95Meters']} m, "
+          f"max {offset['maxMeters']} m at PCT mile {offset['maxAtPctMile']}")
+    print(f"Hausdorff: {report.hausdorff_m:.2f} m   Fréchet: {report.frechet_m:.2f} m"
+          f"{'' if report.frechet_exact else ' (upper bound)'}")
+    print(f"{len(report.spans)} span(s) more than {args.threshold:g} m off route")
+    for span in report.spans:
+        print(f"  PCT {span.start_mile:.3f}-{span.end_mile:.3f}: {span.length_m:,.0f} m, "
+              f"max {span.max_offset_m:.1f} m over {span.points} point(s)")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
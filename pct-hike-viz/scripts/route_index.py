@@ -0,0 +1,433 @@
+"""Reusable spatial index over a route polyline.
+
+Segments and vertices are bucketed into a sparse uniform grid laid out in the
+route's :class:`geodesy.LocalProjection`. Only occupied cells are stored, as a
+sorted key array plus CSR offsets, so a full-trail centerline costs memory in
+proportion to its length rather than its bounding box. A query binary-searches
+the cell keys of growing square rings around the point and stops as soon as no
+unvisited ring can hold anything closer, so its cost depends on local vertex
+density, not on route length.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import LocalProjection, as_coords, cumulative_stations, haversine
+
+# Grid keys pack (ix, iy) into one int64; offsetting keeps both halves positive.
+_KEY_OFFSET = 1 << 30
+_KEY_STRIDE = 1 << 31
+
+# Batched queries search this many grid rings before falling back to run boxes,
+# and are processed this many at a time to bound temporary arrays.
+_BATCH_RINGS = 3
+_BATCH_QUERIES = 4096
+# Windowed queries project at most this many (query, segment) pairs per batch.
+_WINDOW_ITEMS = 1 << 18
+
+
+@dataclass(frozen=True)
+class SegmentHit:
+    """Closest point on the route to a query location."""
+
+    segment: int
+    fraction: float
+    lon: float
+    lat: float
+    distance_m: float
+    station_m: float
+
+
+@dataclass(frozen=True)
+class SegmentHits:
+    """Closest route points for a batch of query locations, one array entry per query."""
+
+    segment: np.ndarray
+    fraction: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+    distance_m: np.ndarray
+    station_m: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.segment)
+
+
+def _keys(ix: np.ndarray, iy: np.ndarray) -> np.ndarray:
+    return (iy.astype(np.int64) + _KEY_OFFSET) * _KEY_STRIDE + (ix.astype(np.int64) + _KEY_OFFSET)
+
+
+def _bucket(keys: np.ndarray, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Group ``ids`` by ``keys`` into (sorted unique keys, CSR starts, ids)."""
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    ids = ids[order]
+    unique, starts = np.unique(keys, return_index=True)
+    starts = np.append(starts, len(keys)).astype(np.int64)
+    return unique, starts, ids
+
+
+class RouteIndex:
+    """Grid index answering nearest-vertex, k-nearest and nearest-segment queries.
+
+    Build once per route and reuse it for every waypoint or live fix. Distances
+    returned by queries are haversine meters; the search itself runs in the
+    planar projection.
+    """
+
+    def __init__(
+        self,
+        path: Sequence[Sequence[float]] | np.ndarray,
+        cell_size: Optional[float] = None,
+        stations_m: Optional[np.ndarray] = None,
+    ) -> None:
+        self.coords = as_coords(path)
+        if len(self.coords) < 2:
+            raise ValueError("A route index needs at least two vertices")
+        self.projection = LocalProjection.from_path(self.coords)
+        self.xy = self.projection.project(self.coords)
+        self.stations_m = (
+            np.asarray(stations_m, dtype=np.float64)
+            if stations_m is not None
+            else cumulative_stations(self.coords[:, 0], self.coords[:, 1])
+        )
+
+        seg_start = self.xy[:-1]
+        seg_delta = self.xy[1:] - seg_start
+        self._seg_start = seg_start
+        self._seg_delta = seg_delta
+        self._seg_len2 = np.einsum("ij,ij->i", seg_delta, seg_delta)
+
+        if cell_size is None:
+            positive = np.sqrt(self._seg_len2[self._seg_len2 > 0])
+            cell_size = 4.0 * float(np.median(positive)) if positive.size else 1.0
+        self.cell_size = max(float(cell_size), 1e-6)
+
+        cells = np.floor(self.xy / self.cell_size).astype(np.int64)
+        self._vertex_keys, self._vertex_starts, self._vertex_ids = _bucket(
+            _keys(cells[:, 0], cells[:, 1]), np.arange(len(cells), dtype=np.int64)
+        )
+
+        # Each segment is registered in every cell its bounding box touches.
+        lo = np.minimum(cells[:-1], cells[1:])
+        hi = np.maximum(cells[:-1], cells[1:])
+        width = hi[:, 0] - lo[:, 0] + 1
+        counts = width * (hi[:, 1] - lo[:, 1] + 1)
+        seg_ids = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+        local = np.arange(counts.sum(), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+        ix = lo[seg_ids, 0] + local % width[seg_ids]
+        iy = lo[seg_ids, 1] + local // width[seg_ids]
+        self._seg_keys, self._seg_starts, self._seg_ids = _bucket(_keys(ix, iy), seg_ids)
+
+        self._min_cell = cells.min(axis=0)
+        self._max_cell = cells.max(axis=0)
+        self._runs: dict = {}
+
+    @classmethod
+    def from_path(cls, path: Sequence[Sequence[float]] | np.ndarray, **kwargs) -> "RouteIndex":
+        return cls(path, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    # -- ring search -----------------------------------------------------
+
+    def _ring_keys(self, cx: int, cy: int, radius: int) -> np.ndarray:
+        if radius == 0:
+            return _keys(np.array([cx]), np.array([cy]))
+        span = np.arange(-radius, radius + 1)
+        inner = span[1:-1]
+        ix = np.concatenate((cx + span, cx + span, np.full(inner.size, cx - radius), np.full(inner.size, cx + radius)))
+        iy = np.concatenate((np.full(span.size, cy - radius), np.full(span.size, cy + radius), cy + inner, cy + inner))
+        inside = (
+            (ix >= self._min_cell[0]) & (ix <= self._max_cell[0])
+            & (iy >= self._min_cell[1]) & (iy <= self._max_cell[1])
+        )
+        return _keys(ix[inside], iy[inside])
+
+    @staticmethod
+    def _gather(keys: np.ndarray, starts: np.ndarray, ids: np.ndarray, wanted: np.ndarray) -> np.ndarray:
+        pos = np.searchsorted(keys, wanted)
+        valid = pos < len(keys)
+        pos = pos[valid]
+        pos = pos[keys[pos] == wanted[valid]]
+        if pos.size == 0:
+            return pos
+        return np.concatenate([ids[starts[p]:starts[p + 1]] for p in pos.tolist()])
+
+    def _rings(self, x: float, y: float):
+        """Yield ``(cx, cy, radius, bound)`` for every ring that can intersect the grid.
+
+        ``bound`` is the planar distance below which every unvisited ring lies
+        once this ring has been searched.
+        """
+        cx = int(np.floor(x / self.cell_size))
+        cy = int(np.floor(y / self.cell_size))
+        gap = max(
+            self._min_cell[0] - cx, cx - self._max_cell[0],
+            self._min_cell[1] - cy, cy - self._max_cell[1], 0,
+        )
+        reach = max(
+            abs(cx - self._min_cell[0]), abs(cx - self._max_cell[0]),
+            abs(cy - self._min_cell[1]), abs(cy - self._max_cell[1]),
+        )
+        for radius in range(int(gap), int(reach) + 1):
+            yield cx, cy, radius, radius * self.cell_size
+
+    # -- queries ---------------------------------------------------------
+
+    def k_nearest_vertices(self, lon: float, lat: float, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the ``k`` closest vertex indices and their haversine meters."""
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        k = min(int(k), len(self.coords))
+        x, y = (float(v) for v in self.projection.to_xy(lon, lat))
+        found = np.empty(0, dtype=np.int64)
+        found_d2 = np.empty(0, dtype=np.float64)
+        for cx, cy, radius, bound in self._rings(x, y):
+            ring = self._ring_keys(cx, cy, radius)
+            ids = self._gather(self._vertex_keys, self._vertex_starts, self._vertex_ids, ring)
+            if ids.size:
+                d2 = (self.xy[ids, 0] - x) ** 2 + (self.xy[ids, 1] - y) ** 2
+                found = np.concatenate((found, ids))
+                found_d2 = np.concatenate((found_d2, d2))
+                if found.size > k:
+                    keep = np.argpartition(found_d2, k - 1)[:k]
+                    found, found_d2 = found[keep], found_d2[keep]
+            if found.size == k and found_d2.max() <= bound * bound:
+                break
+        order = np.argsort(found_d2, kind="stable")
+        found = found[order]
+        meters = haversine(lon, lat, self.coords[found, 0], self.coords[found, 1])
+        return found, np.asarray(meters, dtype=np.float64)
+
+    def nearest_vertex(self, lon: float, lat: float) -> Tuple[int, float]:
+        """Return ``(index, meters)`` of the closest route vertex."""
+        indices, meters = self.k_nearest_vertices(lon, lat, 1)
+        return int(indices[0]), float(meters[0])
+
+    def nearest_segment(self, lon: float, lat: float, max_distance_m: Optional[float] = None) -> Optional[SegmentHit]:
+        """Return the closest point on any route segment, or ``None`` beyond ``max_distance_m``."""
+        x, y = (float(v) for v in self.projection.to_xy(lon, lat))
+        best_seg = -1
+        best_t = 0.0
+        best_d2 = np.inf
+        for cx, cy, radius, bound in self._rings(x, y):
+            if max_distance_m is not None and bound > max_distance_m:
+                break
+            ring = self._ring_keys(cx, cy, radius)
+            ids = self._gather(self._seg_keys, self._seg_starts, self._seg_ids, ring)
+            if ids.size:
+                t, d2 = self._project(ids, x, y)
+                pick = int(np.argmin(d2))
+                if d2[pick] < best_d2:
+                    best_seg, best_t, best_d2 = int(ids[pick]), float(t[pick]), float(d2[pick])
+            if best_seg >= 0 and best_d2 <= bound * bound:
+                break
+        if best_seg < 0:
+            return None
+        return self._hit(best_seg, best_t, lon, lat, max_distance_m)
+
+    def nearest_vertices(self, lons, lats) -> Tuple[np.ndarray, np.ndarray]:
+        """Batched :meth:`nearest_vertex`: ``(indices, meters)`` arrays, one entry per query."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        x, y = (np.atleast_1d(v) for v in self.projection.to_xy(lons, lats))
+        found, _, _ = self._search_many(
+            x, y, "vertex", self._vertex_d2
+        )
+        return found, haversine(lons, lats, self.coords[found, 0], self.coords[found, 1])
+
+    def nearest_segments(self, lons, lats) -> SegmentHits:
+        """Batched :meth:`nearest_segment` without a distance limit.
+
+        Every query walks the same grid rings together, so the per-ring work is
+        a handful of array operations however many queries there are.
+        """
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        x, y = (np.atleast_1d(v) for v in self.projection.to_xy(lons, lats))
+        segment, fraction, _ = self._search_many(
+            x, y, "segment", self._project
+        )
+        return self._segment_hits(lons, lats, segment, fraction)
+
+    def nearest_segments_between(self, lons, lats, first, last) -> SegmentHits:
+        """Batched nearest point restricted to segments ``first[q] <= s < last[q]`` for query ``q``.
+
+        A tracker that knows roughly where each query should be uses this to
+        search only that stretch of the route, which keeps a fix on the right
+        leg where the route doubles back near itself. Every query's window
+        is projected in one ragged batch of at most :data:`_WINDOW_ITEMS`
+        segment-query pairs at a time.
+        """
+        lons = np.atleast_1d(np.asarray(lons, dtype=np.float64))
+        lats = np.atleast_1d(np.asarray(lats, dtype=np.float64))
+        x, y = (np.atleast_1d(v) for v in self.projection.to_xy(lons, lats))
+        first = np.clip(np.asarray(first, dtype=np.int64), 0, len(self.coords) - 2)
+        last = np.clip(np.asarray(last, dtype=np.int64), first + 1, len(self.coords) - 1)
+        counts = last - first
+        segment = np.zeros(len(x), dtype=np.int64)
+        fraction = np.zeros(len(x))
+        ends = np.cumsum(counts)
+        begin = 0
+        while begin < len(x):
+            base = ends[begin] - counts[begin]
+            end = max(int(np.searchsorted(ends, base + _WINDOW_ITEMS, side="right")), begin + 1)
+            chunk = counts[begin:end]
+            offsets = np.cumsum(chunk) - chunk
+            query = np.repeat(np.arange(begin, end), chunk)
+            item = np.repeat(first[begin:end] - offsets, chunk) + np.arange(chunk.sum())
+            t, d2 = self._project(item, x[query], y[query])
+            # Each query's window is contiguous: its first minimum is the first hit at or after its offset.
+            minima = np.minimum.reduceat(d2, offsets)
+            hits = np.flatnonzero(d2 == np.repeat(minima, chunk))
+            pick = hits[np.searchsorted(hits, offsets)]
+            segment[begin:end], fraction[begin:end] = item[pick], t[pick]
+            begin = end
+        return self._segment_hits(lons, lats, segment, fraction)
+
+    def snap_many(self, lons: np.ndarray, lats: np.ndarray) -> list:
+        """:meth:`nearest_segments` as a list of :class:`SegmentHit`."""
+        hits = self.nearest_segments(lons, lats)
+        return [
+            SegmentHit(*row)
+            for row in zip(hits.segment.tolist(), hits.fraction.tolist(), hits.lon.tolist(), hits.lat.tolist(),
+                           hits.distance_m.tolist(), hits.station_m.tolist())
+        ]
+
+    # -- helpers ---------------------------------------------------------
+
+    def _vertex_d2(self, ids: np.ndarray, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        d2 = (self.xy[ids, 0] - x) ** 2 + (self.xy[ids, 1] - y) ** 2
+        return np.zeros_like(d2), d2
+
+    def _search_many(self, x, y, kind: str, measure) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Ring search for many planar queries at once; returns ``(item, fraction, d2)`` arrays.
+
+        ``kind`` is ``"vertex"`` or ``"segment"``. Queries still unresolved after
+        :data:`_BATCH_RINGS` rings are far from the route and go to
+        :meth:`_search_runs` instead of ever-larger rings.
+        """
+        n = len(x)
+        if n > _BATCH_QUERIES:
+            parts = [
+                self._search_many(x[first:first + _BATCH_QUERIES], y[first:first + _BATCH_QUERIES], kind, measure)
+                for first in range(0, n, _BATCH_QUERIES)
+            ]
+            return tuple(np.concatenate(column) for column in zip(*parts))
+        keys, starts, ids = (
+            (self._vertex_keys, self._vertex_starts, self._vertex_ids) if kind == "vertex"
+            else (self._seg_keys, self._seg_starts, self._seg_ids)
+        )
+        best = np.zeros(n, dtype=np.int64)
+        best_t = np.zeros(n)
+        best_d2 = np.full(n, np.inf)
+        cx = np.floor(x / self.cell_size).astype(np.int64)
+        cy = np.floor(y / self.cell_size).astype(np.int64)
+        active = np.arange(n)
+        for radius in range(_BATCH_RINGS + 1):
+            if not active.size:
+                break
+            if radius == 0:
+                dx = dy = np.zeros(1, dtype=np.int64)
+            else:
+                span = np.arange(-radius, radius + 1)
+                inner = span[1:-1]
+                dx = np.concatenate((span, span, np.full(inner.size, -radius), np.full(inner.size, radius)))
+                dy = np.concatenate((np.full(span.size, -radius), np.full(span.size, radius), inner, inner))
+            query = np.repeat(active, dx.size)
+            wanted = _keys(cx[query] + np.tile(dx, active.size), cy[query] + np.tile(dy, active.size))
+            pos = np.searchsorted(keys, wanted)
+            hit = pos < len(keys)
+            hit[hit] = keys[pos[hit]] == wanted[hit]
+            query, pos = query[hit], pos[hit]
+            if query.size:
+                lo = starts[pos]
+                counts = starts[pos + 1] - lo
+                query = np.repeat(query, counts)
+                item = ids[np.repeat(lo - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())]
+                self._keep_best(query, item, *measure(item, x[query], y[query]), best, best_t, best_d2)
+            bound = radius * self.cell_size
+            active = active[best_d2[active] > bound * bound]
+        if active.size:
+            self._search_runs(active, x, y, kind, measure, best, best_t, best_d2)
+        return best, best_t, best_d2
+
+    def _search_runs(self, active, x, y, kind: str, measure, best, best_t, best_d2) -> None:
+        """Exact search for far queries over bounding boxes of consecutive item runs.
+
+        The first vertex of every run lies on the route, so the closest one
+        bounds each query's answer from above. Only runs whose box is nearer
+        than that bound are measured item by item.
+        """
+        if kind not in self._runs:
+            if kind == "vertex":
+                lo = hi = self.xy
+            else:
+                lo = np.minimum(self.xy[:-1], self.xy[1:])
+                hi = np.maximum(self.xy[:-1], self.xy[1:])
+            size = max(16, int(np.sqrt(len(lo))))
+            first = np.arange(0, len(lo), size)
+            self._runs[kind] = (
+                first, np.minimum.reduceat(lo, first, axis=0), np.maximum.reduceat(hi, first, axis=0), len(lo)
+            )
+        first, box_lo, box_hi, count = self._runs[kind]
+        last = np.append(first[1:], count)
+        for block in np.array_split(active, max(1, active.size // 512)):
+            qx, qy = x[block, None], y[block, None]
+            upper = ((self.xy[first, 0] - qx) ** 2 + (self.xy[first, 1] - qy) ** 2).min(axis=1)
+            gap_x = np.maximum(np.maximum(box_lo[:, 0] - qx, qx - box_hi[:, 0]), 0.0)
+            gap_y = np.maximum(np.maximum(box_lo[:, 1] - qy, qy - box_hi[:, 1]), 0.0)
+            row, run = np.nonzero(gap_x ** 2 + gap_y ** 2 <= upper[:, None])
+            counts = last[run] - first[run]
+            query = np.repeat(block[row], counts)
+            item = np.repeat(first[run] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+            self._keep_best(query, item, *measure(item, x[query], y[query]), best, best_t, best_d2)
+
+    @staticmethod
+    def _keep_best(query, item, t, d2, best, best_t, best_d2) -> None:
+        order = np.lexsort((d2, query))
+        query, item, t, d2 = query[order], item[order], t[order], d2[order]
+        first = np.flatnonzero(np.concatenate(([True], query[1:] != query[:-1])))
+        query, item, t, d2 = query[first], item[first], t[first], d2[first]
+        better = d2 < best_d2[query]
+        query = query[better]
+        best[query] = item[better]
+        best_t[query] = t[better]
+        best_d2[query] = d2[better]
+
+    def _segment_hits(self, lons, lats, segment: np.ndarray, fraction: np.ndarray) -> SegmentHits:
+        a = self.coords[segment]
+        b = self.coords[segment + 1]
+        hit_lon = a[:, 0] + (b[:, 0] - a[:, 0]) * fraction
+        hit_lat = a[:, 1] + (b[:, 1] - a[:, 1]) * fraction
+        station = self.stations_m[segment] + (self.stations_m[segment + 1] - self.stations_m[segment]) * fraction
+        return SegmentHits(segment, fraction, hit_lon, hit_lat, haversine(lons, lats, hit_lon, hit_lat), station)
+
+    def _project(self, ids: np.ndarray, x: float, y: float) -> Tuple[np.ndarray, np.ndarray]:
+        start = self._seg_start[ids]
+        delta = self._seg_delta[ids]
+        len2 = self._seg_len2[ids]
+        rel_x = x - start[:, 0]
+        rel_y = y - start[:, 1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(len2 > 0, (rel_x * delta[:, 0] + rel_y * delta[:, 1]) / len2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        dx = rel_x - t * delta[:, 0]
+        dy = rel_y - t * delta[:, 1]
+        return t, dx * dx + dy * dy
+
+    def _hit(self, segment: int, fraction: float, lon: float, lat: float, max_distance_m: Optional[float]) -> Optional[SegmentHit]:
+        a = self.coords[segment]
+        b = self.coords[segment + 1]
+        hit_lon = float(a[0] + (b[0] - a[0]) * fraction)
+        hit_lat = float(a[1] + (b[1] - a[1]) * fraction)
+        distance = float(haversine(lon, lat, hit_lon, hit_lat))
+        if max_distance_m is not None and distance > max_distance_m:
+            return None
+        station = self.stations_m[segment] + (self.stations_m[segment + 1] - self.stations_m[segment]) * fraction
+        return SegmentHit(segment, fraction, hit_lon, hit_lat, distance, float(station))
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""Multi-level-of-detail simplification of ``route.path``.
+
+Each level is a Douglas-Peucker simplification with two tolerances. Every
+dropped vertex lies within ``lateral_m`` of the kept segment around it, in
+the route's local projection. Its elevation also lies within ``vertical_ft``
+of the straight line between the kept endpoints, interpolated by route
+distance. A segment is split at the vertex with the worst *normalized*
+error, ``max(lateral / lateral_m, vertical / vertical_ft)``. Splitting stops
+once that error is at most 1 everywhere, so both bounds hold on every level.
+
+Open segments sit in a max-heap keyed by that error, and each split scans
+only its own segment. On trail-like input the whole pass is O(n log n).
+Levels are refined coarse to fine from one shared heap. Every finer level
+is therefore a superset of the coarser ones. Camp, trailhead and water
+vertices are pinned on every level.
+
+Rows are copied verbatim from ``route.path``. Each keeps its routeMile, so
+a client can swap in full detail for any mile range when zoomed in. No
+client loads it yet, so the output goes to ``.route-build/`` rather than
+``public/``, where the PWA would precache it on every install.
+
+    python scripts/route_lod.py                      # writes .route-build/hike_data.lod.json
+    python scripts/route_lod.py --levels 2:3,10:15,40:40
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from geodesy import LocalProjection, as_coords, path_stations
+import artifact_writer
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+HIKE_DATA_PATH = ROOT / "public" / "data" / "hike_data.json"
+LOD_PATH = ROOT / ".route-build" / "hike_data.lod.json"
+
+# (lateral meters, vertical feet), coarsest last.
+DEFAULT_LEVELS: Tuple[Tuple[float, float], ...] = ((2.0, 5.0), (8.0, 15.0), (30.0, 40.0), (100.0, 100.0))
+
+
+@dataclass(frozen=True)
+class LodLevel:
+    lateral_tolerance_m: float
+    vertical_tolerance_ft: float
+    indices: np.ndarray
+    max_lateral_m: float
+    max_vertical_ft: float
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+
+class _Segment:
+    """An open span ``(start, end)`` with its worst interior vertex."""
+
+    __slots__ = ("start", "end", "worst", "score", "lateral_m", "vertical_ft")
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start = start
+        self.end = end
+        self.worst = start
+        self.score = 0.0
+        self.lateral_m = 0.0
+        self.vertical_ft = 0.0
+
+    def __lt__(self, other: "_Segment") -> bool:
+        # heapq is a min-heap; the worst segment must come out first.
+        return self.score > other.score
+
+
+class Simplifier:
+    """Error-bounded Douglas-Peucker over planar ``xy``, elevation ``z_ft`` and ``stations_m``."""
+
+    def __init__(self, xy: np.ndarray, z_ft: np.ndarray, stations_m: np.ndarray) -> None:
+        self.xy = np.asarray(xy, dtype=np.float64)
+        self.z = np.asarray(z_ft, dtype=np.float64)
+        self.stations = np.asarray(stations_m, dtype=np.float64)
+        if not len(self.xy) == len(self.z) == len(self.stations):
+            raise ValueError("xy, z_ft and stations_m must have the same length")
+
+    def errors(self, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Lateral meters and vertical feet of ``start < i < end`` from the chord ``start``-``end``."""
+        a, b = self.xy[start], self.xy[end]
+        points = self.xy[start + 1:end]
+        ab = b - a
+        length2 = float(ab @ ab)
+        if length2 > 0:
+            t = np.clip((points - a) @ ab / length2, 0.0, 1.0)
+            offset = points - (a + t[:, None] * ab)
+        else:
+            offset = points - a
+        lateral = np.hypot(offset[:, 0], offset[:, 1])
+
+        span = self.stations[end] - self.stations[start]
+        fraction = (self.stations[start + 1:end] - self.stations[start]) / span if span > 0 else 0.0
+        expected = self.z[start] + (self.z[end] - self.z[start]) * fraction
+        vertical = np.abs(self.z[start + 1:end] - expected)
+        return lateral, vertical
+
+    def _score(self, segment: _Segment, lateral_m: float, vertical_ft: float) -> _Segment:
+        if segment.end - segment.start < 2:
+            segment.score = segment.lateral_m = segment.vertical_ft = 0.0
+            return segment
+        lateral, vertical = self.errors(segment.start, segment.end)
+        normalized = np.maximum(lateral / lateral_m, vertical / vertical_ft)
+        pick = int(np.argmax(normalized))
+        segment.worst = segment.start + 1 + pick
+        segment.score = float(normalized[pick])
+        segment.lateral_m = float(lateral.max())
+        segment.vertical_ft = float(vertical.max())
+        return segment
+
+    def levels(self, tolerances: Iterable[Tuple[float, float]], pinned: Iterable[int] = ()) -> List[LodLevel]:
+        """Simplify once per ``(lateral_m, vertical_ft)`` pair, returned in the order given."""
+        tolerances = [(float(lateral), float(vertical)) for lateral, vertical in tolerances]
+        if any(lateral <= 0 or vertical <= 0 for lateral, vertical in tolerances):
+            raise ValueError("tolerances must be positive")
+        n = len(self.xy)
+        kept = np.zeros(n, dtype=bool)
+        if n:
+            kept[[0, n - 1]] = True
+        pins = np.asarray(list(pinned), dtype=np.intp)
+        kept[pins[(pins >= 0) & (pins < n)]] = True
+        anchors = np.flatnonzero(kept)
+        segments = [_Segment(int(a), int(b)) for a, b in zip(anchors[:-1], anchors[1:])]
+
+        results: List[Optional[LodLevel]] = [None] * len(tolerances)
+        order = sorted(range(len(tolerances)), key=lambda k: tolerances[k], reverse=True)
+        for k in order:
+            lateral_m, vertical_ft = tolerances[k]
+            heap = [self._score(segment, lateral_m, vertical_ft) for segment in segments]
+            heapq.heapify(heap)
+            while heap and heap[0].score > 1.0:
+                segment = heapq.heappop(heap)
+                kept[segment.worst] = True
+                for part in (_Segment(segment.start, segment.worst), _Segment(segment.worst, segment.end)):
+                    heapq.heappush(heap, self._score(part, lateral_m, vertical_ft))
+            segments = heap
+            results[k] = LodLevel(
+                lateral_m, vertical_ft, np.flatnonzero(kept),
+                max((s.lateral_m for s in segments), default=0.0),
+                max((s.vertical_ft for s in segments), default=0.0),
+            )
+        return results  # type: ignore[return-value]
+
+
+def route_arrays(path) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Planar xy, elevation feet and stations for ``[lon, lat, ele_ft, routeMile?]`` rows.
+
+    Stations follow routeMile when present, so vertical error is judged
+    along the same axis the elevation profile is drawn on.
+    """
+    coords = as_coords(path)
+    xy = LocalProjection.from_path(coords).project(coords)
+    z = coords[:, 2] if coords.shape[1] > 2 else np.zeros(len(coords))
+    return xy, z, path_stations(coords)
+
+
+def pinned_indices(data: dict) -> np.ndarray:
+    """Route vertices nearest the routeMile of every day stop and water source."""
+    path = as_coords(data["route"]["path"])
+    if path.shape[1] < 4:
+        return np.empty(0, dtype=np.intp)
+    miles = [
+        feature["properties"]["routeMile"] for feature in data.get("features", [])
+        if (feature.get("properties") or {}).get("day", -1) >= 0 and "routeMile" in feature["properties"]
+    ]
+    miles += [source["routeMile"] for source in data.get("waterSources", []) if source.get("routeMile") is not None]
+    route_miles = path[:, 3]
+    right = np.searchsorted(route_miles, miles).clip(1, len(route_miles) - 1)
+    left = right - 1
+    nearer_left = np.abs(route_miles[left] - miles) <= np.abs(route_miles[right] - miles)
+    return np.unique(np.where(nearer_left, left, right))
+
+
+def build_lods(data: dict, tolerances: Sequence[Tuple[float, float]] = DEFAULT_LEVELS) -> dict:
+    """Return the ``hike_data.lod.json`` payload for a hike_data bundle."""
+    path = data["route"]["path"]
+    pins = pinned_indices(data)
+    levels = Simplifier(*route_arrays(path)).levels(tolerances, pins)
+    return {
+        "sourcePoints": len(path),
+        "pinnedPoints": int(len(pins)),
+        "levels": [
+            {
+                "lateralToleranceMeters": level.lateral_tolerance_m,
+                "verticalToleranceFeet": level.vertical_tolerance_ft,
+                "maxLateralErrorMeters": round(level.max_lateral_m, 3),
+                "maxVerticalErrorFeet": round(level.max_vertical_ft, 3),
+                "points": len(level),
+                "path": [path[i] for i in level.indices.tolist()],
+            }
+            for level in levels
+        ],
+    }
+
+
+def parse_levels(text: str) -> List[Tuple[float, float]]:
+    """Parse ``"2:5,8:15"`` into ``[(2.0, 5.0), (8.0, 15.0)]``."""
+    levels = []
+    for item in text.split(","):
+        lateral, _, vertical = item.partition(":")
+        levels.append((float(lateral), float(vertical or lateral)))
+    return levels
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write error-bounded LOD versions of route.path.")
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--output", type=Path, default=LOD_PATH)
+    parser.add_argument(
+        "--levels", type=parse_levels, default=list(DEFAULT_LEVELS),
+        help="comma-separated LATERAL_M:VERTICAL_FT tolerances, e.g. 2:5,8:15,30:40",
+    )
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    data = route_trace.load_json(args.hike_data)
+    with route_trace.span("simplify") as span:
+        payload = build_lods(data, args.levels)
+        span.count("points", payload["sourcePoints"])
+    artifact_writer.publish_json(args.output, payload)
+
+    full_bytes = len(json.dumps(data["route"]["path"], separators=(",", ":")))
+    print(f"{payload['sourcePoints']:,} route points, {payload['pinnedPoints']} pinned")
+    print(f"{'lateral m':>10} {'vertical ft':>12} {'points':>8} {'max lat m':>10} {'max vert ft':>12} {'bytes':>9}")
+    for level in payload["levels"]:
+        size = len(json.dumps(level["path"], separators=(",", ":")))
+        print(f"{level['lateralToleranceMeters']:>10g} {level['verticalToleranceFeet']:>12g} {level['points']:>8,} "
+              f"{level['maxLateralErrorMeters']:>10.2f} {level['maxVerticalErrorFeet']:>12.2f} "
+              f"{size:>9,} ({size / full_bytes:.0%})")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
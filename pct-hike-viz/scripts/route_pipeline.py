@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""Content-hashed, incremental runner for the Python route stages.
+
+Each stage declares the artifacts it reads and writes. An artifact is a file,
+optionally narrowed to one top-level JSON key (``hike_data.json#features``) so
+that editing camps does not look like a route change. After a stage runs, the
+hash of every input and output is recorded in ``.route-build/state.json``; the
+next run skips any stage whose recorded hashes still match. Stages that share
+no files run concurrently in a process pool.
+
+    python scripts/route_pipeline.py              # bring everything up to date
+    python scripts/route_pipeline.py --dry-run    # show what would run
+    python scripts/route_pipeline.py stats        # one target plus stale upstream
+    python scripts/route_pipeline.py --force lod  # rerun lod alone, then what it changed
+
+The committed ``route.path`` is the PCTA centerline and is never rebuilt
+here; ``update_elevation.py`` replaces it only on explicit request. Without a
+state file the checked-in artifacts are adopted as current (see
+:meth:`Pipeline.mark_current`), so a fresh checkout builds only the reports
+it is missing. ``--force`` reruns the named targets, not their upstream.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AbstractSet, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+ROOT = SCRIPTS_DIR.parent
+REPO_ROOT = ROOT.parent
+BUILD_DIR = ROOT / ".route-build"
+STATE_PATH = BUILD_DIR / "state.json"
+
+TRACK_SOURCE_PATH = REPO_ROOT / "COURSE_334289912.fit"
+WATER_CSV_PATH = REPO_ROOT / "docs" / "data" / "source" / "pct-water-norcal-2026-08-02.csv"
+CENTERLINE_PATH = REPO_ROOT / "docs" / "data" / "source" / "pcta-centerline-2026-burney-ash.geojson"
+WATER_OUTPUT_PATH = BUILD_DIR / "water_sources.json"
+STATS_REPORT_PATH = BUILD_DIR / "reports" / "validate_stats.txt"
+DEVIATION_TRACK_PATH = REPO_ROOT / "docs" / "data" / "source" / "garmin-section-o-alternate.gpx"
+DEVIATION_REPORT_PATH = BUILD_DIR / "reports" / "route_deviation.json"
+SECTIONS_REPORT_PATH = BUILD_DIR / "reports" / "route_sections.json"
+OWNERSHIP_OVERLAY_PATH = ROOT / "public" / "data" / "land_ownership.geojson"
+OWNERSHIP_REPORT_PATH = BUILD_DIR / "reports" / "land_ownership.json"
+LOD_OUTPUT_PATH = BUILD_DIR / "hike_data.lod.json"
+PROFILE_OUTPUT_PATH = BUILD_DIR / "hike_data.profile.json"
+
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+import artifact_writer  # noqa: E402
+import route_trace  # noqa: E402
+
+HIKE_DATA_PATH = artifact_writer.HIKE_DATA_PATH
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A file, or a single top-level key of a JSON file, tracked by content hash."""
+
+    path: Path
+    key: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        try:
+            name = str(self.path.relative_to(REPO_ROOT))
+        except ValueError:
+            name = str(self.path)
+        return f"{name}#{self.key}" if self.key else name
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    run: Callable[..., None]
+    inputs: Tuple[Artifact, ...]
+    outputs: Tuple[Artifact, ...]
+    params: Mapping[str, object] = field(default_factory=dict)
+
+
+class ContentHasher:
+    """Hash artifacts, parsing each JSON file at most once per content version."""
+
+    def __init__(self) -> None:
+        self._json: Dict[Tuple[Path, str], dict] = {}
+
+    def file_digest(self, path: Path) -> Optional[str]:
+        if not path.exists():
+            return None
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def digest(self, artifact: Artifact) -> Optional[str]:
+        file_digest = self.file_digest(artifact.path)
+        if file_digest is None or artifact.key is None:
+            return file_digest
+        cache_key = (artifact.path, file_digest)
+        if cache_key not in self._json:
+            self._json[cache_key] = json.loads(artifact.path.read_text(encoding="utf-8"))
+        value = self._json[cache_key].get(artifact.key)
+        canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def snapshot(self, artifacts: Iterable[Artifact]) -> Dict[str, Optional[str]]:
+        return {artifact.label: self.digest(artifact) for artifact in artifacts}
+
+
+def params_digest(stage: Stage) -> str:
+    canonical = json.dumps(stage.params, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# -- stage bodies (module level so they can cross a process boundary) --------
+
+
+def run_snap() -> None:
+    import snap_camps_to_route
+
+    snap_camps_to_route.main([])
+
+
+def run_water(csv_path: str, centerline: str, output: str) -> None:
+    from mile_index import MileIndex
+    from parse_water_csv import iter_water_rows, snap_water_sources
+
+    water_sources, _ = snap_water_sources(
+        iter_water_rows(csv_path), MileIndex.from_centerline_geojson(Path(centerline))
+    )
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(json.dumps(water_sources, indent=2), encoding="utf-8")
+
+
+def run_lod(hike_data: str, output: str) -> None:
+    from artifact_writer import publish_json
+    from route_lod import build_lods
+
+    publish_json(output, build_lods(json.loads(Path(hike_data).read_text(encoding="utf-8"))))
+
+
+def run_profile(hike_data: str, output: str) -> None:
+    from artifact_writer import publish_json
+    from elevation_pyramid import ElevationPyramid
+
+    pyramid = ElevationPyramid.from_path(json.loads(Path(hike_data).read_text(encoding="utf-8"))["route"]["path"])
+    publish_json(output, pyramid.to_payload())
+
+
+def run_deviation(track: str, centerline: str, output: str) -> None:
+    from mile_index import MileIndex
+    from route_deviation import audit, read_track
+
+    report = audit(read_track(Path(track)), MileIndex.from_centerline_geojson(Path(centerline)))
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    payload = {"track": track, "centerline": centerline, **report.to_payload()}
+    Path(output).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
+def run_sections(centerline: str, csv_path: str, track: str, span: float, output: str) -> None:
+    import route_sections
+    from mile_index import MileIndex
+    from parse_water_csv import iter_water_rows
+    from route_deviation import read_track
+
+    mile_index = MileIndex.from_centerline_geojson(Path(centerline))
+    sections = route_sections.split_sections(mile_index.start_mile, mile_index.end_mile, span)
+    results = route_sections.run_sections(sections, mile_index, list(iter_water_rows(csv_path)), read_track(Path(track)))
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(json.dumps(route_sections.merge(results), indent=2), encoding="utf-8")
+
+
+def run_ownership(hike_data: str, overlay: str, output: str) -> None:
+    from land_ownership import ParcelIndex, classify_route, report_payload
+
+    index = ParcelIndex.from_geojson(Path(overlay))
+    runs, waypoints = classify_route(json.loads(Path(hike_data).read_text(encoding="utf-8")), index)
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(json.dumps(report_payload(index, runs, waypoints, overlay), indent=2), encoding="utf-8")
+
+
+def run_stats(output: str) -> None:
+    import validate_stats
+
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        validate_stats.main([])
+    Path(output).parent.mkdir(parents=True, exist_ok=True)
+    Path(output).write_text(buffer.getvalue(), encoding="utf-8")
+
+
+def _code(*names: str) -> Tuple[Artifact, ...]:
+    """Treat the implementing scripts as inputs so code edits invalidate results."""
+    return tuple(Artifact(SCRIPTS_DIR / name) for name in names)
+
+
+def default_stages(track_source: Path = TRACK_SOURCE_PATH) -> List[Stage]:
+    route = Artifact(HIKE_DATA_PATH, "route")
+    features = Artifact(HIKE_DATA_PATH, "features")
+    return [
+        Stage(
+            "snap",
+            run_snap,
+            inputs=(route, features) + _code("snap_camps_to_route.py", "artifact_writer.py", "geodesy.py"),
+            outputs=(features,),
+        ),
+        Stage(
+            "water",
+            run_water,
+            inputs=(Artifact(WATER_CSV_PATH), Artifact(CENTERLINE_PATH))
+            + _code("parse_water_csv.py", "mile_index.py", "geodesy.py"),
+            outputs=(Artifact(WATER_OUTPUT_PATH),),
+            params={
+                "csv_path": str(WATER_CSV_PATH),
+                "centerline": str(CENTERLINE_PATH),
+                "output": str(WATER_OUTPUT_PATH),
+            },
+        ),
+        Stage(
+            "lod",
+            run_lod,
+            inputs=(route, features, Artifact(HIKE_DATA_PATH, "waterSources")) + _code("route_lod.py", "artifact_writer.py", "geodesy.py"),
+            outputs=(Artifact(LOD_OUTPUT_PATH),),
+            params={"hike_data": str(HIKE_DATA_PATH), "output": str(LOD_OUTPUT_PATH)},
+        ),
+        Stage(
+            "profile",
+            run_profile,
+            inputs=(route,) + _code("elevation_pyramid.py", "artifact_writer.py", "geodesy.py"),
+            outputs=(Artifact(PROFILE_OUTPUT_PATH),),
+            params={"hike_data": str(HIKE_DATA_PATH), "output": str(PROFILE_OUTPUT_PATH)},
+        ),
+        Stage(
+            "deviation",
+            run_deviation,
+            inputs=(Artifact(DEVIATION_TRACK_PATH), Artifact(CENTERLINE_PATH))
+            + _code("route_deviation.py", "route_index.py", "mile_index.py", "gpx_stream.py", "geodesy.py"),
+            outputs=(Artifact(DEVIATION_REPORT_PATH),),
+            params={
+                "track": str(DEVIATION_TRACK_PATH),
+                "centerline": str(CENTERLINE_PATH),
+                "output": str(DEVIATION_REPORT_PATH),
+            },
+        ),
+        Stage(
+            "sections",
+            run_sections,
+            inputs=(Artifact(CENTERLINE_PATH), Artifact(WATER_CSV_PATH), Artifact(track_source))
+            + _code("route_sections.py", "elevation_metrics.py", "parse_water_csv.py", "mile_index.py",
+                    "route_index.py", "route_deviation.py", "gpx_stream.py", "fit_decoder.py", "geodesy.py"),
+            outputs=(Artifact(SECTIONS_REPORT_PATH),),
+            params={
+                "centerline": str(CENTERLINE_PATH),
+                "csv_path": str(WATER_CSV_PATH),
+                "track": str(track_source),
+                "span": 10.0,
+                "output": str(SECTIONS_REPORT_PATH),
+            },
+        ),
+        Stage(
+            "ownership",
+            run_ownership,
+            inputs=(route, Artifact(OWNERSHIP_OVERLAY_PATH)) + _code("land_ownership.py"),
+            outputs=(Artifact(OWNERSHIP_REPORT_PATH),),
+            params={
+                "hike_data": str(HIKE_DATA_PATH),
+                "overlay": str(OWNERSHIP_OVERLAY_PATH),
+                "output": str(OWNERSHIP_REPORT_PATH),
+            },
+        ),
+        Stage(
+            "stats",
+            run_stats,
+            inputs=(route,) + _code("validate_stats.py", "geodesy.py"),
+            outputs=(Artifact(STATS_REPORT_PATH),),
+            params={"output": str(STATS_REPORT_PATH)},
+        ),
+    ]
+
+
+# -- scheduling ---------------------------------------------------------------
+
+
+def dependencies(stages: Sequence[Stage]) -> Dict[str, Set[str]]:
+    """Map each stage to the earlier stages that write a file it reads."""
+    deps: Dict[str, Set[str]] = {stage.name: set() for stage in stages}
+    for index, stage in enumerate(stages):
+        reads = {artifact.path for artifact in stage.inputs}
+        for upstream in stages[:index]:
+            if reads & {artifact.path for artifact in upstream.outputs}:
+                deps[stage.name].add(upstream.name)
+    return deps
+
+
+def select(stages: Sequence[Stage], targets: Sequence[str]) -> List[Stage]:
+    """Return ``targets`` plus everything upstream of them, in declaration order."""
+    if not targets:
+        return list(stages)
+    known = {stage.name for stage in stages}
+    unknown = set(targets) - known
+    if unknown:
+        raise SystemExit(f"Unknown stage(s): {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(known))}.")
+    deps = dependencies(stages)
+    wanted: Set[str] = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(deps[name])
+    return [stage for stage in stages if stage.name in wanted]
+
+
+class Pipeline:
+    def __init__(self, stages: Sequence[Stage], state_path: Path = STATE_PATH) -> None:
+        self.stages = list(stages)
+        self.state_path = state_path
+        self.hasher = ContentHasher()
+        self.deps = dependencies(self.stages)
+        self.adopt_on_run = not state_path.exists()
+        self.state: Dict[str, dict] = (
+            {} if self.adopt_on_run else json.loads(state_path.read_text(encoding="utf-8"))
+        )
+
+    def is_current(self, stage: Stage) -> bool:
+        record = self.state.get(stage.name)
+        if record is None or record.get("params") != params_digest(stage):
+            return False
+        if record.get("inputs") != self.hasher.snapshot(stage.inputs):
+            return False
+        outputs = self.hasher.snapshot(stage.outputs)
+        if None in outputs.values() and not record.get("adopted"):
+            return False
+        return record.get("outputs") == outputs
+
+    def record(self, stage: Stage, seconds: float, adopted: bool = False, save: bool = True) -> None:
+        self.state[stage.name] = {
+            "params": params_digest(stage),
+            "inputs": self.hasher.snapshot(stage.inputs),
+            "outputs": self.hasher.snapshot(stage.outputs),
+            "seconds": round(seconds, 3),
+        }
+        if adopted:
+            self.state[stage.name]["adopted"] = True
+        if save:
+            self.save()
+
+    def save(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(self.state, indent=2, sort_keys=True), encoding="utf-8")
+
+    def mark_current(self, save: bool = True) -> None:
+        """Record the present hashes of every stage without running it.
+
+        Use this to adopt checked-in artifacts (such as the committed
+        ``hike_data.json``) as the baseline for later incremental runs;
+        :meth:`run` does so itself when there is no state file yet. A stage
+        with missing outputs is adopted when every stage that reads them has
+        its own outputs (or was adopted in turn); otherwise it stays stale.
+        """
+        consumers: Dict[str, Set[str]] = {stage.name: set() for stage in self.stages}
+        for name, upstream in self.deps.items():
+            for dep in upstream:
+                consumers[dep].add(name)
+        current: Dict[str, bool] = {}
+        adopted: Set[str] = set()
+        for stage in reversed(self.stages):
+            if None not in self.hasher.snapshot(stage.outputs).values():
+                current[stage.name] = True
+            elif consumers[stage.name] and all(current[name] for name in consumers[stage.name]):
+                current[stage.name] = True
+                adopted.add(stage.name)
+            else:
+                current[stage.name] = False
+        for stage in self.stages:
+            if current[stage.name]:
+                self.record(stage, 0.0, adopted=stage.name in adopted, save=False)
+        if save:
+            self.save()
+        self.adopt_on_run = False
+
+    def run(self, jobs: int = 1, dry_run: bool = False, force: AbstractSet[str] = frozenset()) -> Dict[str, str]:
+        """Run stale stages and return ``{stage: "ran" | "skipped" | "stale"}``.
+
+        Stages named in ``force`` rerun even when current; their downstream
+        reruns only if a forced stage changes what it reads.
+        """
+        if self.adopt_on_run:
+            self.mark_current(save=not dry_run)
+        results: Dict[str, str] = {}
+        remaining = {stage.name: stage for stage in self.stages}
+        finished: Set[str] = set()
+        running = {}
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 and not dry_run else None
+        try:
+            while remaining or running:
+                ready = [stage for stage in remaining.values() if self.deps[stage.name] <= finished]
+                for stage in ready:
+                    # Stages that touch the same file never overlap.
+                    if any(_shares_files(stage, other) for other in running.values()):
+                        continue
+                    del remaining[stage.name]
+                    if (stage.name not in force and not _upstream_stale(stage, results, self.deps)
+                            and self.is_current(stage)):
+                        results[stage.name] = "skipped"
+                        finished.add(stage.name)
+                        continue
+                    if dry_run:
+                        results[stage.name] = "stale"
+                        finished.add(stage.name)
+                        continue
+                    print(f"[pipeline] running {stage.name}")
+                    if executor is None:
+                        self._finish(stage, _timed(stage.name, stage.run, stage.params), results, finished)
+                    else:
+                        future = executor.submit(_timed, stage.name, stage.run, dict(stage.params))
+                        running[future] = stage
+                if running:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage = running.pop(future)
+                        self._finish(stage, future.result(), results, finished)
+                elif remaining and not ready:
+                    raise RuntimeError(f"Pipeline stalled; unresolved stages: {', '.join(remaining)}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return results
+
+    def _finish(self, stage: Stage, seconds: float, results: Dict[str, str], finished: Set[str]) -> None:
+        self.record(stage, seconds)
+        results[stage.name] = "ran"
+        finished.add(stage.name)
+        print(f"[pipeline] {stage.name} finished in {seconds:.2f}s")
+
+
+def _timed(name: str, run: Callable[..., None], params: Mapping[str, object]) -> float:
+    started = time.perf_counter()
+    try:
+        with route_trace.span(name):
+            run(**params)
+    finally:
+        # Pool workers exit without running atexit hooks.
+        route_trace.flush()
+    return time.perf_counter() - started
+
+
+def _shares_files(first: Stage, second: Stage) -> bool:
+    """Whether either stage writes a file the other reads or writes."""
+    def touched(stage: Stage) -> Set[Path]:
+        return {artifact.path for artifact in stage.inputs + stage.outputs}
+
+    def written(stage: Stage) -> Set[Path]:
+        return {artifact.path for artifact in stage.outputs}
+
+    return bool(written(first) & touched(second) or written(second) & touched(first))
+
+
+def _upstream_stale(stage: Stage, results: Mapping[str, str], deps: Mapping[str, Set[str]]) -> bool:
+    """In a dry run an upstream "stale" stage means this one would rerun too."""
+    return any(results.get(name) == "stale" for name in deps[stage.name])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Python route stages incrementally.")
+    parser.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    parser.add_argument("--track", type=Path, default=TRACK_SOURCE_PATH, help="GPX or FIT track for the sections report")
+    parser.add_argument("-j", "--jobs", type=int, default=2, help="stages to run in parallel")
+    parser.add_argument("--dry-run", action="store_true", help="report stale stages without running them")
+    parser.add_argument("--force", action="store_true",
+                        help="rerun the named targets (default: all stages) even if current")
+    parser.add_argument(
+        "--mark-current", action="store_true",
+        help="record current hashes for the selected stages without running them",
+    )
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    pipeline = Pipeline(select(default_stages(args.track), args.targets))
+    if args.mark_current:
+        pipeline.mark_current()
+        print(f"Marked current: {', '.join(stage.name for stage in pipeline.stages)}")
+        return
+    forced = set(args.targets or (stage.name for stage in pipeline.stages)) if args.force else set()
+    results = pipeline.run(jobs=args.jobs, dry_run=args.dry_run, force=forced)
+    for name, status in results.items():
+        print(f"{name:<10} {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Run the route stages section by section across a process pool.
+
+A calibrated centerline, which may cover the full trail, is split into
+sections by PCT-mile ranges. Each section goes to its own worker:
+
+1. ingest: crop the centerline to the section's stations;
+2. snapping: place the section's water sources, and snap the track points
+   lying within ``SNAP_TOLERANCE_M`` of the section;
+3. metrics: length, water gaps, and gain/loss/high/low from the snapped
+   track, using the itinerary's elevation model;
+4. validation: section length against its mile span, track coverage, and
+   plausible elevations.
+
+The centerline and track arrays are copied once into
+``multiprocessing.shared_memory``. Workers attach to them by name, so a task
+pickles only its mile range, the marker control points and its own water
+rows. Per-section results are merged into one report.
+
+    python scripts/route_sections.py --span 10
+    python scripts/route_sections.py --section O1=1420.653:1446 --section O2=1446:1472.497 --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from elevation_metrics import Profile
+from geodesy import FEET_PER_METER, METERS_PER_MILE, LocalProjection
+from mile_index import DEFAULT_CENTERLINE_PATH, REPO_ROOT, MileIndex
+from parse_water_csv import CSV_PATH, iter_water_rows, snap_water_sources
+from route_index import RouteIndex
+import route_trace
+
+ROOT = Path(__file__).resolve().parents[1]
+TRACK_PATH = REPO_ROOT / "COURSE_334289912.fit"
+REPORT_PATH = ROOT / ".route-build" / "reports" / "route_sections.json"
+
+SNAP_TOLERANCE_M = 100.0
+COVERAGE_BIN_M = 100.0
+LENGTH_TOLERANCE = 0.02
+MIN_TRACK_COVERAGE = 0.9
+# The PCT tops out at Forester Pass, 13,153 ft.
+ELEVATION_RANGE_FT = (0.0, 13_200.0)
+# Packs a (column, row) cell pair into one int64 key for near_line.
+_CELL_STRIDE = 1 << 32
+_NEIGHBOURS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)], dtype=np.int64)
+
+
+@dataclass(frozen=True)
+class Section:
+    name: str
+    start_mile: float
+    end_mile: float
+
+    @property
+    def miles(self) -> float:
+        return self.end_mile - self.start_mile
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    """Where a shared-memory array lives; this is all a task pickles."""
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+class SharedArrays:
+    """Arrays copied once into shared memory and unlinked on exit."""
+
+    def __init__(self, arrays: Mapping[str, np.ndarray]) -> None:
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self.specs: Dict[str, SharedArray] = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+                self.specs[key] = SharedArray(block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# Blocks a worker process has attached, kept open for the worker's lifetime.
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _resolve(array: Union[SharedArray, np.ndarray]) -> np.ndarray:
+    if not isinstance(array, SharedArray):
+        return array
+    if array.name not in _attached:
+        block = shared_memory.SharedMemory(name=array.name)
+        _attached[array.name] = (block, np.ndarray(array.shape, np.dtype(array.dtype), buffer=block.buf))
+    return _attached[array.name][1]
+
+
+@dataclass(frozen=True)
+class SectionTask:
+    section: Section
+    control_miles: np.ndarray
+    control_stations_m: np.ndarray
+    water_rows: Tuple[tuple, ...]
+    arrays: Mapping[str, Union[SharedArray, np.ndarray]]
+
+
+@dataclass(frozen=True)
+class SectionResult:
+    section: Section
+    vertices: int
+    length_mi: float
+    water: Tuple[dict, ...]
+    max_water_gap_mi: float
+    track_points: int = 0
+    coverage: Optional[float] = None
+    gain_ft: Optional[int] = None
+    loss_ft: Optional[int] = None
+    high_ft: Optional[int] = None
+    low_ft: Optional[int] = None
+    checks: Tuple[Tuple[str, bool, str], ...] = field(default=())
+
+    @property
+    def ok(self) -> bool:
+        return all(passed for _, passed, _ in self.checks)
+
+    def to_payload(self) -> dict:
+        return {
+            "name": self.section.name,
+            "startPctMile": self.section.start_mile,
+            "endPctMile": self.section.end_mile,
+            "centerlineVertices": self.vertices,
+            "lengthMiles": round(self.length_mi, 3),
+            "waterSources": list(self.water),
+            "maxWaterGapMiles": round(self.max_water_gap_mi, 3),
+            "trackPoints": self.track_points,
+            "trackCoverage": None if self.coverage is None else round(self.coverage, 4),
+            "gainFeet": self.gain_ft,
+            "lossFeet": self.loss_ft,
+            "highFeet": self.high_ft,
+            "lowFeet": self.low_ft,
+            "checks": [{"name": name, "ok": passed, "detail": detail} for name, passed, detail in self.checks],
+            "ok": self.ok,
+        }
+
+
+def parse_section(text: str) -> Section:
+    """``NAME=START:END`` in PCT miles."""
+    name, _, bounds = text.partition("=")
+    start, _, end = bounds.partition(":")
+    try:
+        section = Section(name.strip(), float(start), float(end))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=START:END, got {text!r}") from None
+    if not section.name or section.end_mile <= section.start_mile:
+        raise argparse.ArgumentTypeError(f"expected NAME=START:END with END > START, got {text!r}")
+    return section
+
+
+def split_sections(start_mile: float, end_mile: float, span_mi: float) -> List[Section]:
+    """Consecutive sections of ``span_mi`` miles; the last one takes the remainder."""
+    if span_mi <= 0:
+        raise ValueError("span_mi must be positive")
+    count = max(1, int(np.ceil((end_mile - start_mile) / span_mi - 1e-9)))
+    edges = np.minimum(start_mile + np.arange(count + 1) * span_mi, end_mile)
+    edges[-1] = end_mile
+    return [
+        Section(f"{lo:.1f}-{hi:.1f}", float(lo), float(hi))
+        for lo, hi in zip(edges[:-1].tolist(), edges[1:].tolist())
+    ]
+
+
+def near_line(line: np.ndarray, points: np.ndarray, radius_m: float) -> np.ndarray:
+    """Indices of ``points`` that may lie within ``radius_m`` of ``line``.
+
+    The line is binned into ``radius_m`` cells, and the set of cells it
+    touches is grown by one cell in every direction. A point passes if its
+    own cell is in that set, so the result is a superset of the true
+    neighbours. It keeps far-off track points out of the exact
+    nearest-segment search, which is slowest for exactly those.
+    """
+    projection = LocalProjection.from_path(line)
+    cells = np.floor(projection.project(line) / radius_m).astype(np.int64)
+    lo = np.minimum(cells[:-1], cells[1:])
+    hi = np.maximum(cells[:-1], cells[1:])
+    width = hi[:, 0] - lo[:, 0] + 1
+    counts = width * (hi[:, 1] - lo[:, 1] + 1)
+    segment = np.repeat(np.arange(len(counts)), counts)
+    local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    touched = np.unique((lo[segment, 0] + local % width[segment]) * _CELL_STRIDE + lo[segment, 1] + local // width[segment])
+    keys = np.unique((touched[:, None] + (_NEIGHBOURS[:, 0] * _CELL_STRIDE + _NEIGHBOURS[:, 1])).ravel())
+
+    # A bounding-box pass first, so only nearby points are binned and looked up.
+    low, high = (cells.min(axis=0) - 1) * radius_m, (cells.max(axis=0) + 2) * radius_m
+    x, y = projection.to_xy(points[:, 0], points[:, 1])
+    inside = np.flatnonzero((x >= low[0]) & (x < high[0]) & (y >= low[1]) & (y < high[1]))
+    wanted = np.floor(x[inside] / radius_m).astype(np.int64) * _CELL_STRIDE + np.floor(y[inside] / radius_m).astype(np.int64)
+    slot = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    return inside[keys[slot] == wanted]
+
+
+def _water_gap(section: Section, water: Sequence[dict]) -> float:
+    miles = np.concatenate(([section.start_mile], sorted(w["mile"] for w in water), [section.end_mile]))
+    return float(np.diff(miles).max())
+
+
+def process_section(task: SectionTask) -> SectionResult:
+    """Ingest, snap, measure and validate one section. Runs inside a worker."""
+    section = task.section
+    coords = _resolve(task.arrays["centerline"])
+    stations = _resolve(task.arrays["stations"])
+    mile_index = MileIndex(coords, task.control_miles, task.control_stations_m, stations)
+    if not mile_index.covers([section.start_mile, section.end_mile]).all():
+        detail = f"outside the centerline's miles {mile_index.start_mile:.3f}-{mile_index.end_mile:.3f}"
+        return SectionResult(section, 0, 0.0, (), section.miles, checks=(("in_range", False, detail),))
+
+    # Ingest: the centerline vertices spanning the section.
+    start_m, end_m = mile_index.stations_for([section.start_mile, section.end_mile]).tolist()
+    first = max(int(np.searchsorted(stations, start_m, side="right")) - 1, 0)
+    last = min(int(np.searchsorted(stations, end_m, side="left")), len(stations) - 1)
+    line, line_stations = coords[first:last + 1, :2], stations[first:last + 1]
+    length_mi = (end_m - start_m) / METERS_PER_MILE
+    ratio = length_mi / section.miles
+    checks = [
+        ("in_range", True, ""),
+        ("length", abs(ratio - 1.0) <= LENGTH_TOLERANCE,
+         f"{length_mi:.3f} centerline miles for a {section.miles:.3f}-mile span"),
+    ]
+
+    water, _ = snap_water_sources(task.water_rows, mile_index)
+    result = dict(
+        section=section, vertices=len(line), length_mi=length_mi, water=tuple(water),
+        max_water_gap_mi=_water_gap(section, water),
+    )
+
+    track = task.arrays.get("track")
+    if track is not None and len(line) >= 2:
+        track = _resolve(track)
+        near = near_line(line, track, SNAP_TOLERANCE_M)
+        near = near[~np.isnan(track[near, 2])]
+        if near.size:
+            hits = RouteIndex(line, stations_m=line_stations).nearest_segments(track[near, 0], track[near, 1])
+            keep = (hits.distance_m <= SNAP_TOLERANCE_M) & (hits.station_m >= start_m) & (hits.station_m <= end_m)
+            snapped, elevations = hits.station_m[keep], track[near[keep], 2] * FEET_PER_METER
+        else:
+            snapped = elevations = np.empty(0)
+        bins = max(1, int(np.ceil((end_m - start_m) / COVERAGE_BIN_M)))
+        filled = np.unique(np.minimum(((snapped - start_m) // COVERAGE_BIN_M).astype(np.intp), bins - 1))
+        coverage = len(filled) / bins
+        result.update(track_points=len(snapped), coverage=coverage)
+        checks.append(("track_coverage", coverage >= MIN_TRACK_COVERAGE,
+                       f"{coverage:.1%} of {COVERAGE_BIN_M:g} m bins hold a track point"))
+        if len(snapped) >= 2:
+            order = np.argsort(snapped, kind="stable")
+            day = Profile.resampled(snapped[order], elevations[order], [start_m, end_m]).metrics().days[0]
+            result.update(gain_ft=day.gain_ft, loss_ft=day.loss_ft, high_ft=day.high_ft, low_ft=day.low_ft)
+            low, high = ELEVATION_RANGE_FT
+            checks.append(("elevation_range", low <= day.low_ft and day.high_ft <= high,
+                           f"{day.low_ft}-{day.high_ft} ft"))
+    return SectionResult(checks=tuple(checks), **result)
+
+
+def run_sections(
+    sections: Sequence[Section],
+    mile_index: MileIndex,
+    water_rows: Sequence[tuple] = (),
+    track: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+) -> List[SectionResult]:
+    """Process every section, in a process pool when ``workers`` > 1; results follow ``sections``."""
+    workers = os.cpu_count() or 1 if workers is None else workers
+    rows = sorted(water_rows, key=lambda row: row[0])
+    miles = np.array([row[0] for row in rows], dtype=np.float64)
+    # Sections own [start, end); the last one also owns its end mile, so a source
+    # on a shared boundary is counted once and the partitions add up to the whole.
+    last_end = max((section.end_mile for section in sections), default=None)
+
+    def water_for(section: Section) -> tuple:
+        side = "right" if section.end_mile == last_end else "left"
+        return tuple(rows[np.searchsorted(miles, section.start_mile, "left"):
+                          np.searchsorted(miles, section.end_mile, side)])
+
+    def tasks(arrays) -> List[SectionTask]:
+        return [
+            SectionTask(section, mile_index.control_miles, mile_index.control_stations_m, water_for(section), arrays)
+            for section in sections
+        ]
+
+    arrays = {"centerline": mile_index.coords[:, :2], "stations": mile_index.stations_m}
+    if track is not None:
+        track = np.asarray(track, dtype=np.float64)
+        if track.shape[1] < 3:
+            track = np.column_stack((track, np.full(len(track), np.nan)))
+        arrays["track"] = track[:, :3]
+    if workers <= 1 or len(sections) <= 1:
+        return [process_section(task) for task in tasks(arrays)]
+
+    with SharedArrays(arrays) as shared, ProcessPoolExecutor(max_workers=min(workers, len(sections))) as executor:
+        pending = tasks(shared.specs)
+        # Longest sections first, so no worker is left with a big one at the end.
+        order = sorted(range(len(pending)), key=lambda i: -sections[i].miles)
+        futures = {i: executor.submit(process_section, pending[i]) for i in order}
+        return [futures[i].result() for i in range(len(pending))]
+
+
+def merge(results: Sequence[SectionResult]) -> dict:
+    """One report over every section, with totals."""
+    measured = [r for r in results if r.gain_ft is not None]
+    return {
+        "sections": [result.to_payload() for result in results],
+        "totals": {
+            "sections": len(results),
+            "miles": round(sum(r.section.miles for r in results), 3),
+            "waterSources": sum(len(r.water) for r in results),
+            "trackPoints": sum(r.track_points for r in results),
+            "gainFeet": sum(r.gain_ft for r in measured) if measured else None,
+            "lossFeet": sum(r.loss_ft for r in measured) if measured else None,
+        },
+        "failed": [r.section.name for r in results if not r.ok],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Process a centerline section by section across a process pool.")
+    parser.add_argument("--centerline", type=Path, default=DEFAULT_CENTERLINE_PATH,
+                        help="PCTA centerline GeoJSON with markerStations metadata")
+    parser.add_argument("--section", type=parse_section, action="append", metavar="NAME=START:END",
+                        help="PCT-mile range to process (repeatable)")
+    parser.add_argument("--span", type=float, default=10.0,
+                        help="without --section, split the centerline into sections this many miles long")
+    parser.add_argument("--csv", type=Path, default=CSV_PATH, help="pctwater.com CSV export")
+    parser.add_argument("--track", type=Path, default=TRACK_PATH, help="GPX or FIT track with elevations")
+    parser.add_argument("--no-track", action="store_true", help="skip track snapping and elevation metrics")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--json", type=Path, nargs="?", const=REPORT_PATH, help="also write a JSON report")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args()
+    route_trace.configure(args)
+
+    with route_trace.span("centerline_load", path=str(args.centerline)) as span:
+        mile_index = MileIndex.from_centerline_geojson(args.centerline)
+        span.count("points", len(mile_index.coords))
+    sections = args.section or split_sections(mile_index.start_mile, mile_index.end_mile, args.span)
+    with route_trace.span("csv_parse", path=str(args.csv)) as span:
+        rows = list(iter_water_rows(args.csv))
+        span.count("rows", len(rows))
+    track = None
+    if not args.no_track:
+        from route_deviation import read_track
+
+        with route_trace.span("track_load", path=str(args.track)) as span:
+            track = read_track(args.track)
+            span.count("points", len(track))
+    with route_trace.span("sections") as span:
+        results = run_sections(sections, mile_index, rows, track, args.workers)
+        span.count("sections", len(results))
+
+    print(f"{len(results)} sections, {args.workers} worker(s)")
+    print(f"{'section':<16} {'miles':>7} {'water':>5} {'gap mi':>7} {'cover':>6} {'gain ft':>8} {'loss ft':>8}  checks")
+    for result in results:
+        cover = "" if result.coverage is None else f"{result.coverage:.0%}"
+        failed = [name for name, passed, _ in result.checks if not passed]
+        print(f"{result.section.name:<16} {result.length_mi:>7.2f} {len(result.water):>5} "
+              f"{result.max_water_gap_mi:>7.2f} {cover:>6} {result.gain_ft if result.gain_ft is not None else '':>8} "
+              f"{result.loss_ft if result.loss_ft is not None else '':>8}  {'ok' if not failed else 'FAIL ' + ','.join(failed)}")
+    report = merge(results)
+    totals = report["totals"]
+    print(f"Total {totals['miles']:.2f} mi, {totals['waterSources']} water sources, "
+          f"gain {totals['gainFeet']} ft, loss {totals['lossFeet']} ft")
+
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        route_trace.dump_json(args.json, report, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""Opt-in stage instrumentation shared by the Python route scripts.
+
+Tracing is off unless ``ROUTE_TRACE`` is set (or a script is run with
+``--trace``); until then :func:`span` and :func:`count` are no-ops. When it
+is on, every span records:
+
+* wall time and its parent span, so nested stages form a tree;
+* ``tracemalloc`` memory at entry and exit, plus the peak reached inside;
+* counters such as ``points`` or ``bytes_read``, added with :func:`count`.
+
+Top-level spans (the stages) also record the allocation sites that grew most
+while they ran. With ``ROUTE_TRACE_PROFILE=1`` (``--profile``) each stage
+also gets its own cProfile dump.
+
+Each process writes ``<script>-<timestamp>-<pid>.json`` into the trace
+directory: ``$ROUTE_TRACE``, or ``.route-build/traces`` when the value is
+``1``. The variable is inherited, so pipeline worker processes write their
+own traces next to the parent's.
+
+    ROUTE_TRACE=1 python scripts/route_pipeline.py --force
+    python scripts/parse_water_csv.py --trace /tmp/traces --profile
+    python scripts/route_trace.py .route-build/traces/*.json   # summarize
+"""
+from __future__ import annotations
+
+import argparse
+import atexit
+import cProfile
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_TRACE_DIR = ROOT / ".route-build" / "traces"
+TRACE_ENV = "ROUTE_TRACE"
+PROFILE_ENV = "ROUTE_TRACE_PROFILE"
+TOP_ALLOCATIONS = 10
+_FALSE = ("", "0", "false", "no", "off")
+
+
+@dataclass
+class Span:
+    id: int
+    name: str
+    parent: Optional[int]
+    start_s: float
+    attrs: Dict[str, object] = field(default_factory=dict)
+    counters: Dict[str, float] = field(default_factory=dict)
+    seconds: float = 0.0
+    start_bytes: int = 0
+    end_bytes: int = 0
+    peak_bytes: int = 0
+    top_allocations: List[Dict[str, object]] = field(default_factory=list)
+    profile: Optional[str] = None
+
+    def count(self, name: str, amount: float = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def to_json(self) -> Dict[str, object]:
+        record: Dict[str, object] = {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_s": round(self.start_s, 6),
+            "seconds": round(self.seconds, 6),
+            "memory": {"start_bytes": self.start_bytes, "end_bytes": self.end_bytes, "peak_bytes": self.peak_bytes},
+        }
+        for key in ("attrs", "counters", "top_allocations", "profile"):
+            if getattr(self, key):
+                record[key] = getattr(self, key)
+        return record
+
+
+class _NullSpan:
+    """Returned by :func:`span` while tracing is off."""
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def count(self, name: str, amount: float = 1) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _ActiveSpan:
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, object]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.enter(self.name, self.attrs)
+        return self.span
+
+    def __exit__(self, *exc) -> None:
+        self.tracer.exit(self.span)
+
+
+def _script_name() -> str:
+    argv0 = sys.argv[0] if sys.argv else ""
+    return Path(argv0).stem if argv0 not in ("", "-", "-c") else "python"
+
+
+class Tracer:
+    """Collect spans for one process and write them as a JSON trace."""
+
+    def __init__(self, directory: Path, profile: bool = False, script: Optional[str] = None) -> None:
+        self.directory = Path(directory)
+        self.profile = profile
+        self.script = script or _script_name()
+        self.pid = os.getpid()
+        self.started = datetime.now(timezone.utc)
+        self.stem = f"{self.script}-{self.started:%Y%m%dT%H%M%S}-{self.pid}"
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self.stack: List[Span] = []
+        # Peak seen by each open span before a child reset the tracemalloc peak.
+        self._peaks: Dict[int, int] = {}
+        self._snapshots: Dict[int, tracemalloc.Snapshot] = {}
+        self._profiler: Optional[cProfile.Profile] = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def path(self) -> Path:
+        return self.directory / f"{self.stem}.json"
+
+    def span(self, name: str, **attrs) -> _ActiveSpan:
+        return _ActiveSpan(self, name, attrs)
+
+    def count(self, name: str, amount: float = 1) -> None:
+        """Add to a counter on the innermost open span."""
+        if self.stack:
+            self.stack[-1].count(name, amount)
+
+    def enter(self, name: str, attrs: Dict[str, object]) -> Span:
+        current, peak = tracemalloc.get_traced_memory()
+        if self.stack:
+            parent = self.stack[-1]
+            self._peaks[parent.id] = max(self._peaks[parent.id], peak)
+        tracemalloc.reset_peak()
+        span = Span(len(self.spans), name, self.stack[-1].id if self.stack else None,
+                    time.perf_counter() - self.origin, dict(attrs), start_bytes=current)
+        self.spans.append(span)
+        self.stack.append(span)
+        self._peaks[span.id] = current
+        if span.parent is None:
+            self._snapshots[span.id] = tracemalloc.take_snapshot()
+            if self.profile and self._profiler is None:
+                self._profiler = cProfile.Profile()
+                self._profiler.enable()
+        return span
+
+    def exit(self, span: Span) -> None:
+        if span.parent is None and self._profiler is not None:
+            self._profiler.disable()
+        span.seconds = time.perf_counter() - self.origin - span.start_s
+        current, peak = tracemalloc.get_traced_memory()
+        span.end_bytes = current
+        span.peak_bytes = max(self._peaks.pop(span.id), peak)
+        tracemalloc.reset_peak()
+        self.stack.remove(span)
+        if self.stack:
+            parent = self.stack[-1]
+            self._peaks[parent.id] = max(self._peaks[parent.id], span.peak_bytes)
+        if span.parent is None:
+            self._finish_stage(span)
+
+    def _finish_stage(self, span: Span) -> None:
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        before = self._snapshots.pop(span.id).filter_traces(ignore)
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        grown = [stat for stat in after.compare_to(before, "lineno") if stat.size_diff > 0]
+        grown.sort(key=lambda stat: stat.size_diff, reverse=True)
+        for stat in grown[:TOP_ALLOCATIONS]:
+            frame = stat.traceback[0]
+            span.top_allocations.append(
+                {"site": f"{frame.filename}:{frame.lineno}", "size_diff_bytes": stat.size_diff,
+                 "count_diff": stat.count_diff}
+            )
+        if self._profiler is not None:
+            safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", span.name)
+            profile_path = self.directory / f"{self.stem}.{span.id}-{safe}.prof"
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._profiler.dump_stats(profile_path)
+            self._profiler = None
+            span.profile = str(profile_path)
+
+    def totals(self) -> Dict[str, float]:
+        """Counters summed over every span; each amount is recorded on one span only."""
+        totals: Dict[str, float] = {}
+        for span in self.spans:
+            for name, amount in span.counters.items():
+                totals[name] = totals.get(name, 0) + amount
+        return totals
+
+    def to_json(self) -> Dict[str, object]:
+        return {
+            "script": self.script,
+            "argv": sys.argv,
+            "pid": self.pid,
+            "python": platform.python_version(),
+            "started": self.started.isoformat(),
+            "wall_seconds": round(time.perf_counter() - self.origin, 6),
+            "peak_bytes": tracemalloc.get_traced_memory()[1] if tracemalloc.is_tracing() else None,
+            "counters": self.totals(),
+            "spans": [span.to_json() for span in self.spans],
+        }
+
+    def write(self) -> Optional[Path]:
+        """Write (or rewrite) this process's trace; returns ``None`` when empty."""
+        if not self.spans:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        return self.path
+
+
+_tracer: Optional[Tracer] = None
+
+
+def _trace_dir(value: str) -> Path:
+    return DEFAULT_TRACE_DIR if value.lower() in ("1", "true", "yes", "on") else Path(value)
+
+
+def _env_enabled(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() not in _FALSE
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Return this process's tracer, creating it from the environment on first use."""
+    global _tracer
+    if _tracer is not None and _tracer.pid != os.getpid():
+        # Forked worker: start a trace of its own rather than rewriting the parent's.
+        _tracer = None
+    if _tracer is None and _env_enabled(TRACE_ENV):
+        _tracer = Tracer(_trace_dir(os.environ[TRACE_ENV].strip()), profile=_env_enabled(PROFILE_ENV))
+        atexit.register(_write_at_exit, _tracer)
+    return _tracer
+
+
+def _write_at_exit(tracer: Tracer) -> None:
+    if tracer.pid == os.getpid():
+        path = tracer.write()
+        if path is not None:
+            print(f"[trace] wrote {path}", file=sys.stderr)
+
+
+def span(name: str, **attrs):
+    """Context manager timing one stage; a no-op unless tracing is enabled."""
+    tracer = get_tracer()
+    return NULL_SPAN if tracer is None else tracer.span(name, **attrs)
+
+
+def count(name: str, amount: float = 1) -> None:
+    """Add ``amount`` to counter ``name`` on the innermost open span."""
+    tracer = get_tracer()
+    if tracer is not None:
+        tracer.count(name, amount)
+
+
+def flush() -> Optional[Path]:
+    """Write the trace now; pool workers never reach ``atexit``."""
+    tracer = get_tracer()
+    return tracer.write() if tracer is not None else None
+
+
+def read_bytes(path) -> bytes:
+    """Read a file inside a ``read`` span that counts ``bytes_read``."""
+    with span("read", path=str(path)) as current:
+        data = Path(path).read_bytes()
+        current.count("bytes_read", len(data))
+    return data
+
+
+def load_json(path):
+    """``json.load`` with disk time and decode time traced separately."""
+    raw = read_bytes(path)
+    with span("json_decode"):
+        return json.loads(raw)
+
+
+def dump_json(path, data, **options) -> None:
+    """``json.dump`` with encode time and disk time traced separately.
+
+    The file is replaced atomically through :func:`artifact_writer.write_bytes`.
+    """
+    import artifact_writer
+
+    with span("json_encode"):
+        payload = json.dumps(data, **options).encode("utf-8")
+    artifact_writer.write_bytes(path, payload)
+
+
+def add_trace_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--trace", nargs="?", const="1", metavar="DIR",
+        help=f"write a JSON stage trace (default directory {DEFAULT_TRACE_DIR.relative_to(ROOT)}); "
+             f"same as {TRACE_ENV}=DIR",
+    )
+    parser.add_argument("--profile", action="store_true", help="with --trace, dump cProfile stats per stage")
+
+
+def configure(args: argparse.Namespace) -> Optional[Tracer]:
+    """Apply ``--trace``/``--profile``; exported so child processes trace too."""
+    global _tracer
+    if getattr(args, "trace", None):
+        os.environ[TRACE_ENV] = args.trace
+        if getattr(args, "profile", False):
+            os.environ[PROFILE_ENV] = "1"
+        _tracer = None
+    return get_tracer()
+
+
+# -- summary ------------------------------------------------------------------
+
+
+def summarize(trace: Dict[str, object]) -> str:
+    """Render a trace as an indented table, slowest siblings first."""
+    spans = trace["spans"]
+    children: Dict[Optional[int], List[dict]] = {}
+    for record in spans:
+        children.setdefault(record["parent"], []).append(record)
+    lines = [f"{trace['script']} (pid {trace['pid']}): {trace['wall_seconds']:.3f}s wall",
+             f"{'span':<40} {'seconds':>9} {'peak MB':>8}  counters"]
+
+    def walk(parent: Optional[int], depth: int) -> None:
+        for record in sorted(children.get(parent, []), key=lambda r: -r["seconds"]):
+            counters = ", ".join(f"{k}={v:,.0f}" for k, v in record.get("counters", {}).items())
+            label = ("  " * depth + record["name"])[:40]
+            lines.append(f"{label:<40} {record['seconds']:>9.3f} "
+                         f"{record['memory']['peak_bytes'] / 1e6:>8.1f}  {counters}")
+            walk(record["id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize JSON traces written with ROUTE_TRACE.")
+    parser.add_argument("traces", nargs="*", type=Path, help=f"trace files (default: newest in {DEFAULT_TRACE_DIR})")
+    args = parser.parse_args(argv)
+    paths = args.traces or sorted(DEFAULT_TRACE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)[-1:]
+    if not paths:
+        parser.error(f"no traces found in {DEFAULT_TRACE_DIR}")
+    for index, path in enumerate(paths):
+        if index:
+            print()
+        print(summarize(json.loads(path.read_text(encoding="utf-8"))))
+
+
+if __name__ == "__main__":
+    main()
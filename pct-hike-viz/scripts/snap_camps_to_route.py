@@ -1,155 +1,84 @@
 #!/usr/bin/env python3
-"""Snap camp waypoints onto the Garmin-derived route path."""
+"""Snap day-stop camps onto the route path at their PCTA route miles.
+
+Each camp keeps its field location in ``geometry``; the on-trail point at its
+``routeMile`` (or ``pctMile`` less the route's ``start_pct_mile``) is written
+to ``trailCoordinates`` together with the field-to-trail offset.
+"""
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from math import cos, radians
+import argparse
 from pathlib import Path
-from typing import Iterable, List, Sequence, Tuple
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from geodesy import FEET_PER_METER, METERS_PER_MILE, as_coords, haversine, path_stations, points_at_stations
+import artifact_writer
+import route_trace
 
 ROOT = Path(__file__).resolve().parents[1]
 CANONICAL_PATH = ROOT / "public" / "data" / "hike_data.json"
-MIRROR_PATH = ROOT / "src" / "hike_data.json"
-TARGET_TYPES = {"Trailhead", "Camp"}
-MANUAL_ORIGINALS = {
-    "Burney Falls State Park": [-121.65, 41.012],
-    "Round Valley Campground": [-121.7, 40.95],
-    "Black Rock Camp": [-121.8, 40.9],
-    "Horse Camp": [-121.9, 40.85],
-    "Indian Springs Camp": [-122.0, 40.8],
-    "Castle Crags Vista Camp": [-122.3, 41.1],
-}
-
-
-@dataclass(frozen=True)
-class Vec2:
-    x: float
-    y: float
-
-    def __sub__(self, other: "Vec2") -> "Vec2":
-        return Vec2(self.x - other.x, self.y - other.y)
-
-    def dot(self, other: "Vec2") -> float:
-        return self.x * other.x + self.y * other.y
-
-    def scale(self, factor: float) -> "Vec2":
-        return Vec2(self.x * factor, self.y * factor)
-
-    def length(self) -> float:
-        return (self.x * self.x + self.y * self.y) ** 0.5
-
-
-@dataclass
-class Projection:
-    point: Vec2
-    offset: float
-
-
-def deg_to_xy_converter(path: Sequence[Sequence[float]]):
-    """Return helpers to convert lon/lat <-> planar meters around the route."""
-    lons = [p[0] for p in path]
-    lats = [p[1] for p in path]
-    lon0 = sum(lons) / len(lons)
-    lat0 = sum(lats) / len(lats)
-    meters_per_deg_lat = 111_132.92  # WGS84 meridional radius approx
-    meters_per_deg_lon = meters_per_deg_lat * cos(radians(lat0))
-
-    def to_xy(lon: float, lat: float) -> Vec2:
-        return Vec2((lon - lon0) * meters_per_deg_lon, (lat - lat0) * meters_per_deg_lat)
-
-    def to_lonlat(vec: Vec2) -> Tuple[float, float]:
-        return (
-            vec.x / meters_per_deg_lon + lon0,
-            vec.y / meters_per_deg_lat + lat0,
-        )
-
-    return to_xy, to_lonlat
-
-
-def iter_segments(points: Sequence[Vec2]) -> Iterable[Tuple[int, Vec2, Vec2]]:
-    for idx in range(len(points) - 1):
-        yield idx, points[idx], points[idx + 1]
-
-
-def point_at_distance(path: Sequence[Vec2], seg_lengths: Sequence[float], target: float) -> Projection:
-    """Return the coordinate that lies `target` meters along the path."""
-    if target <= 0:
-        return Projection(path[0], 0.0)
-
-    traversed = 0.0
-    for idx, a, b in iter_segments(path):
-        seg_len = seg_lengths[idx]
-        next_distance = traversed + seg_len
-        if target <= next_distance:
-            ratio = (target - traversed) / seg_len if seg_len else 0.0
-            point = Vec2(a.x + (b.x - a.x) * ratio, a.y + (b.y - a.y) * ratio)
-            return Projection(point, traversed + seg_len * ratio)
-        traversed = next_distance
-    return Projection(path[-1], traversed)
-
-
-def build_segment_lengths(path: Sequence[Vec2]) -> List[float]:
-    lengths = []
-    for _, a, b in iter_segments(path):
-        lengths.append((b - a).length())
-    return lengths
-
-
-def main() -> None:
-    data = json.loads(CANONICAL_PATH.read_text())
-    route_path = data["route"]["path"]
-    to_xy, to_lonlat = deg_to_xy_converter(route_path)
-    xy_path = [to_xy(lon, lat) for lon, lat in route_path]
-    seg_lengths = build_segment_lengths(xy_path)
-    total_path_m = sum(seg_lengths)
-
-    camps = [
-        feature for feature in data["features"]
-        if feature["properties"].get("type") in TARGET_TYPES and feature["properties"].get("day") is not None
-    ]
-    camps.sort(key=lambda f: f["properties"]["day"])
+MIRROR_PATHS = artifact_writer.HIKE_DATA_MIRRORS
+TARGET_TYPES = {"Trailhead", "Camp", "Finish"}
 
-    updated = []
-    miles_so_far = 0.0
+
+def camp_miles(camps: Sequence[dict], start_pct_mile: Optional[float]) -> List[float]:
+    """Route mile of each camp: its ``routeMile``, else ``pctMile - start_pct_mile``."""
+    miles = []
     for feature in camps:
-        props = feature.setdefault("properties", {})
-        if props.get("day", 0) == 0:
-            target_miles = 0.0
+        props = feature["properties"]
+        if props.get("routeMile") is not None:
+            miles.append(float(props["routeMile"]))
+        elif props.get("pctMile") is not None and start_pct_mile is not None:
+            miles.append(float(props["pctMile"]) - float(start_pct_mile))
         else:
-            miles_so_far += float(props.get("distance") or 0)
-            target_miles = miles_so_far
-
-        target_meters = min(target_miles * 1609.34, total_path_m)
-        projection = point_at_distance(xy_path, seg_lengths, target_meters)
-        lonlat = tuple(round(value, 6) for value in to_lonlat(projection.point))
-
-        original = list(feature["geometry"]["coordinates"])
-        stored_original = props.get("originalCoordinates")
-        manual_original = MANUAL_ORIGINALS.get(props.get("name"))
-        if manual_original is not None:
-            stored_original = manual_original
-        elif stored_original is None:
-            stored_original = original
-        props["originalCoordinates"] = stored_original
-        props["routeMile"] = round(target_miles, 2)
-        feature["geometry"]["coordinates"] = list(lonlat)
-
-        updated.append((props.get("name"), stored_original, lonlat, target_miles))
-
-    # Write canonical runtime artifact
-    payload = json.dumps(data, indent=2)
-    CANONICAL_PATH.write_text(payload, encoding="utf-8")
-
-    # Mirror to src/ for tooling that still expects that path
-    try:
-        MIRROR_PATH.write_text(payload, encoding="utf-8")
-    except Exception as exc:  # noqa: BLE001
-        print(f"Warning: failed to mirror to {MIRROR_PATH}: {exc}")
+            raise ValueError(f"{props.get('name')!r} has neither routeMile nor pctMile")
+    return miles
+
+
+def snap_camps(data: dict) -> List[tuple]:
+    """Set ``trailCoordinates`` on every day-stop camp in ``data``; return what moved.
+
+    Targets are placed on the path's own routeMile column when it has one, so
+    a camp lands on the same vertex the canonical builder inserted for it.
+    """
+    route = data["route"]
+    route_array = as_coords(route["path"])
+    camps = sorted(
+        (feature for feature in data["features"]
+         if feature["properties"].get("type") in TARGET_TYPES and feature["properties"].get("day") is not None),
+        key=lambda f: f["properties"]["day"],
+    )
+    miles = camp_miles(camps, route.get("metadata", {}).get("start_pct_mile"))
+
+    with route_trace.span("snap") as span:
+        snapped = points_at_stations(route_array[:, :2], path_stations(route_array),
+                                     np.asarray(miles) * METERS_PER_MILE)
+        span.count("points", len(miles))
+
+    updated = []
+    for feature, mile, (lon, lat) in zip(camps, miles, snapped.tolist()):
+        props = feature["properties"]
+        trail = [round(lon, 9), round(lat, 9)]
+        field = feature["geometry"]["coordinates"]
+        props["trailCoordinates"] = trail
+        props["fieldToTrailOffsetFeet"] = round(float(haversine(field[0], field[1], trail[0], trail[1])) * FEET_PER_METER)
+        updated.append((props.get("name"), field, trail, mile))
+    return updated
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[0]).parse_args(argv)
+    data = route_trace.load_json(CANONICAL_PATH)
+    updated = snap_camps(data)
+
+    # One serialization for the runtime artifact and its mirrors
+    print(artifact_writer.describe(artifact_writer.publish_json(CANONICAL_PATH, data, MIRROR_PATHS)))
 
     print("Updated waypoints:")
-    for name, original, snapped, mile in updated:
-        print(f"- {name}: {original} -> {snapped} (mile {mile:.2f})")
+    for name, field, trail, mile in updated:
+        print(f"- {name}: {field} -> {trail} (mile {mile:.2f})")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import artifact_writer
+import route_trace
+from artifact_writer import describe, publish_json
+
+
+class TestArtifactWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.path = self.root / "public" / "hike_data.json"
+        (self.root / "src").mkdir()
+        (self.root / "ios").mkdir()
+        self.mirrors = (self.root / "src" / "hike_data.json", self.root / "ios" / "hike_data.json")
+        self.data = {"route": {"path": [[-121.6, 41.0, 3000.0, 0.0]] * 50}, "features": []}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def leftovers(self):
+        return sorted(p.name for p in self.root.rglob("*.tmp"))
+
+    def test_publishes_minified_with_mirrors(self):
+        result = publish_json(self.path, self.data, self.mirrors)
+        payload = self.path.read_bytes()
+        self.assertEqual(payload, json.dumps(self.data, separators=(",", ":")).encode("utf-8"))
+        self.assertTrue(result.changed)
+        self.assertEqual(result.mirrors, self.mirrors)
+        for mirror in self.mirrors:
+            self.assertTrue(os.path.samefile(self.path, mirror))
+        self.assertEqual(sorted(p.name for p in self.path.parent.iterdir()), ["hike_data.json"])
+        self.assertEqual(self.leftovers(), [])
+        self.assertIn("mirror", describe(result))
+
+    def test_republishing_same_data_leaves_files_alone(self):
+        publish_json(self.path, self.data, self.mirrors)
+        before = self.path.stat().st_mtime_ns, self.path.stat().st_ino
+        result = publish_json(self.path, self.data, self.mirrors)
+        self.assertFalse(result.changed)
+        self.assertEqual((self.path.stat().st_mtime_ns, self.path.stat().st_ino), before)
+
+    def test_mirrors_follow_a_new_canonical_file(self):
+        publish_json(self.path, self.data, self.mirrors)
+        self.data["features"].append({"name": "camp"})
+        publish_json(self.path, self.data, self.mirrors)
+        for mirror in self.mirrors:
+            self.assertEqual(json.loads(mirror.read_text()), self.data)
+
+    def test_copies_when_hard_links_fail(self):
+        with mock.patch("artifact_writer.os.link", side_effect=OSError("cross-device link")):
+            publish_json(self.path, self.data, self.mirrors)
+        for mirror in self.mirrors:
+            self.assertFalse(os.path.samefile(self.path, mirror))
+            self.assertEqual(mirror.read_bytes(), self.path.read_bytes())
+
+    def test_skips_mirrors_without_a_directory(self):
+        result = publish_json(self.path, self.data, (self.root / "missing" / "hike_data.json",))
+        self.assertEqual(result.mirrors, ())
+
+    def test_failed_write_keeps_previous_file(self):
+        publish_json(self.path, self.data)
+        original = self.path.read_bytes()
+        with mock.patch("route_trace.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                publish_json(self.path, {"route": {"path": []}})
+        self.assertEqual(self.path.read_bytes(), original)
+        self.assertEqual(self.leftovers(), [])
+
+    def test_stale_compressed_siblings_are_removed(self):
+        self.path.parent.mkdir(parents=True)
+        siblings = [self.path.with_name("hike_data.json" + suffix) for suffix in (".gz", ".br")]
+        for sibling in siblings:
+            sibling.write_bytes(b"stale")
+        publish_json(self.path, self.data)
+        self.assertFalse(any(sibling.exists() for sibling in siblings))
+
+    def test_pretty_output_on_request(self):
+        publish_json(self.path, self.data, indent=2)
+        self.assertEqual(self.path.read_text(), json.dumps(self.data, indent=2))
+
+    def test_write_bytes_is_atomic_for_dump_json(self):
+        target = self.root / "report.json"
+        target.write_text("old")
+        with mock.patch("artifact_writer.os.fsync", side_effect=OSError("io error")):
+            with self.assertRaises(OSError):
+                route_trace.dump_json(target, {"new": True})
+        self.assertEqual(target.read_text(), "old")
+        self.assertEqual(self.leftovers(), [])
+        self.assertEqual(artifact_writer.encode_json({"a": [1, 2]}), b'{"a":[1,2]}')
+
+
+if __name__ == "__main__":
+    unittest.main()
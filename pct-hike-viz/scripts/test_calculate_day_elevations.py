@@ -1,6 +1,6 @@
 import unittest
 import math
-from calculate_day_elevations import haversine
+from geodesy import haversine
 
 class TestCalculateDayElevations(unittest.TestCase):
     def test_haversine_identical_points(self):
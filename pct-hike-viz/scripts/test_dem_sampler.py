@@ -0,0 +1,159 @@
+import contextlib
+import io
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+import dem_sampler
+from dem_sampler import DemFormatError, DemSampler, read_tile_source
+from geodesy import FEET_PER_METER
+
+DX = DY = 0.01
+NODATA = -9999.0
+
+
+def plane(lon, lat):
+    return 500.0 + 1000.0 * (lon + 122.0) + 2000.0 * (lat - 41.0)
+
+
+def grid_values(west, north, width=20, height=10):
+    """Sample the plane at pixel centers of a north-up grid."""
+    lons = west + (np.arange(width) + 0.5) * DX
+    lats = north - (np.arange(height) + 0.5) * DY
+    return plane(lons[None, :], lats[:, None]).astype(np.float32)
+
+
+def write_npy(path, west, north, values, **meta):
+    np.save(path, values)
+    path.with_suffix(".json").write_text(json.dumps({"west": west, "north": north, "dx": DX, "dy": DY, **meta}))
+
+
+def write_bil(path, west, north, values):
+    values.astype(">f4").tofile(path)
+    path.with_suffix(".hdr").write_text(
+        f"BYTEORDER M\nLAYOUT BIL\nNROWS {values.shape[0]}\nNCOLS {values.shape[1]}\nNBANDS 1\nNBITS 32\n"
+        f"PIXELTYPE FLOAT\nULXMAP {west + DX / 2}\nULYMAP {north - DY / 2}\nXDIM {DX}\nYDIM {DY}\nNODATA {NODATA}\n"
+    )
+
+
+def write_geotiff(path, west, north, values):
+    """Write a minimal uncompressed, single-strip float32 GeoTIFF."""
+    height, width = values.shape
+    body = values.astype("<f4").tobytes()
+    nodata = f"{NODATA:g}".encode() + b"\0"
+    # (tag, type, count, little-endian payload); the strip offset is patched below.
+    entries = [
+        (256, 4, 1, struct.pack("<I", width)), (257, 4, 1, struct.pack("<I", height)),
+        (258, 3, 1, struct.pack("<H", 32)), (259, 3, 1, struct.pack("<H", 1)), (273, 4, 1, None),
+        (277, 3, 1, struct.pack("<H", 1)), (278, 4, 1, struct.pack("<I", height)),
+        (279, 4, 1, struct.pack("<I", len(body))), (339, 3, 1, struct.pack("<H", 3)),
+        (33550, 12, 3, struct.pack("<3d", DX, DY, 0.0)),
+        (33922, 12, 6, struct.pack("<6d", 0, 0, 0, west, north, 0)),
+        (42113, 2, len(nodata), nodata),
+    ]
+    extra_at = 8 + 2 + 12 * len(entries) + 4
+    strip_at = extra_at + sum(len(payload) for *_, payload in entries if payload and len(payload) > 4)
+    ifd, extra = struct.pack("<H", len(entries)), b""
+    for tag, kind, count, payload in entries:
+        payload = struct.pack("<I", strip_at) if payload is None else payload
+        if len(payload) > 4:
+            ifd += struct.pack("<HHII", tag, kind, count, extra_at + len(extra))
+            extra += payload
+        else:
+            ifd += struct.pack("<HHI", tag, kind, count) + payload.ljust(4, b"\0")
+    path.write_bytes(b"II*\0" + struct.pack("<I", 8) + ifd + struct.pack("<I", 0) + extra + body)
+
+
+class TestDemSampler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_plane(self, path, west=-122.0, north=41.1):
+        source = read_tile_source(path)
+        sampler = DemSampler([source])
+        rng = np.random.default_rng(3)
+        lons = rng.uniform(west + DX, west + 19 * DX, 200)
+        lats = rng.uniform(north - 9 * DY, north - DY, 200)
+        np.testing.assert_allclose(sampler.sample(lons, lats), plane(lons, lats), rtol=1e-5)
+        return sampler
+
+    def test_npy_tile(self):
+        path = self.root / "tile.npy"
+        write_npy(path, -122.0, 41.1, grid_values(-122.0, 41.1))
+        sampler = self.check_plane(path)
+        self.assertIsInstance(sampler.array(sampler.sources[0]), np.memmap)
+
+    def test_bil_tile(self):
+        path = self.root / "tile.bil"
+        write_bil(path, -122.0, 41.1, grid_values(-122.0, 41.1))
+        self.check_plane(path)
+
+    def test_geotiff_tile_is_memory_mapped(self):
+        path = self.root / "tile.tif"
+        write_geotiff(path, -122.0, 41.1, grid_values(-122.0, 41.1))
+        sampler = self.check_plane(path)
+        self.assertIsInstance(sampler.array(sampler.sources[0]), np.memmap)
+
+    def test_feet_units_and_nodata(self):
+        values = grid_values(-122.0, 41.1) * np.float32(FEET_PER_METER)
+        values[0, 0] = NODATA
+        path = self.root / "feet.npy"
+        write_npy(path, -122.0, 41.1, values, units="ft", nodata=NODATA)
+        sampler = DemSampler([read_tile_source(path)])
+        result = sampler.sample([-122.0 + DX, -121.9], [41.1 - DY / 2, 41.05])
+        self.assertTrue(np.isnan(result[0]))
+        self.assertAlmostEqual(result[1], plane(-121.9, 41.05), places=2)
+
+    def test_multiple_tiles_and_lru(self):
+        for index, west in enumerate((-122.0, -121.8, -121.6)):
+            write_npy(self.root / f"t{index}.npy", west, 41.1, grid_values(west, 41.1))
+        sampler = DemSampler.from_paths([self.root], cache_size=2)
+        lons = np.array([-121.95, -121.75, -121.55, -121.0])
+        lats = np.full(4, 41.05)
+        result = sampler.sample(lons, lats)
+        np.testing.assert_allclose(result[:3], plane(lons[:3], lats[:3]), rtol=1e-5)
+        self.assertTrue(np.isnan(result[3]))
+        self.assertEqual(sampler.loads, 3)
+        sampler.sample(lons[2:3], lats[2:3])
+        self.assertEqual(sampler.loads, 3)
+        sampler.sample(lons[:1], lats[:1])
+        self.assertEqual(sampler.loads, 4)
+
+    def test_profile_matches_points_to_path_input(self):
+        path = self.root / "tile.npy"
+        write_npy(path, -122.0, 41.1, grid_values(-122.0, 41.1))
+        profile = DemSampler.from_paths([path]).profile([[-121.9, 41.05, 0.0, 1.0]])
+        self.assertEqual(profile.shape, (1, 3))
+        self.assertAlmostEqual(profile[0, 2], plane(-121.9, 41.05), places=3)
+
+    def test_write_keeps_route_miles(self):
+        tile = self.root / "tile.npy"
+        write_npy(tile, -122.0, 41.1, grid_values(-122.0, 41.1))
+        hike_data = self.root / "hike_data.json"
+        path = [[-121.9, 41.05, 1.0, 0.0], [-121.85, 41.04, 2.0, 2.75], [-121.0, 41.0, 3.0, 40.5]]
+        hike_data.write_text(json.dumps({"route": {"path": path, "properties": {}}}))
+        with contextlib.redirect_stdout(io.StringIO()):
+            dem_sampler.main([str(tile), "--hike-data", str(hike_data), "--write", "--cache-size", "1"])
+        route = json.loads(hike_data.read_text())["route"]
+        self.assertEqual([row[3] for row in route["path"]], [0.0, 2.75, 40.5])
+        self.assertEqual([row[:2] for row in route["path"]], [row[:2] for row in path])
+        expected = round(plane(-121.9, 41.05) * FEET_PER_METER, 1)
+        self.assertAlmostEqual(route["path"][0][2], expected, places=1)
+        self.assertEqual(route["path"][2][2], 3.0)
+        self.assertEqual(route["properties"]["min_elevation"], 3.0)
+
+    def test_rejects_unknown_suffix(self):
+        with self.assertRaises(DemFormatError):
+            read_tile_source(self.root / "tile.png")
+
+
+if __name__ == "__main__":
+    unittest.main()
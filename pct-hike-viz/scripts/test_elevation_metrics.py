@@ -0,0 +1,77 @@
+import json
+import unittest
+
+import numpy as np
+
+from elevation_metrics import (
+    CANONICAL_TERRAIN_PATH,
+    Profile,
+    hysteresis_changes,
+    model_grid,
+    parse_range,
+    smooth,
+    sweep,
+)
+
+
+def brute_smooth(stations, elevations, window):
+    radius = window / 2
+    return np.array([
+        elevations[(stations >= station - radius) & (stations <= station + radius)].mean() for station in stations
+    ])
+
+
+class TestElevationMetrics(unittest.TestCase):
+    def test_smooth_matches_brute_force(self):
+        rng = np.random.default_rng(5)
+        stations = np.cumsum(rng.uniform(1, 60, 500))
+        elevations = rng.normal(3000, 50, 500)
+        for window in (0, 50, 200, 1000):
+            np.testing.assert_allclose(smooth(stations, elevations, window), brute_smooth(stations, elevations, window))
+
+    def test_hysteresis_ignores_small_oscillations(self):
+        indices, changes = hysteresis_changes(np.array([0, 15, 5, 25, 10, 30, 0.0]), 20)
+        self.assertEqual(indices.tolist(), [3, 6])
+        self.assertEqual(changes.tolist(), [25, -25])
+
+    def test_threshold_carries_across_day_boundaries(self):
+        profile = Profile(np.arange(3) * 25.0, np.array([0, 15, 30.0]), np.array([0, 1, 2]))
+        days = profile.metrics(window_m=0, threshold_ft=20).days
+        self.assertEqual([day.gain_ft for day in days], [0, 30])
+
+    def test_resampled_inserts_exact_stops(self):
+        profile = Profile.resampled([0, 100, 260], [0, 10, 26], [0, 130, 260], interval_m=25)
+        self.assertEqual(profile.stations_m[profile.boundaries].tolist(), [0, 130, 260])
+        self.assertEqual(profile.stations_m[-2:].tolist(), [250, 260])
+        self.assertAlmostEqual(profile.elevations_ft[profile.boundaries[1]], 13.0)
+
+    def test_reproduces_canonical_contract(self):
+        data = json.loads(CANONICAL_TERRAIN_PATH.read_text(encoding="utf-8"))
+        profile = Profile.from_canonical()
+        selected = profile.metrics()
+        expected = data["selectedModel"]
+        self.assertEqual((selected.total_gain_ft, selected.total_loss_ft),
+                         (expected["totalGainFeet"], expected["totalLossFeet"]))
+        self.assertEqual((selected.min_ft, selected.max_ft),
+                         (expected["minElevationFeet"], expected["maxElevationFeet"]))
+        for day, reference in zip(selected.days, expected["daily"]):
+            self.assertEqual(
+                (day.day, day.distance_mi, day.high_ft, day.low_ft, day.gain_ft, day.loss_ft),
+                (reference["day"], reference["distanceMiles"], reference["highPointFeet"],
+                 reference["lowPointFeet"], reference["gainFeet"], reference["lossFeet"]),
+            )
+        results = sweep(profile, [(m["smoothingMeters"], m["thresholdFeet"]) for m in data["sensitivity"]])
+        self.assertEqual(
+            [(m.total_gain_ft, m.total_loss_ft) for m in results],
+            [(m["totalGainFeet"], m["totalLossFeet"]) for m in data["sensitivity"]],
+        )
+
+    def test_parallel_sweep_matches_serial(self):
+        profile = Profile.from_canonical()
+        pairs = model_grid(parse_range("100:300:100"), parse_range("10,20"))
+        self.assertEqual(sweep(profile, pairs, jobs=2), sweep(profile, pairs, jobs=1))
+        self.assertEqual(len(pairs), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
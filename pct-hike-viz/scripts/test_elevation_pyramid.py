@@ -0,0 +1,90 @@
+import json
+import unittest
+
+import numpy as np
+
+from elevation_pyramid import HIKE_DATA_PATH, ElevationPyramid, base_buckets
+
+
+def random_profile(n=2000, seed=4):
+    rng = np.random.default_rng(seed)
+    stations = np.concatenate(([0.0], np.cumsum(rng.uniform(0, 60, n - 1))))
+    return stations, 4000 + np.cumsum(rng.normal(0, 8, n))
+
+
+def brute_bucket(stations, z, lo, hi):
+    """Min, max and mean of the polyline on ``lo``..``hi`` from a dense resample."""
+    inside = (stations > lo) & (stations < hi)
+    grid = np.concatenate(([lo], stations[inside], [hi]))
+    values = np.interp(grid, stations, z)
+    mean = np.sum(np.diff(grid) * (values[:-1] + values[1:]) / 2) / (hi - lo) if hi > lo else values.mean()
+    return values.min(), values.max(), mean
+
+
+class TestElevationPyramid(unittest.TestCase):
+    def test_base_buckets_match_brute_force(self):
+        stations, z = random_profile()
+        level, widths = base_buckets(stations, z, 40.0)
+        self.assertAlmostEqual(widths.sum(), stations[-1])
+        for i in range(len(level)):
+            lo = i * 40.0
+            expected = brute_bucket(stations, z, lo, lo + widths[i])
+            np.testing.assert_allclose((level.min_ft[i], level.max_ft[i], level.mean_ft[i]), expected)
+
+    def test_every_level_summarizes_its_base_buckets(self):
+        stations, z = random_profile()
+        pyramid = ElevationPyramid.build(stations, z, 25.0)
+        base, widths = base_buckets(stations, z, 25.0)
+        self.assertEqual(len(pyramid.levels[-1]), 1)
+        for k, level in enumerate(pyramid.levels):
+            span = 2 ** k
+            self.assertEqual(len(level), -(-len(base) // span))
+            for i in (0, len(level) // 2, len(level) - 1):
+                part = slice(i * span, (i + 1) * span)
+                self.assertEqual(level.min_ft[i], base.min_ft[part].min())
+                self.assertEqual(level.max_ft[i], base.max_ft[part].max())
+                self.assertAlmostEqual(
+                    level.mean_ft[i], np.average(base.mean_ft[part], weights=widths[part]), places=6
+                )
+        top = pyramid.levels[-1]
+        self.assertEqual((top.min_ft[0], top.max_ft[0]), (z.min(), z.max()))
+
+    def test_window_picks_about_one_bucket_per_pixel(self):
+        stations, z = random_profile(5000)
+        pyramid = ElevationPyramid.build(stations, z, 10.0)
+        for start, end, width in ((0, stations[-1], 300), (5000, 9000, 800), (1000, 1200, 50), (70000, 71000, 10)):
+            window = pyramid.window(start, end, width)
+            self.assertLessEqual(len(window), width + 1)
+            if window.level:
+                self.assertGreater(len(window), width // 2 - 1)
+            self.assertLessEqual(window.starts_m[0], max(start, 0))
+            self.assertGreater(window.starts_m[-1] + window.bucket_m, min(end, stations[-1]) - 1e-9)
+            inside = (stations >= window.starts_m[0]) & (stations <= window.starts_m[-1] + window.bucket_m)
+            self.assertLessEqual(window.min_ft.min(), z[inside].min())
+            self.assertGreaterEqual(window.max_ft.max(), z[inside].max())
+
+    def test_payload_round_trip(self):
+        stations, z = random_profile(300)
+        pyramid = ElevationPyramid.build(stations, z)
+        loaded = ElevationPyramid.from_payload(json.loads(json.dumps(pyramid.to_payload())))
+        self.assertEqual(len(loaded.levels), len(pyramid.levels))
+        self.assertAlmostEqual(loaded.end_m, pyramid.end_m, places=2)
+        np.testing.assert_allclose(loaded.window(0, 2000, 20).max_ft, pyramid.window(0, 2000, 20).max_ft, atol=0.05)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            base_buckets([0.0], [1.0])
+        with self.assertRaises(ValueError):
+            ElevationPyramid.build([0.0, 10.0], [1.0, 2.0]).window(0, 10, 0)
+
+    def test_hike_data_envelope_matches_route(self):
+        path = json.loads(HIKE_DATA_PATH.read_text(encoding="utf-8"))["route"]["path"]
+        pyramid = ElevationPyramid.from_path(path)
+        elevations = [row[2] for row in path]
+        window = pyramid.window(pyramid.origin_m, pyramid.end_m, 600)
+        self.assertLessEqual(len(window), 600)
+        self.assertEqual((window.min_ft.min(), window.max_ft.max()), (min(elevations), max(elevations)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import math
+import struct
+import unittest
+from pathlib import Path
+
+from fit_decoder import FitDecodeError, decode_fit, fit_crc
+
+COURSE_FIT = Path(__file__).resolve().parents[2] / "COURSE_334289912.fit"
+
+
+def degrees_to_semicircles(value):
+    return int(round(value * 2**31 / 180.0))
+
+
+def build_fit(body):
+    header = struct.pack("<BBHI4s", 12, 0x10, 2132, len(body), b".FIT")
+    payload = header + body
+    return payload + struct.pack("<H", fit_crc(payload))
+
+
+def synthetic_course():
+    body = b""
+    # Local 0: big-endian record with lat, lon, altitude, distance.
+    body += bytes([0x40, 0, 1]) + struct.pack(">HB", 20, 4)
+    body += bytes([0, 4, 0x85, 1, 4, 0x85, 2, 2, 0x84, 5, 4, 0x86])
+    for lat, lon, altitude in ((41.0, -121.5, 1000.0), (41.001, -121.501, None)):
+        raw_altitude = 0xFFFF if altitude is None else int((altitude + 500) * 5)
+        body += bytes([0x00]) + struct.pack(
+            ">iiHI",
+            degrees_to_semicircles(lat),
+            degrees_to_semicircles(lon),
+            raw_altitude,
+            12_345,
+        )
+    # Local 1: little-endian course point with lat, lon, distance, type, 8-byte name.
+    body += bytes([0x41, 0, 0]) + struct.pack("<HB", 32, 5)
+    body += bytes([2, 4, 0x85, 3, 4, 0x85, 4, 4, 0x86, 5, 1, 0x00, 6, 8, 0x07])
+    body += bytes([0x01]) + struct.pack(
+        "<iiIB8s",
+        degrees_to_semicircles(41.0005),
+        degrees_to_semicircles(-121.5005),
+        5_000,
+        0,
+        b"Spring\0\0",
+    )
+    return build_fit(body)
+
+
+class TestFitDecoder(unittest.TestCase):
+    def test_decodes_records_and_course_points(self):
+        course, stats = decode_fit(synthetic_course())
+        self.assertEqual(stats.points, 2)
+        self.assertAlmostEqual(course.coords[0, 0], -121.5, places=6)
+        self.assertAlmostEqual(course.coords[0, 1], 41.0, places=6)
+        self.assertAlmostEqual(course.coords[0, 2], 1000.0)
+        self.assertTrue(math.isnan(course.coords[1, 2]))
+        self.assertAlmostEqual(course.distance_m[0], 123.45)
+        self.assertEqual(len(course.course_points), 1)
+        point = course.course_points[0]
+        self.assertEqual(point["name"], "Spring")
+        self.assertAlmostEqual(point["distance_m"], 50.0)
+
+    def test_rejects_corrupt_crc(self):
+        data = bytearray(synthetic_course())
+        data[20] ^= 0xFF
+        with self.assertRaises(FitDecodeError):
+            decode_fit(bytes(data))
+
+    def test_shipped_course_file(self):
+        course, stats = decode_fit(COURSE_FIT)
+        self.assertEqual(course.name, "CA Section O PCT 2025")
+        self.assertEqual(stats.points, 9439)
+        # Burney Falls trailhead sits near 3,020 ft.
+        self.assertAlmostEqual(course.coords[0, 2] * 3.28084, 3020, delta=5)
+
+
+if __name__ == "__main__":
+    unittest.main()
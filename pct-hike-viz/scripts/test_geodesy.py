@@ -0,0 +1,93 @@
+import math
+import unittest
+
+import numpy as np
+
+from geodesy import (
+    LocalProjection,
+    as_coords,
+    bearings,
+    cumulative_stations,
+    haversine,
+    locate_stations,
+    nearest_vertex,
+    points_at_stations,
+    segment_lengths,
+)
+
+ONE_DEGREE_M = (2 * math.pi * 6371000) / 360
+
+
+class TestGeodesy(unittest.TestCase):
+    def setUp(self):
+        self.coords = as_coords([
+            [0.0, 0.0, 100.0],
+            [1.0, 0.0, 110.0],
+            [1.0, 1.0, 120.0],
+            [0.0, 1.0, 130.0],
+        ])
+
+    def test_haversine_broadcasts_over_arrays(self):
+        """Array inputs should match the scalar result element-wise."""
+        lons = np.array([0.0, 1.0, 2.0])
+        lats = np.zeros(3)
+        distances = haversine(0.0, 0.0, lons, lats)
+        self.assertEqual(distances.shape, (3,))
+        for expected, actual in zip((0.0, ONE_DEGREE_M, 2 * ONE_DEGREE_M), distances):
+            self.assertAlmostEqual(actual, expected, delta=1.0)
+
+    def test_segment_lengths_and_stations(self):
+        """Stations are the running sum of segment lengths, starting at 0."""
+        lengths = segment_lengths(self.coords[:, 0], self.coords[:, 1])
+        stations = cumulative_stations(self.coords[:, 0], self.coords[:, 1])
+        self.assertEqual(lengths.shape, (3,))
+        self.assertEqual(stations.shape, (4,))
+        self.assertEqual(stations[0], 0.0)
+        np.testing.assert_allclose(np.diff(stations), lengths)
+        self.assertAlmostEqual(lengths[0], ONE_DEGREE_M, delta=1.0)
+
+    def test_bearings_cardinal_directions(self):
+        """East, north, then west along the test square."""
+        np.testing.assert_allclose(
+            bearings(self.coords[:, 0], self.coords[:, 1]),
+            [90.0, 0.0, 270.0],
+            atol=0.01,
+        )
+
+    def test_nearest_vertex(self):
+        index, meters = nearest_vertex(self.coords, 0.9, 1.05)
+        self.assertEqual(index, 2)
+        self.assertLess(meters, 13_000)
+
+    def test_local_projection_round_trip(self):
+        """Projecting to planar meters and back recovers the input."""
+        projection = LocalProjection.from_path(self.coords)
+        self.assertAlmostEqual(projection.lon0, 0.5)
+        self.assertAlmostEqual(projection.lat0, 0.5)
+        xy = projection.project(self.coords)
+        lon, lat = projection.to_lonlat(xy[:, 0], xy[:, 1])
+        np.testing.assert_allclose(lon, self.coords[:, 0], atol=1e-12)
+        np.testing.assert_allclose(lat, self.coords[:, 1], atol=1e-12)
+
+    def test_locate_stations_clamps_and_interpolates(self):
+        stations = np.array([0.0, 10.0, 10.0, 30.0])
+        segment, fraction = locate_stations(stations, [-5.0, 0.0, 5.0, 10.0, 20.0, 99.0])
+        np.testing.assert_array_equal(segment, [0, 0, 0, 0, 2, 2])
+        np.testing.assert_allclose(fraction, [0.0, 0.0, 0.5, 1.0, 0.5, 1.0])
+
+    def test_points_at_stations_batches_rows(self):
+        values = np.array([[0.0, 0.0], [10.0, 0.0], [10.0, 20.0]])
+        stations = np.array([0.0, 10.0, 30.0])
+        np.testing.assert_allclose(
+            points_at_stations(values, stations, [2.5, 20.0, 30.0]),
+            [[2.5, 0.0], [10.0, 10.0], [10.0, 20.0]],
+        )
+        np.testing.assert_allclose(points_at_stations(values[:, 0], stations, [5.0]), [5.0])
+
+    def test_as_coords_rejects_flat_input(self):
+        with self.assertRaises(ValueError):
+            as_coords([1.0, 2.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import math
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from gpx_stream import iter_gpx_chunks, read_gpx
+
+SAMPLE = b"""<?xml version="1.0"?>
+<gpx xmlns="http://www.topografix.com/GPX/1/1" version="1.1">
+  <wpt lat="41.5" lon="-121.5"><name>Not a track point</name></wpt>
+  <trk>
+    <name>Day 1</name>
+    <trkseg>
+      <trkpt lat="41.0" lon="-121.0"><ele>1000</ele></trkpt>
+      <trkpt lat="41.1" lon="-121.1"><ele>1010.5</ele></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="41.2" lon="-121.2"></trkpt>
+      <trkpt lon="-121.3"><ele>5</ele></trkpt>
+    </trkseg>
+  </trk>
+  <rte>
+    <name>Alternate</name>
+    <rtept lat="41.3" lon="-121.3"><ele>1020</ele></rtept>
+  </rte>
+</gpx>
+"""
+
+
+def write_synthetic_gpx(path, points):
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write('<?xml version="1.0"?>\n<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>\n')
+        for index in range(points):
+            handle.write(
+                f'<trkpt lat="{41 + index * 1e-6:.6f}" lon="{-121 - index * 1e-6:.6f}">'
+                f'<ele>{1000 + index % 50}</ele></trkpt>\n'
+            )
+        handle.write("</trkseg></trk></gpx>\n")
+
+
+class TestGpxStream(unittest.TestCase):
+    def test_reads_segments_and_routes_in_order(self):
+        gpx, stats = read_gpx(io.BytesIO(SAMPLE))
+        self.assertEqual(len(gpx), 4)
+        self.assertEqual(stats.points, 4)
+        self.assertEqual(gpx.coords[0].tolist(), [-121.0, 41.0, 1000.0])
+        self.assertTrue(math.isnan(gpx.coords[2, 2]))
+        self.assertEqual(
+            [(part.kind, part.name, part.start, part.stop) for part in gpx.parts],
+            [("trk", "Day 1", 0, 2), ("trk", "Day 1", 2, 3), ("rte", "Alternate", 3, 4)],
+        )
+
+    def test_chunks_cover_every_point(self):
+        sizes = [len(chunk) for chunk in iter_gpx_chunks(io.BytesIO(SAMPLE), chunk_points=3)]
+        self.assertEqual(sizes, [3, 1])
+
+    def test_peak_memory_does_not_track_file_size(self):
+        """Streaming ten times more points should not need ten times the memory."""
+        peaks = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for points in (5_000, 50_000):
+                path = os.path.join(tmp, f"{points}.gpx")
+                write_synthetic_gpx(path, points)
+                tracemalloc.start()
+                count = sum(len(chunk) for chunk in iter_gpx_chunks(path, chunk_points=4096))
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+                self.assertEqual(count, points)
+        self.assertLess(peaks[1], peaks[0] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
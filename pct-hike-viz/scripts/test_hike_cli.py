@@ -0,0 +1,89 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import hike_cli
+import route_data
+import route_trace
+from hike_cli import split_chain
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+def run(*argv):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        hike_cli.main(list(argv))
+    return out.getvalue()
+
+
+class ChainTest(unittest.TestCase):
+    def setUp(self):
+        route_data.clear()
+
+    def test_split_chain(self):
+        self.assertEqual(split_chain(["water", "1", "2", "+", "stats", "+"]), [["water", "1", "2"], ["stats"]])
+
+    def test_help_imports_no_numpy(self):
+        code = ("import sys, hike_cli\n"
+                "try:\n    hike_cli.main(['--help'])\nexcept SystemExit:\n    pass\n"
+                "print('numpy' in sys.modules, file=sys.stderr)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS_DIR, capture_output=True, text=True,
+                                check=True)
+        self.assertIn("day-split", result.stdout)
+        self.assertEqual(result.stderr.strip(), "False")
+
+    def test_replace_route_needs_a_source(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit) as exit:
+            run("replace-route")
+        self.assertEqual(exit.exception.code, 2)
+
+    def test_unknown_chained_command(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            hike_cli.main(["stats", "+", "nope"])
+
+    def test_chain_shares_one_load(self):
+        with mock.patch.object(route_trace, "load_json", wraps=route_trace.load_json) as load_json:
+            out = run("stats", "+", "day-split", "--days", "9", "+", "stats")
+        self.assertEqual(load_json.call_count, 1)
+        self.assertEqual(out.count("TRAIL DATA VALIDATION"), 2)
+        self.assertIn("9 days over", out)
+
+    def test_ingest_then_query(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = str(Path(tmp) / "water.sqlite")
+            out = run("ingest", "--store", store, "+", "water", "1420.6", "1472.5", "--since", "2026-06-01",
+                      "--store", store, "--json")
+        summary, payload = out.split("\n", 1)
+        self.assertIn("324 rows", summary)
+        self.assertEqual(len(json.loads(payload)), 27)
+
+
+class MemoTest(unittest.TestCase):
+    def setUp(self):
+        route_data.clear()
+
+    def test_reloads_only_after_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "hike_data.json"
+            path.write_text('{"route": {}}', encoding="utf-8")
+            first = route_data.hike_data(path)
+            self.assertIs(route_data.hike_data(path), first)
+            stat = path.stat()
+            path.write_text('{"route": 1}', encoding="utf-8")
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(route_data.hike_data(path), {"route": 1})
+            path.write_text('{"route": 2}', encoding="utf-8")
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            self.assertEqual(route_data.hike_data(path), {"route": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
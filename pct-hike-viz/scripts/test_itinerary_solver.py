@@ -0,0 +1,124 @@
+import unittest
+
+import numpy as np
+
+import itinerary_solver
+import route_trace
+from elevation_metrics import CANONICAL_TERRAIN_PATH, Profile
+from geodesy import METERS_PER_MILE
+from itinerary_solver import Candidate, ItinerarySolver, load_solver, route_candidates
+
+
+def brute_force(effort, days, miles=None, max_day_miles=None):
+    """O(days * K^2) reference DP over the same squared-effort cost."""
+    k = len(effort)
+    best = np.full(k, np.inf)
+    best[0] = 0.0
+    for _ in range(days):
+        layer = np.full(k, np.inf)
+        for j in range(1, k):
+            for i in range(j):
+                cost = best[i] + (effort[j] - effort[i]) ** 2
+                if max_day_miles is not None:
+                    cost += itinerary_solver.OVERRUN_PENALTY * max(miles[j] - miles[i] - max_day_miles, 0.0)
+                layer[j] = min(layer[j], cost)
+        best = layer
+    return best[-1]
+
+
+def hilly_profile(miles=40.0, seed=3):
+    rng = np.random.default_rng(seed)
+    stations = np.arange(0.0, miles * METERS_PER_MILE, 25.0)
+    elevations = 5000.0 + np.cumsum(rng.normal(0.0, 6.0, len(stations))) + 800.0 * np.sin(stations / 9000.0)
+    return Profile(stations, elevations, np.array([0, len(stations) - 1]))
+
+
+class SolverTest(unittest.TestCase):
+    def setUp(self):
+        self.profile = hilly_profile()
+        rng = np.random.default_rng(7)
+        self.candidates = [Candidate(float(m), f"camp {i}", "camp") for i, m in enumerate(rng.uniform(0, 40, 60))]
+
+    def test_matches_brute_force(self):
+        solver = ItinerarySolver(self.profile, self.candidates)
+        for days in (1, 2, 5, 9):
+            itinerary = solver.plan(days)
+            self.assertEqual(len(itinerary.days), days)
+            self.assertAlmostEqual(sum(d.effort ** 2 for d in itinerary.days), brute_force(solver.effort, days),
+                                   places=6)
+
+    def test_day_miles_cap(self):
+        solver = ItinerarySolver(self.profile, self.candidates, max_day_miles=6.0)
+        itinerary = solver.plan(8)
+        self.assertTrue(itinerary.feasible)
+        self.assertLessEqual(max(d.miles for d in itinerary.days), 6.0 + 1e-9)
+        self.assertAlmostEqual(sum(d.effort ** 2 for d in itinerary.days),
+                               brute_force(solver.effort, 8, solver.miles, 6.0), places=6)
+        self.assertFalse(ItinerarySolver(self.profile, self.candidates, max_day_miles=3.0).plan(2).feasible)
+
+    def test_days_tile_the_route(self):
+        solver = ItinerarySolver(self.profile, self.candidates)
+        itinerary = solver.plan(6)
+        self.assertEqual(itinerary.days[0].start.kind, "start")
+        self.assertEqual(itinerary.days[-1].end.kind, "finish")
+        for before, after in zip(itinerary.days, itinerary.days[1:]):
+            self.assertEqual(before.end, after.start)
+        self.assertAlmostEqual(sum(d.miles for d in itinerary.days), solver.miles[-1], places=9)
+        self.assertAlmostEqual(sum(d.gain_ft for d in itinerary.days), solver.gain_ft[-1], places=6)
+
+    def test_adding_a_day_reuses_layers_and_never_worsens_spread(self):
+        solver = ItinerarySolver(self.profile, self.candidates)
+        nine = solver.plan(9)
+        layers = len(solver._best)
+        ten = solver.plan(10)
+        self.assertEqual(len(solver._best), layers + 1)
+        self.assertLessEqual(sum(d.effort ** 2 for d in ten.days), sum(d.effort ** 2 for d in nine.days))
+        self.assertIs(solver.plan(9).days[0].end, nine.days[0].end)
+
+    def test_rejects_impossible_day_counts(self):
+        solver = ItinerarySolver(self.profile, self.candidates[:3])
+        with self.assertRaises(ValueError):
+            solver.plan(0)
+        with self.assertRaises(ValueError):
+            solver.plan(len(solver))
+
+    def test_duplicate_stations_prefer_camps(self):
+        candidates = [Candidate(10.0, "spring", "water"), Candidate(10.0, "camp", "camp"),
+                      Candidate(99.0, "beyond", "camp")]
+        solver = ItinerarySolver(self.profile, candidates)
+        self.assertEqual([c.label for c in solver.candidates], ["start", "camp", "finish"])
+
+    def test_route_candidates(self):
+        data = {
+            "features": [
+                {"geometry": {"type": "Point"}, "properties": {"name": "Vista Camp", "type": "camp", "routeMile": 3.5}},
+                {"geometry": {"type": "Point"}, "properties": {"name": "Off route", "type": "camp"}},
+                {"geometry": {"type": "LineString"}, "properties": {"routeMile": 1.0}},
+            ],
+            "waterSources": [{"name": "Spring", "routeMile": 2.0}, {"name": "Lake"}],
+        }
+        candidates = route_candidates(data, every_mi=2.0, route_miles=5.0)
+        self.assertEqual([(c.route_mile, c.kind) for c in candidates],
+                         [(3.5, "camp"), (2.0, "water"), (2.0, "grid"), (4.0, "grid")])
+
+
+class CanonicalTest(unittest.TestCase):
+    def test_canonical_boundaries_reproduce_daily_totals(self):
+        terrain = route_trace.load_json(CANONICAL_TERRAIN_PATH)
+        candidates = [Candidate(b["routeMile"], b["name"], "camp") for b in terrain["dayBoundaries"]]
+        solver = ItinerarySolver(Profile.from_canonical(CANONICAL_TERRAIN_PATH), candidates)
+        itinerary = solver.evaluate(range(len(solver)))
+        for day, reference in zip(itinerary.days, terrain["selectedModel"]["daily"]):
+            self.assertAlmostEqual(day.miles, reference["distanceMiles"], places=3)
+            self.assertEqual(round(day.gain_ft), reference["gainFeet"])
+            self.assertEqual(round(day.loss_ft), reference["lossFeet"])
+
+    def test_plan_over_bundle_candidates(self):
+        solver = load_solver(every_mi=0.25)
+        itinerary = solver.plan(9)
+        self.assertEqual(len(itinerary.days), 9)
+        self.assertLess(itinerary.spread, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import unittest
+
+import numpy as np
+
+from land_ownership import HIKE_DATA_PATH, OVERLAY_PATH, NO_PARCEL, ParcelIndex, classify_route, run_at
+
+
+def ray_cast(ring, x, y):
+    inside = False
+    for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]):
+        if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+            inside = not inside
+    return inside
+
+
+def brute_classify(features, x, y):
+    for feature_id, feature in enumerate(features):
+        geometry = feature["geometry"]
+        polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+        for polygon in polygons:
+            if ray_cast([tuple(p[:2]) for p in polygon[0]], x, y) and not any(
+                ray_cast([tuple(p[:2]) for p in hole], x, y) for hole in polygon[1:]
+            ):
+                return feature_id
+    return -1
+
+
+def star(cx, cy, radius, points, rng):
+    angles = np.sort(rng.uniform(0, 2 * np.pi, points))
+    radii = radius * rng.uniform(0.4, 1.0, points)
+    ring = np.column_stack((cx + radii * np.cos(angles), cy + radii * np.sin(angles))).tolist()
+    return ring + ring[:1]
+
+
+def square(x0, y0, size):
+    return [[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size], [x0, y0]]
+
+
+def feature(geometry_type, coordinates, **properties):
+    return {"type": "Feature", "geometry": {"type": geometry_type, "coordinates": coordinates}, "properties": properties}
+
+
+class ParcelIndexTest(unittest.TestCase):
+    def test_matches_brute_force_on_overlapping_stars(self):
+        rng = np.random.default_rng(7)
+        features = [
+            feature("Polygon", [star(*rng.uniform(0, 10, 2), rng.uniform(0.3, 2.0), int(rng.integers(5, 40)), rng)],
+                    apn=str(i), ownership="public")
+            for i in range(300)
+        ]
+        index = ParcelIndex(features)
+        x, y = rng.uniform(-1, 11, 1000), rng.uniform(-1, 11, 1000)
+        expected = [brute_classify(features, a, b) for a, b in zip(x, y)]
+        np.testing.assert_array_equal(index.classify(x, y), expected)
+
+    def test_holes_and_multipolygons(self):
+        features = [
+            feature("Polygon", [square(0, 0, 4), square(1, 1, 2)], ownership="public"),
+            feature("MultiPolygon", [[square(10, 0, 1)], [square(12, 0, 1)]], ownership="private"),
+            feature("Polygon", [square(1.5, 1.5, 1)], ownership="tribal"),
+        ]
+        index = ParcelIndex(features)
+        owners = index.classify([0.5, 1.2, 2.0, 10.5, 11.5, 12.5, 20.0], [0.5, 1.2, 2.0, 0.5, 0.5, 0.5, 0.0])
+        self.assertEqual(owners.tolist(), [0, -1, 2, 1, -1, 1, -1])
+        self.assertEqual(index.owner_at(0.5, 0.5)["ownership"], "public")
+        self.assertIsNone(index.owner_at(20.0, 0.0))
+
+    def test_first_feature_wins_where_parcels_overlap(self):
+        index = ParcelIndex([feature("Polygon", [square(0, 0, 2)]), feature("Polygon", [square(1, 1, 2)])])
+        self.assertEqual(index.classify([1.5, 2.5], [1.5, 2.5]).tolist(), [0, 1])
+
+    def test_deep_tree_over_thousands_of_parcels(self):
+        features = [feature("Polygon", [square(i % 80, i // 80, 1)]) for i in range(6400)]
+        index = ParcelIndex(features)
+        self.assertGreater(len(index._levels), 1)
+        rng = np.random.default_rng(3)
+        x, y = rng.uniform(0, 80, 5000), rng.uniform(0, 80, 5000)
+        expected = np.floor(y).astype(int) * 80 + np.floor(x).astype(int)
+        on_edge = (x % 1 == 0) | (y % 1 == 0)
+        np.testing.assert_array_equal(index.classify(x, y)[~on_edge], expected[~on_edge])
+
+    def test_rejects_overlay_without_polygons(self):
+        with self.assertRaises(ValueError):
+            ParcelIndex([feature("Point", [0, 0])])
+
+
+class ClassifyRouteTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.data = json.loads(HIKE_DATA_PATH.read_text(encoding="utf-8"))
+        cls.index = ParcelIndex.from_geojson(OVERLAY_PATH)
+        cls.runs, cls.waypoints = classify_route(cls.data, cls.index)
+
+    def test_runs_cover_route_without_gaps(self):
+        metadata = self.data["route"]["metadata"]
+        self.assertAlmostEqual(self.runs[0].start_mile, metadata["start_pct_mile"], places=3)
+        self.assertAlmostEqual(self.runs[-1].end_mile, metadata["finish_pct_mile"], places=3)
+        for before, after in zip(self.runs, self.runs[1:]):
+            self.assertEqual(before.end_mile, after.start_mile)
+            self.assertEqual(before.last + 1, after.first)
+            self.assertNotEqual((before.ownership, before.owner), (after.ownership, after.owner))
+
+    def test_route_vertices_match_brute_force(self):
+        features = self.index.features
+        path = self.data["route"]["path"][::25]
+        expected = [brute_classify(features, row[0], row[1]) for row in path]
+        np.testing.assert_array_equal(self.index.classify([r[0] for r in path], [r[1] for r in path]), expected)
+
+    def test_camps_are_on_public_land(self):
+        camps = [w for w in self.waypoints if w["kind"] == "Camp"]
+        self.assertTrue(camps)
+        self.assertTrue(all(w["ownership"] == "public" for w in camps))
+        self.assertNotIn(NO_PARCEL, {w["ownership"] for w in self.waypoints})
+
+    def test_run_at_clamps_to_route_ends(self):
+        self.assertIs(run_at(self.runs, 0.0), self.runs[0])
+        self.assertIs(run_at(self.runs, 1e9), self.runs[-1])
+        middle = self.runs[len(self.runs) // 2]
+        self.assertIs(run_at(self.runs, (middle.start_mile + middle.end_mile) / 2), middle)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import unittest
+
+import numpy as np
+
+import live_match
+import route_trace
+from geodesy import METERS_PER_DEG_LAT, METERS_PER_MILE
+from live_match import Fix, LiveMatcher, match_async, parse_fix, replay_fixes
+
+# Degrees of longitude per meter at 40 N.
+DEG_LON_PER_M = 1.0 / (METERS_PER_DEG_LAT * np.cos(np.radians(40.0)))
+
+
+def hairpin(leg_m=6000.0, gap_m=60.0, step_m=25.0):
+    """North ``leg_m`` along -121, across ``gap_m`` east, then back south."""
+    north = np.arange(0.0, leg_m + step_m, step_m) / METERS_PER_DEG_LAT
+    east = -121.0 + gap_m * DEG_LON_PER_M
+    out = np.column_stack((np.full_like(north, -121.0), 40.0 + north))
+    back = np.column_stack((np.full_like(north, east), 40.0 + north[::-1]))
+    return np.vstack((out, back))
+
+
+def walk(hiker, lats, lon, start_s=0.0, interval_s=60.0):
+    return [Fix(hiker, start_s + i * interval_s, lon, lat) for i, lat in enumerate(lats)]
+
+
+class LiveMatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.route = hairpin()
+        self.matcher = LiveMatcher(self.route, camps=[(2.0, "Low camp"), (6.0, "High camp")], start_mile=100.0)
+        # 2.5 mph northbound up the west leg. After three clean fixes the GPS drifts 35 m east,
+        # which is only 25 m from the return leg.
+        step = 2.5 * METERS_PER_MILE / 60.0
+        lats = 40.0 + (200.0 + step * np.arange(40)) / METERS_PER_DEG_LAT
+        self.fixes = walk("ann", lats[:3], -121.0 + 5.0 * DEG_LON_PER_M) + walk(
+            "ann", lats[3:], -121.0 + 35.0 * DEG_LON_PER_M, start_s=180.0)
+
+    def test_window_keeps_the_hiker_on_their_leg(self):
+        matches = self.matcher.process(self.fixes)
+        self.assertEqual(matches[0].status, live_match.ACQUIRED)
+        self.assertEqual({m.status for m in matches[1:]}, {live_match.TRACKING})
+        miles = np.array([m.route_mile for m in matches])
+        np.testing.assert_array_less(miles, 6000.0 / METERS_PER_MILE)
+        self.assertTrue(np.all(np.diff(miles) > 0))
+        self.assertAlmostEqual(matches[-1].pct_mile, 100.0 + miles[-1])
+        drifted = self.fixes[-1]
+        global_hit = self.matcher.index.nearest_segments([drifted.lon], [drifted.lat])
+        self.assertGreater(global_hit.station_m[0], 6000.0)
+
+    def test_pace_and_eta_to_next_camp(self):
+        last = self.matcher.process(self.fixes)[-1]
+        self.assertAlmostEqual(last.pace_mph, 2.5, delta=0.05)
+        self.assertEqual(last.next_camp, "Low camp")
+        self.assertAlmostEqual(last.camp_miles, 2.0 - last.route_mile, places=9)
+        self.assertAlmostEqual(last.eta_s, last.camp_miles / last.pace_mph * 3600.0, places=6)
+        payload = last.to_payload()
+        self.assertEqual(payload["nextCamp"], "Low camp")
+        self.assertEqual(payload["status"], live_match.TRACKING)
+
+    def test_off_route_and_reacquired(self):
+        self.matcher.process(self.fixes[:5])
+        detour = Fix("ann", 400.0, -121.02, 40.01)
+        back = Fix("ann", 2000.0, -121.0, 40.03)
+        away, returned = self.matcher.process([detour, back])
+        self.assertEqual(away.status, live_match.OFF_ROUTE)
+        self.assertGreater(away.off_route_m, live_match.OFF_ROUTE_M)
+        self.assertEqual(returned.status, live_match.REACQUIRED)
+        self.assertLess(returned.off_route_m, 1.0)
+
+    def test_batches_match_one_fix_at_a_time(self):
+        lats = 40.0 + np.linspace(500.0, 4000.0, 30) / METERS_PER_DEG_LAT
+        other = walk("bo", lats, -121.0 + 5.0 * DEG_LON_PER_M, start_s=30.0)
+        fixes = sorted(self.fixes + other, key=lambda fix: fix.time_s)
+        batched = LiveMatcher(self.route).process(fixes)
+        single = LiveMatcher(self.route)
+        self.assertEqual(batched, [single.update(fix) for fix in fixes])
+        streamed = list(LiveMatcher(self.route).stream(fixes, batch_size=7))
+        self.assertEqual(streamed, batched)
+        self.assertEqual([m.hiker for m in batched], [fix.hiker for fix in fixes])
+
+    def test_async_source(self):
+        async def source():
+            for fix in self.fixes:
+                if fix.time_s % 600 == 0:
+                    await asyncio.sleep(0.01)
+                yield fix
+
+        async def collect():
+            return [match async for match in match_async(LiveMatcher(self.route), source(), batch_size=16,
+                                                         linger_s=0.001)]
+
+        self.assertEqual(asyncio.run(collect()), LiveMatcher(self.route).process(self.fixes))
+
+    def test_parse_fix(self):
+        fix = parse_fix({"hiker": 7, "time": "2026-08-10T14:00:00+00:00", "lon": "-121.5", "lat": 41.0})
+        self.assertEqual(fix, Fix("7", 1786370400.0, -121.5, 41.0))
+        self.assertEqual(parse_fix({"hiker": "a", "time": 12, "lon": 0, "lat": 0}).time_s, 12.0)
+
+
+class HikeDataTest(unittest.TestCase):
+    def test_replayed_route_tracks_the_bundle(self):
+        data = route_trace.load_json(live_match.HIKE_DATA_PATH)
+        matcher = LiveMatcher.from_hike_data(data)
+        path = np.array(data["route"]["path"])
+        matches = matcher.process(replay_fixes(path[:, :3], hikers=3, interval_s=300.0))
+        self.assertEqual(len(matcher), 3)
+        self.assertTrue(all(m.off_route_m < 30.0 for m in matches))
+        first = next(m for m in matches if m.hiker == "hiker-1")
+        self.assertAlmostEqual(first.pct_mile, data["route"]["metadata"]["start_pct_mile"], delta=0.05)
+        self.assertEqual(first.next_camp, "Rock Creek camps")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import math
+import unittest
+
+import numpy as np
+
+from geodesy import haversine
+from mile_index import DEFAULT_CENTERLINE_PATH, MileIndex
+
+
+class TestMileIndex(unittest.TestCase):
+    def test_uneven_vertex_spacing_follows_markers(self):
+        """Miles interpolate between markers, not between array indices."""
+        coords = np.array([[0.0, 0.0], [0.001, 0.0], [0.002, 0.0], [0.01, 0.0]])
+        index = MileIndex(coords, np.array([100.0, 101.0]), np.array([0.0, 1000.0]))
+        stations = index.stations_for([100.0, 100.5, 101.0, 99.0, 102.0])
+        np.testing.assert_allclose(stations[:3], [0.0, 500.0, 1000.0])
+        self.assertTrue(math.isnan(stations[3]) and math.isnan(stations[4]))
+        np.testing.assert_allclose(index.miles_for([0.0, 500.0, 1000.0]), [100.0, 100.5, 101.0])
+        located, covered = index.locate([100.5, 102.0])
+        self.assertEqual(covered.tolist(), [True, False])
+        self.assertAlmostEqual(haversine(0.0, 0.0, located[0, 0], located[0, 1]), 500.0, delta=0.5)
+        self.assertTrue(np.isnan(located[1]).all())
+
+    def test_rejects_non_monotonic_markers(self):
+        with self.assertRaises(ValueError):
+            MileIndex(np.array([[0.0, 0.0], [1.0, 0.0]]), np.array([1.0, 2.0]), np.array([10.0, 5.0]))
+
+    def test_pcta_markers_round_trip(self):
+        index = MileIndex.from_centerline_geojson()
+        metadata = json.loads(DEFAULT_CENTERLINE_PATH.read_text(encoding="utf-8"))["metadata"]
+        self.assertAlmostEqual(index.start_mile, 1420.653)
+        self.assertAlmostEqual(index.end_mile, 1472.497)
+        markers = metadata["markerStations"]
+        located, covered = index.locate([marker["mile"] for marker in markers])
+        self.assertTrue(covered.all())
+        expected = np.array([marker["snappedCoordinate"] for marker in markers])
+        offsets = haversine(expected[:, 0], expected[:, 1], located[:, 0], located[:, 1])
+        self.assertLess(offsets.max(), 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from fit_decoder import decode_fit
+from geodesy import segment_lengths
+from gpx_stream import read_gpx
+from parse_water_csv import iter_water_rows
+from route_bench import (
+    STAGES, StageResult, compare, ensure_fixtures, measure, parse_size, synthetic_route, unmeasured,
+)
+
+
+def result(stage, seconds, rss=50.0, size=1000):
+    return StageResult(stage, size, size, seconds, size / seconds, rss, rss)
+
+
+class TestRouteBench(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parse_size(self):
+        self.assertEqual([parse_size(s) for s in ("1k", "10K", "2.5M", "500")], [1_000, 10_000, 2_500_000, 500])
+
+    def test_synthetic_route_is_seeded_and_gps_like(self):
+        coords = synthetic_route(5000, seed=4)
+        np.testing.assert_array_equal(coords, synthetic_route(5000, seed=4))
+        steps = segment_lengths(coords[:, 0], coords[:, 1])
+        self.assertGreaterEqual(steps.min(), 4.9)
+        self.assertLessEqual(steps.max(), 40.1)
+
+    def test_fixtures_round_trip_through_the_readers(self):
+        fixtures = ensure_fixtures(2000, root=self.root)
+        coords = np.load(fixtures.route)
+        gpx, _ = read_gpx(fixtures.gpx)
+        fit, _ = decode_fit(fixtures.fit)
+        np.testing.assert_allclose(gpx.coords[:, :2], coords[:, :2], atol=1e-6)
+        np.testing.assert_allclose(fit.coords[:, :2], coords[:, :2], atol=1e-6)
+        self.assertEqual(len(list(iter_water_rows(fixtures.water))), 100)
+        mtime = fixtures.gpx.stat().st_mtime_ns
+        ensure_fixtures(2000, root=self.root)
+        self.assertEqual(fixtures.gpx.stat().st_mtime_ns, mtime)
+
+    def test_every_stage_runs(self):
+        fixtures = ensure_fixtures(2000, root=self.root)
+        for stage in STAGES:
+            with self.subTest(stage=stage):
+                measured = measure(stage, fixtures, 2000, repeat=1)
+                self.assertGreater(measured.points, 0)
+                self.assertGreater(measured.peak_rss_mb, 0)
+
+    def test_compare_flags_regressions_but_not_noise(self):
+        baseline = {"results": [
+            {"stage": "gpx_parse", "size": 1000, "seconds": 0.10, "peak_rss_mb": 50.0},
+            {"stage": "stations", "size": 1000, "seconds": 0.001, "peak_rss_mb": 50.0},
+        ]}
+        self.assertEqual(compare([result("gpx_parse", 0.12), result("stations", 0.004)], baseline), [])
+        messages = compare([result("gpx_parse", 0.2), result("stations", 0.001, rss=80.0)], baseline)
+        self.assertEqual(len(messages), 2)
+        self.assertIn("gpx_parse @ 1,000", messages[0])
+        self.assertIn("peak RSS", messages[1])
+        self.assertEqual(compare([result("metrics", 9.0)], baseline), [])
+        self.assertEqual(unmeasured([result("metrics", 9.0), result("stations", 0.001)], baseline),
+                         ["metrics @ 1,000"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+import route_binary
+
+from route_binary import (
+    StaleSidecarError,
+    is_fresh,
+    load_route_columns,
+    open_route_memoryview,
+    open_sidecar,
+    read_header,
+    sidecar_path,
+    write_sidecar,
+)
+
+PATH = [
+    [-121.653273591, 41.011147813, 2959.38, 0.0],
+    [-121.653350635, 41.011364945, 2959.22, 0.015586],
+    [-121.653501, 41.011502, 2961.5, 0.026],
+]
+
+
+class TestRouteBinary(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = Path(self.tmp.name) / "hike_data.json"
+        self.json_path.write_text(json.dumps({"route": {"path": PATH}, "features": []}))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_float64_round_trip_is_exact(self):
+        columns = open_sidecar(write_sidecar(self.json_path))
+        np.testing.assert_array_equal(columns.as_path(), np.array(PATH))
+        self.assertEqual(len(columns), 3)
+        self.assertIsInstance(columns.lon, np.memmap)
+
+    def test_delta32_round_trip_within_precision(self):
+        columns = open_sidecar(write_sidecar(self.json_path, encoding="delta32"))
+        np.testing.assert_allclose(columns.as_path(), np.array(PATH), atol=1e-6, rtol=0)
+
+    def test_memoryview_fallback(self):
+        views = open_route_memoryview(write_sidecar(self.json_path))
+        self.assertEqual(list(views["lat"]), [point[1] for point in PATH])
+
+    def test_content_change_makes_sidecar_stale(self):
+        write_sidecar(self.json_path)
+        self.assertTrue(is_fresh(self.json_path))
+        # Touching the file without changing bytes keeps the sidecar valid.
+        os.utime(self.json_path, ns=(1, 1))
+        self.assertTrue(is_fresh(self.json_path))
+        self.json_path.write_text(json.dumps({"route": {"path": PATH[:2]}}))
+        self.assertFalse(is_fresh(self.json_path))
+        with self.assertRaises(StaleSidecarError):
+            load_route_columns(self.json_path, refresh=False)
+        self.assertEqual(len(load_route_columns(self.json_path)), 2)
+        self.assertTrue(sidecar_path(self.json_path).exists())
+
+    def test_touched_source_is_hashed_once(self):
+        write_sidecar(self.json_path)
+        os.utime(self.json_path, ns=(1, 12345))
+        with mock.patch.object(route_binary, "file_sha256", wraps=route_binary.file_sha256) as sha256:
+            self.assertTrue(is_fresh(self.json_path))
+            self.assertTrue(is_fresh(self.json_path))
+        self.assertEqual(sha256.call_count, 1)
+        self.assertEqual(read_header(sidecar_path(self.json_path)).source_mtime_ns, 12345)
+        np.testing.assert_array_equal(open_sidecar(sidecar_path(self.json_path)).as_path(), np.array(PATH))
+
+    def test_terrain_contract_points(self):
+        terrain_path = Path(self.tmp.name) / "terrain.json"
+        terrain_path.write_text(json.dumps({
+            "route": {"name": "test"},
+            "points": [
+                {"coordinates": point[:2], "normalizedElevationFeet": point[2], "routeMile": point[3]}
+                for point in PATH
+            ],
+        }))
+        columns = open_sidecar(write_sidecar(terrain_path))
+        np.testing.assert_array_equal(columns.as_path(), np.array(PATH))
+
+
+if __name__ == "__main__":
+    unittest.main()
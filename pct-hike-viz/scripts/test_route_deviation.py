@@ -0,0 +1,86 @@
+import unittest
+
+import numpy as np
+
+from geodesy import haversine
+from mile_index import MileIndex
+from route_deviation import (
+    TRACK_PATH,
+    audit,
+    discrete_frechet,
+    frechet_band,
+    off_route_spans,
+    read_track,
+)
+
+
+def brute_frechet(p, q):
+    d = haversine(p[:, None, 0], p[:, None, 1], q[None, :, 0], q[None, :, 1])
+    c = np.full_like(d, np.inf)
+    for i in range(len(p)):
+        for j in range(len(q)):
+            options = [c[i - 1, j] if i else np.inf, c[i, j - 1] if j else np.inf,
+                       c[i - 1, j - 1] if i and j else np.inf]
+            c[i, j] = max(d[i, j], 0.0 if i == j == 0 else min(options))
+    return c[-1, -1]
+
+
+def walk(n, seed):
+    rng = np.random.default_rng(seed)
+    return np.cumsum(rng.normal(0, 0.0002, (n, 2)), axis=0) + [-121.7, 41.0]
+
+
+class TestRouteDeviation(unittest.TestCase):
+    def test_frechet_matches_brute_force(self):
+        for seed in range(8):
+            p, q = walk(5 + seed * 3, seed), walk(30 - seed * 2, seed + 50)
+            self.assertAlmostEqual(discrete_frechet(p, q), brute_frechet(p, q), places=6)
+
+    def test_wide_band_is_exact_and_narrow_band_is_an_upper_bound(self):
+        q = walk(400, 3)
+        p = q[::4] + np.random.default_rng(4).normal(0, 0.00003, (100, 2))
+        stations = np.concatenate(([0.0], np.cumsum(haversine(q[:-1, 0], q[:-1, 1], q[1:, 0], q[1:, 1]))))
+        projected = stations[::4]
+        full = discrete_frechet(p, q)
+        self.assertAlmostEqual(discrete_frechet(p, q, *frechet_band(projected, stations, 1e9)), full, places=6)
+        lo, hi = frechet_band(projected, stations, 50.0)
+        self.assertTrue(np.all(np.diff(lo) >= 0) and np.all(np.diff(hi) >= 0))
+        self.assertTrue(np.all(lo[1:] <= hi[:-1] + 1))
+        self.assertGreaterEqual(discrete_frechet(p, q, lo, hi), full - 1e-9)
+
+    def test_off_route_spans(self):
+        offsets = np.array([1, 40, 50, 2, 3, 35, 1, 31.0])
+        stations = np.arange(8) * 10.0
+        spans = off_route_spans(offsets, stations, 1400 + stations / 1000, 30.0)
+        self.assertEqual([(s.first, s.last) for s in spans], [(1, 2), (5, 5), (7, 7)])
+        self.assertEqual((spans[0].length_m, spans[0].max_offset_m, spans[0].points), (10.0, 50.0, 2))
+
+    def test_detour_is_reported(self):
+        lon = np.linspace(-121.70, -121.60, 500)
+        centerline = np.column_stack((lon, np.full(500, 41.0)))
+        index = MileIndex(centerline, np.array([1400.0, 1405.0]), np.array([0.0, 8400.0]))
+        track = centerline[::5].copy()
+        track[40:50, 1] += 0.001  # ~111 m north for ten vertices
+        report = audit(track, index, threshold_m=30.0)
+        self.assertEqual([(s.first, s.last) for s in report.spans], [(40, 49)])
+        self.assertAlmostEqual(report.spans[0].max_offset_m, 111.2, delta=0.5)
+        self.assertAlmostEqual(report.hausdorff_track_m, report.spans[0].max_offset_m, delta=1.0)
+        self.assertGreaterEqual(report.frechet_m, report.hausdorff_m - 1e-9)
+        self.assertAlmostEqual(report.pct_miles[0], 1400.0, places=6)
+        self.assertTrue(np.all(np.diff(report.pct_miles) > 0))
+
+    def test_alternate_gpx_against_centerline(self):
+        index = MileIndex.from_centerline_geojson()
+        report = audit(read_track(TRACK_PATH), index)
+        payload = report.to_payload()
+        self.assertLess(report.crop[0], 20)
+        self.assertTrue(report.frechet_exact)
+        self.assertGreaterEqual(report.frechet_m, report.hausdorff_m - 1e-9)
+        self.assertLess(payload["offset"]["p95Meters"], 30.0)
+        self.assertEqual(len(payload["stations"]["offsetMeters"]), payload["trackPoints"])
+        self.assertTrue(np.all(np.diff(report.track_stations_m) >= 0))
+        self.assertAlmostEqual(report.pct_miles[-1], index.end_mile, delta=0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from geodesy import as_coords, haversine
+from route_index import RouteIndex
+
+
+def brute_force_segment(index, lon, lat):
+    """Planar distance to the closest segment, checked against every segment."""
+    x, y = (float(v) for v in index.projection.to_xy(lon, lat))
+    start = index.xy[:-1]
+    delta = index.xy[1:] - start
+    len2 = (delta ** 2).sum(axis=1)
+    t = np.clip(((x - start[:, 0]) * delta[:, 0] + (y - start[:, 1]) * delta[:, 1]) / len2, 0, 1)
+    d2 = (x - start[:, 0] - t * delta[:, 0]) ** 2 + (y - start[:, 1] - t * delta[:, 1]) ** 2
+    return float(np.sqrt(d2.min()))
+
+
+class TestRouteIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(7)
+        steps = rng.normal(0, 0.0004, size=(3000, 2)) + [0.0003, 0.0001]
+        lonlat = np.cumsum(steps, axis=0) + [-121.65, 41.01]
+        cls.coords = as_coords(lonlat)
+        cls.index = RouteIndex(cls.coords)
+        cls.queries = cls.coords[rng.integers(0, len(cls.coords), 200)] + rng.normal(0, 0.003, size=(200, 2))
+
+    def test_nearest_vertex_matches_brute_force(self):
+        for lon, lat in self.queries:
+            index, meters = self.index.nearest_vertex(lon, lat)
+            distances = haversine(lon, lat, self.coords[:, 0], self.coords[:, 1])
+            self.assertAlmostEqual(meters, distances.min(), delta=0.5)
+
+    def test_k_nearest_vertices_are_sorted(self):
+        lon, lat = self.queries[0]
+        indices, meters = self.index.k_nearest_vertices(lon, lat, 6)
+        self.assertEqual(len(indices), 6)
+        self.assertTrue(np.all(np.diff(meters) >= -0.5))
+        planar = np.hypot(*(self.index.xy - self.index.projection.project(np.array([[lon, lat]]))).T)
+        np.testing.assert_array_equal(np.sort(indices), np.sort(np.argsort(planar)[:6]))
+
+    def test_k_nearest_vertices_rejects_k_below_one(self):
+        lon, lat = self.queries[0]
+        for k in (0, -1):
+            with self.assertRaises(ValueError):
+                self.index.k_nearest_vertices(lon, lat, k)
+
+    def test_nearest_segment_matches_brute_force(self):
+        for lon, lat in self.queries:
+            hit = self.index.nearest_segment(lon, lat)
+            x, y = (float(v) for v in self.index.projection.to_xy(lon, lat))
+            hx, hy = (float(v) for v in self.index.projection.to_xy(hit.lon, hit.lat))
+            self.assertAlmostEqual(np.hypot(x - hx, y - hy), brute_force_segment(self.index, lon, lat), places=6)
+            self.assertGreaterEqual(hit.fraction, 0.0)
+            self.assertLessEqual(hit.fraction, 1.0)
+            stations = self.index.stations_m
+            self.assertGreaterEqual(hit.station_m, stations[hit.segment])
+            self.assertLessEqual(hit.station_m, stations[hit.segment + 1])
+
+    def test_point_on_route_snaps_to_itself(self):
+        lon, lat = (self.coords[10, :2] + self.coords[11, :2]) / 2
+        hit = self.index.nearest_segment(lon, lat)
+        self.assertEqual(hit.segment, 10)
+        self.assertAlmostEqual(hit.fraction, 0.5, places=6)
+        self.assertLess(hit.distance_m, 0.01)
+
+    def test_far_query_and_distance_limit(self):
+        hit = self.index.nearest_segment(-100.0, 30.0)
+        x, y = (float(v) for v in self.index.projection.to_xy(hit.lon, hit.lat))
+        qx, qy = (float(v) for v in self.index.projection.to_xy(-100.0, 30.0))
+        self.assertAlmostEqual(np.hypot(qx - x, qy - y), brute_force_segment(self.index, -100.0, 30.0), places=3)
+        self.assertIsNone(self.index.nearest_segment(-100.0, 30.0, max_distance_m=1000))
+
+    def test_batched_queries_match_scalar(self):
+        far = np.array([[-100.0, 30.0], [-121.0, 41.5]])
+        queries = np.vstack((self.queries, far))
+        hits = self.index.nearest_segments(queries[:, 0], queries[:, 1])
+        vertices, meters = self.index.nearest_vertices(queries[:, 0], queries[:, 1])
+        self.assertEqual(len(hits), len(queries))
+        for i, (lon, lat) in enumerate(queries):
+            hit = self.index.nearest_segment(lon, lat)
+            self.assertAlmostEqual(hits.distance_m[i], hit.distance_m, places=6)
+            self.assertAlmostEqual(hits.station_m[i], hit.station_m, places=3)
+            self.assertAlmostEqual(meters[i], self.index.nearest_vertex(lon, lat)[1], places=6)
+        self.assertEqual([h.segment for h in self.index.snap_many(queries[:5, 0], queries[:5, 1])],
+                         hits.segment[:5].tolist())
+
+    def test_windowed_queries_search_only_their_window(self):
+        lons, lats = self.queries[:, 0], self.queries[:, 1]
+        last_segment = len(self.coords) - 1
+        whole = self.index.nearest_segments(lons, lats)
+        full = self.index.nearest_segments_between(lons, lats, np.zeros(len(lons)), np.full(len(lons), last_segment))
+        np.testing.assert_allclose(full.distance_m, whole.distance_m, atol=1e-6)
+
+        rng = np.random.default_rng(3)
+        first = rng.integers(0, last_segment - 1, len(lons))
+        last = first + rng.integers(1, 400, len(lons))
+        with mock.patch("route_index._WINDOW_ITEMS", 1000):
+            hits = self.index.nearest_segments_between(lons, lats, first, last)
+        for i in range(len(lons)):
+            window = RouteIndex(self.coords[first[i]:min(last[i], last_segment) + 1])
+            self.assertAlmostEqual(hits.distance_m[i], window.nearest_segment(lons[i], lats[i]).distance_m, delta=0.01)
+            self.assertTrue(first[i] <= hits.segment[i] < max(min(last[i], last_segment), first[i] + 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
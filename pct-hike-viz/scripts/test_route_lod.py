@@ -0,0 +1,85 @@
+import json
+import unittest
+
+import numpy as np
+
+from route_lod import HIKE_DATA_PATH, Simplifier, build_lods, parse_levels, pinned_indices, route_arrays
+
+
+def wiggly_route(n=4000, seed=2):
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.15, n))
+    steps = rng.uniform(5, 30, n)
+    xy = np.column_stack((np.cumsum(steps * np.cos(heading)), np.cumsum(steps * np.sin(heading))))
+    stations = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(xy, axis=0).T))))
+    z = 4000 + 300 * np.sin(stations / 900) + rng.normal(0, 4, n)
+    return xy, z, stations
+
+
+def brute_max_errors(simplifier, indices):
+    lateral = vertical = 0.0
+    for start, end in zip(indices[:-1], indices[1:]):
+        if end - start > 1:
+            lat, vert = simplifier.errors(int(start), int(end))
+            lateral, vertical = max(lateral, lat.max()), max(vertical, vert.max())
+    return lateral, vertical
+
+
+class TestRouteLod(unittest.TestCase):
+    def test_every_level_honours_both_tolerances(self):
+        simplifier = Simplifier(*wiggly_route())
+        tolerances = [(1.0, 3.0), (10.0, 20.0), (50.0, 60.0)]
+        levels = simplifier.levels(tolerances)
+        self.assertEqual([(level.lateral_tolerance_m, level.vertical_tolerance_ft) for level in levels], tolerances)
+        for level in levels:
+            lateral, vertical = brute_max_errors(simplifier, level.indices)
+            self.assertLessEqual(lateral, level.lateral_tolerance_m)
+            self.assertLessEqual(vertical, level.vertical_tolerance_ft)
+            self.assertAlmostEqual(lateral, level.max_lateral_m)
+            self.assertAlmostEqual(vertical, level.max_vertical_ft)
+        self.assertGreater(len(levels[0]), len(levels[1]))
+        self.assertGreater(len(levels[1]), len(levels[2]))
+
+    def test_levels_are_nested_and_keep_pins(self):
+        simplifier = Simplifier(*wiggly_route())
+        pins = [17, 1234, 3001]
+        coarse, fine = simplifier.levels([(40.0, 50.0), (5.0, 8.0)], pins)
+        self.assertTrue(set(coarse.indices.tolist()) <= set(fine.indices.tolist()))
+        for level in (coarse, fine):
+            self.assertTrue(set(pins + [0, 3999]) <= set(level.indices.tolist()))
+
+    def test_straight_flat_line_collapses_to_endpoints(self):
+        x = np.linspace(0, 1000, 50)
+        level, = Simplifier(np.column_stack((x, 2 * x)), np.full(50, 100.0), x).levels([(0.1, 0.1)])
+        self.assertEqual(level.indices.tolist(), [0, 49])
+
+    def test_vertical_error_keeps_a_summit_on_a_straight_line(self):
+        x = np.linspace(0, 1000, 101)
+        z = np.where(x == 500, 200.0, 100.0)
+        level, = Simplifier(np.column_stack((x, np.zeros_like(x))), z, x).levels([(5.0, 10.0)])
+        self.assertIn(50, level.indices.tolist())
+
+    def test_parse_levels(self):
+        self.assertEqual(parse_levels("2:5,10"), [(2.0, 5.0), (10.0, 10.0)])
+
+    def test_hike_data_lods_pin_day_stops(self):
+        data = json.loads(HIKE_DATA_PATH.read_text(encoding="utf-8"))
+        path = data["route"]["path"]
+        payload = build_lods(data)
+        stop_miles = {f["properties"]["routeMile"] for f in data["features"] if f["properties"].get("day", -1) >= 0}
+        simplifier = Simplifier(*route_arrays(path))
+        self.assertEqual(payload["sourcePoints"], len(path))
+        for level in payload["levels"]:
+            self.assertLess(level["points"], len(path))
+            self.assertEqual(level["path"][0], path[0])
+            self.assertEqual(level["path"][-1], path[-1])
+            self.assertTrue(stop_miles <= {row[3] for row in level["path"]})
+            indices = np.searchsorted([row[3] for row in path], [row[3] for row in level["path"]])
+            lateral, vertical = brute_max_errors(simplifier, indices)
+            self.assertLessEqual(lateral, level["lateralToleranceMeters"])
+            self.assertLessEqual(vertical, level["verticalToleranceFeet"])
+        self.assertEqual(len(pinned_indices(data)), payload["pinnedPoints"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from route_pipeline import (
+    HIKE_DATA_PATH,
+    Artifact,
+    ContentHasher,
+    Pipeline,
+    Stage,
+    default_stages,
+    dependencies,
+    select,
+)
+
+
+def copy_key(source, key, target):
+    value = json.loads(Path(source).read_text())[key]
+    Path(target).write_text(json.dumps(value))
+
+
+def count_lines(source, target):
+    Path(target).write_text(str(len(Path(source).read_text().splitlines())))
+
+
+class TestRoutePipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.bundle = root / "bundle.json"
+        self.bundle.write_text(json.dumps({"route": [1, 2, 3], "features": ["camp"]}))
+        self.route_out = root / "route.json"
+        self.features_out = root / "features.json"
+        self.count_out = root / "count.txt"
+        self.state = root / "state.json"
+        self.stages = [
+            Stage(
+                "route",
+                copy_key,
+                inputs=(Artifact(self.bundle, "route"),),
+                outputs=(Artifact(self.route_out),),
+                params={"source": str(self.bundle), "key": "route", "target": str(self.route_out)},
+            ),
+            Stage(
+                "features",
+                copy_key,
+                inputs=(Artifact(self.bundle, "features"),),
+                outputs=(Artifact(self.features_out),),
+                params={"source": str(self.bundle), "key": "features", "target": str(self.features_out)},
+            ),
+            Stage(
+                "count",
+                count_lines,
+                inputs=(Artifact(self.route_out),),
+                outputs=(Artifact(self.count_out),),
+                params={"source": str(self.route_out), "target": str(self.count_out)},
+            ),
+        ]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_pipeline(self, **kwargs):
+        return Pipeline(self.stages, self.state).run(**kwargs)
+
+    def test_second_run_skips_everything(self):
+        first = self.run_pipeline()
+        self.assertEqual(set(first.values()), {"ran"})
+        second = self.run_pipeline()
+        self.assertEqual(set(second.values()), {"skipped"})
+
+    def test_key_edit_only_reruns_dependent_stages(self):
+        self.run_pipeline()
+        data = json.loads(self.bundle.read_text())
+        data["features"].append("water")
+        self.bundle.write_text(json.dumps(data))
+        results = self.run_pipeline()
+        self.assertEqual(results, {"route": "skipped", "features": "ran", "count": "skipped"})
+        self.assertEqual(json.loads(self.features_out.read_text()), ["camp", "water"])
+
+    def test_output_change_propagates_downstream(self):
+        self.run_pipeline()
+        data = json.loads(self.bundle.read_text())
+        data["route"] = [1, 2, 3, 4]
+        self.bundle.write_text(json.dumps(data, indent=1))
+        results = self.run_pipeline()
+        self.assertEqual(results, {"route": "ran", "features": "skipped", "count": "ran"})
+
+    def test_deleted_output_is_rebuilt(self):
+        self.run_pipeline()
+        self.count_out.unlink()
+        self.assertEqual(self.run_pipeline()["count"], "ran")
+        self.assertTrue(self.count_out.exists())
+
+    def test_dry_run_reports_without_writing(self):
+        results = self.run_pipeline(dry_run=True)
+        self.assertEqual(set(results.values()), {"stale"})
+        self.assertFalse(self.route_out.exists())
+        self.assertFalse(self.state.exists())
+
+    def test_parallel_run_matches_serial(self):
+        results = self.run_pipeline(jobs=2)
+        self.assertEqual(set(results.values()), {"ran"})
+        self.assertEqual(self.count_out.read_text(), "1")
+
+    def test_mark_current_adopts_existing_outputs(self):
+        for stage in self.stages:
+            stage.run(**stage.params)
+        Pipeline(self.stages, self.state).mark_current()
+        self.assertEqual(set(self.run_pipeline().values()), {"skipped"})
+
+    def test_mark_current_adopts_a_fresh_checkout(self):
+        # The final artifacts are checked in; the intermediate route.json is not.
+        self.count_out.write_text("1")
+        self.features_out.write_text('["camp"]')
+        Pipeline(self.stages, self.state).mark_current()
+        self.assertEqual(set(self.run_pipeline().values()), {"skipped"})
+        self.assertFalse(self.route_out.exists())
+
+        # An edit upstream of the missing intermediate still rebuilds the chain.
+        self.bundle.write_text(json.dumps({"route": [1, 2, 3, 4], "features": ["camp"]}))
+        results = self.run_pipeline()
+        self.assertEqual((results["route"], results["count"]), ("ran", "ran"))
+
+    def test_mark_current_leaves_a_missing_leaf_stale(self):
+        Pipeline(self.stages, self.state).mark_current()
+        self.assertEqual(self.run_pipeline(dry_run=True)["count"], "stale")
+
+    def test_missing_state_adopts_checked_in_outputs(self):
+        for stage in self.stages:
+            stage.run(**stage.params)
+        self.count_out.unlink()
+        self.assertEqual(self.run_pipeline(), {"route": "skipped", "features": "skipped", "count": "ran"})
+        self.assertTrue(self.state.exists())
+
+    def test_force_reruns_only_the_named_stage(self):
+        self.run_pipeline()
+        results = self.run_pipeline(force={"count"})
+        self.assertEqual(results, {"route": "skipped", "features": "skipped", "count": "ran"})
+
+    def test_default_stages_never_write_the_route(self):
+        route = Artifact(HIKE_DATA_PATH, "route")
+        self.assertFalse([stage.name for stage in default_stages() if route in stage.outputs])
+
+    def test_select_pulls_in_upstream(self):
+        self.assertEqual(dependencies(self.stages)["count"], {"route"})
+        self.assertEqual([stage.name for stage in select(self.stages, ["count"])], ["route", "count"])
+
+    def test_key_digest_ignores_formatting(self):
+        hasher = ContentHasher()
+        before = hasher.digest(Artifact(self.bundle, "route"))
+        self.bundle.write_text(json.dumps(json.loads(self.bundle.read_text()), indent=4))
+        self.assertEqual(before, hasher.digest(Artifact(self.bundle, "route")))
+
+
+if __name__ == "__main__":
+    unittest.main()
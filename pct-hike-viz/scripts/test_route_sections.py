@@ -0,0 +1,111 @@
+import argparse
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import route_sections
+from geodesy import METERS_PER_DEG_LAT, METERS_PER_MILE, cumulative_stations
+from mile_index import DEFAULT_CENTERLINE_PATH, MileIndex
+from parse_water_csv import CSV_PATH, iter_water_rows
+from route_sections import Section, SharedArrays, merge, parse_section, run_sections, split_sections
+
+
+def synthetic_route(miles=30.0, start_mile=1000.0):
+    """A north-running centerline with a sawtooth track 5 m to its east."""
+    lats = 40.0 + np.linspace(0.0, miles * METERS_PER_MILE / METERS_PER_DEG_LAT, 3000)
+    line = np.column_stack((np.full_like(lats, -121.0), lats))
+    stations = cumulative_stations(line[:, 0], line[:, 1])
+    mile_index = MileIndex(line, np.array([start_mile, start_mile + stations[-1] / METERS_PER_MILE]),
+                           stations[[0, -1]], stations)
+    track_lats = np.linspace(lats[0], lats[-1], 9000)
+    ele_m = 1000.0 + 200.0 * np.abs(np.sin(np.linspace(0, 12 * np.pi, len(track_lats))))
+    track = np.column_stack((np.full_like(track_lats, -121.0 + 5.0 / 84_000), track_lats, ele_m))
+    return mile_index, track
+
+
+class SectionSpecTest(unittest.TestCase):
+    def test_parse_section(self):
+        self.assertEqual(parse_section("O=1420.653:1472.497"), Section("O", 1420.653, 1472.497))
+        for bad in ("O=5:1", "=1:2", "O=a:b", "O"):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_section(bad)
+
+    def test_split_sections_covers_range(self):
+        sections = split_sections(100.0, 125.5, 10.0)
+        self.assertEqual([(s.start_mile, s.end_mile) for s in sections], [(100, 110), (110, 120), (120, 125.5)])
+        self.assertEqual(len(split_sections(100.0, 120.0, 10.0)), 2)
+        with self.assertRaises(ValueError):
+            split_sections(0.0, 1.0, 0.0)
+
+
+class RunSectionsTest(unittest.TestCase):
+    def setUp(self):
+        self.mile_index, self.track = synthetic_route()
+        self.sections = split_sections(self.mile_index.start_mile, self.mile_index.end_mile, 7.0)
+        self.rows = [(1000.0 + m, f"W{m}", f"Spring {m}", "") for m in (1.0, 2.5, 9.0, 16.0, 29.0, 45.0)]
+
+    def test_sections_measure_and_validate(self):
+        results = run_sections(self.sections, self.mile_index, self.rows, self.track, workers=1)
+        self.assertTrue(all(result.ok for result in results), [r.checks for r in results])
+        self.assertAlmostEqual(sum(r.length_mi for r in results), self.mile_index.end_mile - 1000.0, places=6)
+        self.assertEqual(sum(len(r.water) for r in results), 5)
+        self.assertAlmostEqual(results[0].max_water_gap_mi, 7.0 - 2.5, places=6)
+        self.assertTrue(all(r.gain_ft > 0 and r.loss_ft > 0 for r in results))
+        self.assertTrue(all(3280 <= r.low_ft and r.high_ft <= 3940 for r in results))
+        report = merge(results)
+        self.assertEqual(report["failed"], [])
+        self.assertEqual(report["totals"]["gainFeet"], sum(r.gain_ft for r in results))
+
+    def test_process_pool_matches_inline(self):
+        inline = run_sections(self.sections, self.mile_index, self.rows, self.track, workers=1)
+        pooled = run_sections(self.sections, self.mile_index, self.rows, self.track, workers=2)
+        self.assertEqual([r.to_payload() for r in pooled], [r.to_payload() for r in inline])
+
+    def test_missing_track_and_out_of_range_sections_fail_checks(self):
+        results = run_sections(
+            [Section("far", 2000.0, 2010.0), self.sections[0]], self.mile_index, self.rows, None, workers=1
+        )
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[0].checks[0][0], "in_range")
+        self.assertTrue(results[1].ok)
+        self.assertIsNone(results[1].coverage)
+
+        gap = self.track[(self.track[:, 1] < 40.05) | (self.track[:, 1] > 40.1)]
+        coverage = [r.coverage for r in run_sections(self.sections, self.mile_index, (), gap, workers=1)]
+        self.assertLess(min(coverage), route_sections.MIN_TRACK_COVERAGE)
+
+    def test_shared_arrays_are_unlinked(self):
+        with SharedArrays({"a": np.arange(10.0)}) as shared:
+            spec = shared.specs["a"]
+            np.testing.assert_array_equal(route_sections._resolve(spec), np.arange(10.0))
+        block, _ = route_sections._attached.pop(spec.name)
+        block.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=spec.name)
+
+
+class SectionOTest(unittest.TestCase):
+    def test_sections_partition_the_checked_in_crop(self):
+        mile_index = MileIndex.from_centerline_geojson(DEFAULT_CENTERLINE_PATH)
+        rows = list(iter_water_rows(CSV_PATH))
+        results = run_sections(split_sections(mile_index.start_mile, mile_index.end_mile, 10.0), mile_index, rows,
+                               workers=1)
+        whole = run_sections([Section("O", mile_index.start_mile, mile_index.end_mile)], mile_index, rows, workers=1)
+        self.assertEqual(sum(len(r.water) for r in results), len(whole[0].water))
+        self.assertAlmostEqual(sum(r.length_mi for r in results), whole[0].length_mi, places=6)
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_source_on_a_boundary_is_counted_once(self):
+        mile_index = MileIndex.from_centerline_geojson(DEFAULT_CENTERLINE_PATH)
+        rows = list(iter_water_rows(CSV_PATH))
+        self.assertIn(1437.2, [row[0] for row in rows])
+        halves = [Section("O1", mile_index.start_mile, 1437.2), Section("O2", 1437.2, mile_index.end_mile)]
+        split = run_sections(halves, mile_index, rows, workers=1)
+        whole = run_sections([Section("O", mile_index.start_mile, mile_index.end_mile)], mile_index, rows, workers=1)
+        self.assertEqual(sum(len(r.water) for r in split), len(whole[0].water))
+        self.assertEqual([w["mile"] for w in split[1].water][:1], [1437.2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import route_trace
+from route_trace import NULL_SPAN, Tracer, summarize
+
+
+class TestRouteTrace(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        route_trace._tracer = None
+
+    def tearDown(self):
+        route_trace._tracer = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.tmp.cleanup()
+
+    def test_disabled_by_default(self):
+        with mock.patch.dict(os.environ, {route_trace.TRACE_ENV: ""}):
+            with route_trace.span("stage") as span:
+                span.count("points", 3)
+            self.assertIs(route_trace.span("stage"), NULL_SPAN)
+            self.assertIsNone(route_trace.flush())
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_environment_enables_tracing(self):
+        with mock.patch.dict(os.environ, {route_trace.TRACE_ENV: str(self.root)}), \
+                mock.patch("route_trace.atexit.register"):
+            with route_trace.span("stage"):
+                route_trace.count("points", 5)
+            path = route_trace.flush()
+        self.assertEqual(path.parent, self.root)
+        trace = json.loads(path.read_text())
+        self.assertEqual(trace["counters"], {"points": 5})
+        self.assertEqual([span["name"] for span in trace["spans"]], ["stage"])
+
+    def test_nested_spans_record_peaks_and_counters(self):
+        tracer = Tracer(self.root, script="unit")
+        with tracer.span("stage", size="big") as stage:
+            with tracer.span("allocate") as child:
+                block = bytearray(4_000_000)
+                child.count("bytes_written", len(block))
+                del block
+            with tracer.span("small"):
+                kept = [0] * 1000
+        spans = {span.name: span for span in tracer.spans}
+        self.assertEqual(spans["allocate"].parent, stage.id)
+        self.assertGreaterEqual(spans["allocate"].peak_bytes - spans["allocate"].start_bytes, 4_000_000)
+        self.assertLess(spans["small"].peak_bytes - spans["small"].start_bytes, 1_000_000)
+        self.assertGreaterEqual(stage.peak_bytes, spans["allocate"].peak_bytes)
+        self.assertGreaterEqual(stage.seconds, spans["allocate"].seconds + spans["small"].seconds)
+        self.assertTrue(any(__file__ in entry["site"] for entry in stage.top_allocations))
+        self.assertEqual(spans["allocate"].top_allocations, [])
+        self.assertEqual(tracer.totals(), {"bytes_written": 4_000_000})
+        self.assertEqual(len(kept), 1000)
+
+        trace = json.loads(tracer.write().read_text())
+        self.assertEqual(trace["spans"][0]["attrs"], {"size": "big"})
+        table = summarize(trace)
+        self.assertIn("  allocate", table)
+        self.assertIn("bytes_written=4,000,000", table)
+
+    def test_profile_dump_per_stage(self):
+        tracer = Tracer(self.root, profile=True, script="unit")
+        for name in ("parse xml", "write"):
+            with tracer.span(name):
+                with tracer.span("inner"):
+                    sum(range(1000))
+        profiles = [span.profile for span in tracer.spans if span.profile]
+        self.assertEqual(len(profiles), 2)
+        self.assertTrue(profiles[0].endswith("0-parse_xml.prof"))
+        self.assertTrue(all(Path(profile).stat().st_size > 0 for profile in profiles))
+
+    def test_json_helpers_count_bytes(self):
+        tracer = route_trace._tracer = Tracer(self.root, script="unit")
+        target = self.root / "data.json"
+        with tracer.span("stage"):
+            route_trace.dump_json(target, {"path": [[1, 2, 3]]}, indent=2)
+            self.assertEqual(route_trace.load_json(target), {"path": [[1, 2, 3]]})
+        size = target.stat().st_size
+        self.assertEqual(tracer.totals(), {"bytes_written": size, "bytes_read": size})
+        self.assertEqual([span.name for span in tracer.spans],
+                         ["stage", "json_encode", "write", "read", "json_decode"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import copy
+import unittest
+
+import route_data
+from snap_camps_to_route import camp_miles, snap_camps
+
+
+class SnapCampsTest(unittest.TestCase):
+    def test_shipped_bundle_is_a_fixed_point(self):
+        shipped = route_data.hike_data()
+        data = copy.deepcopy(shipped)
+        updated = snap_camps(data)
+        self.assertEqual(len(updated), 9)
+        self.assertEqual([mile for *_, mile in updated], sorted(mile for *_, mile in updated))
+        self.assertGreater(updated[-1][-1], 47)
+        self.assertEqual(data, shipped)
+
+    def test_pct_mile_fallback(self):
+        camps = [{"properties": {"name": "a", "pctMile": 1430.653}}, {"properties": {"name": "b", "routeMile": 3.5}}]
+        self.assertEqual([round(m, 3) for m in camp_miles(camps, 1420.653)], [10.0, 3.5])
+        with self.assertRaises(ValueError):
+            camp_miles([{"properties": {"name": "c"}}], 1420.653)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import json
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from update_elevation import protected_reason, update_json  # noqa: E402
+
+import route_data  # noqa: E402
+
+
+class UpdateJsonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "hike_data.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, route):
+        self.path.write_text(json.dumps({"route": route}))
+
+    def test_shipped_bundle_is_protected(self):
+        self.assertIsNotNone(protected_reason(route_data.hike_data()["route"]))
+
+    def test_refuses_route_miles_unless_forced(self):
+        self.write({"path": [[-121.0, 41.0, 3000.0, 0.0], [-121.1, 41.1, 3100.0, 6.2]]})
+        with self.assertRaises(ValueError):
+            update_json(self.path, [[-121.0, 41.0, 2990.0]])
+        self.assertEqual(len(json.loads(self.path.read_text())["route"]["path"][0]), 4)
+        update_json(self.path, [[-121.0, 41.0, 2990.0]], force=True)
+        self.assertEqual(json.loads(self.path.read_text())["route"]["path"], [[-121.0, 41.0, 2990.0]])
+
+    def test_replaces_a_track_path(self):
+        self.write({"path": [[-121.0, 41.0, 3000.0]], "metadata": {"geometry_source": "Garmin course"}})
+        update_json(self.path, [[-121.0, 41.0, 2990.0]])
+        self.assertEqual(json.loads(self.path.read_text())["route"]["properties"]["max_elevation"], 2990.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from usgs_elevation import ElevationCache, TokenBucket, UsgsElevationClient
+
+
+def fake_feet(lat, lon):
+    return round(1000.0 + lat * 10.0 - lon, 2)
+
+
+class StubEpqsServer:
+    """Offline stand-in for the EPQS JSON endpoint.
+
+    ``fail_first`` requests answer 503, requests slower than ``delay`` exercise
+    timeouts, and latitudes above 60 report the no-data sentinel.
+    """
+
+    def __init__(self, fail_first=0, delay=0.0):
+        self.fail_first = fail_first
+        self.delay = delay
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+                with stub.lock:
+                    stub.requests += 1
+                    fail = stub.requests <= stub.fail_first
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if fail:
+                    self.reply(503, b"busy")
+                    return
+                lat, lon = float(query["y"][0]), float(query["x"][0])
+                value = -1000000 if lat > 60 else fake_feet(lat, lon)
+                self.reply(200, json.dumps({"value": str(value)}).encode())
+
+            def reply(self, status, body):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/json"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+LATS = np.linspace(41.01, 41.17, 40)
+LONS = np.linspace(-121.62, -121.90, 40)
+
+
+class TestUsgsElevationClient(unittest.TestCase):
+    def setUp(self):
+        self.cache = ElevationCache(":memory:")
+
+    def tearDown(self):
+        self.cache.close()
+
+    def client(self, server, **kwargs):
+        options = {"concurrency": 4, "rate": 1000.0, "timeout": 2.0, "backoff": 0.01}
+        options.update(kwargs)
+        return UsgsElevationClient(self.cache, endpoint=server.url, **options)
+
+    def test_values_and_keep_alive(self):
+        with StubEpqsServer() as server:
+            client = self.client(server)
+            feet = client.elevations(LATS, LONS)
+        expected = [fake_feet(round(lat, 5), round(lon, 5)) for lat, lon in zip(LATS, LONS)]
+        np.testing.assert_allclose(feet, expected)
+        self.assertEqual(server.requests, len(LATS))
+        self.assertLessEqual(client.stats.connections, 4)
+
+    def test_repeat_run_is_served_from_cache(self):
+        with StubEpqsServer() as server:
+            self.client(server).elevations(LATS, LONS)
+            client = self.client(server)
+            again = client.elevations(LATS, LONS)
+        self.assertEqual(server.requests, len(LATS))
+        self.assertEqual(client.stats.hit_rate, 1.0)
+        self.assertFalse(np.isnan(again).any())
+
+    def test_duplicate_points_share_one_request(self):
+        with StubEpqsServer() as server:
+            client = self.client(server)
+            client.elevations([41.0, 41.000001, 41.0], [-121.6, -121.6, -121.6])
+        self.assertEqual(server.requests, 1)
+
+    def test_retries_server_errors(self):
+        with StubEpqsServer(fail_first=3) as server:
+            client = self.client(server, concurrency=1)
+            feet = client.elevations(LATS[:2], LONS[:2])
+        self.assertFalse(np.isnan(feet).any())
+        self.assertEqual(client.stats.retries, 3)
+        self.assertEqual(client.stats.failures, 0)
+
+    def test_gives_up_after_timeouts_without_caching(self):
+        with StubEpqsServer(delay=0.3) as server:
+            client = self.client(server, timeout=0.05, retries=1)
+            feet = client.elevations(LATS[:1], LONS[:1])
+        self.assertTrue(np.isnan(feet).all())
+        self.assertEqual(client.stats.failures, 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_no_data_is_cached_as_nan(self):
+        with StubEpqsServer() as server:
+            self.client(server).elevations([61.0], [-150.0])
+            feet = self.client(server).elevations([61.0], [-150.0])
+        self.assertTrue(np.isnan(feet[0]))
+        self.assertEqual(server.requests, 1)
+
+    def test_token_bucket_limits_rate(self):
+        async def take(count):
+            bucket = TokenBucket(rate=100.0, capacity=1.0)
+            started = time.perf_counter()
+            for _ in range(count):
+                await bucket.acquire()
+            return time.perf_counter() - started
+
+        self.assertGreaterEqual(asyncio.run(take(11)), 0.09)
+
+
+class TestElevationCache(unittest.TestCase):
+    def test_ttl_and_eviction(self):
+        with ElevationCache(":memory:", ttl_seconds=100, max_entries=3) as cache:
+            cache.put_many("d", {(1, 1): 10.0}, now=0)
+            cache.put_many("d", {(2, 2): 20.0}, now=10)
+            cache.put_many("d", {(3, 3): 30.0, (4, 4): 40.0}, now=50)
+            self.assertEqual(len(cache), 3)
+            self.assertNotIn((1, 1), cache.get_many("d", [(1, 1)], now=50))
+            self.assertEqual(cache.get_many("d", [(2, 2), (3, 3)], now=90), {(2, 2): 20.0, (3, 3): 30.0})
+            self.assertEqual(cache.get_many("d", [(2, 2), (3, 3)], now=130), {(3, 3): 30.0})
+            self.assertEqual(cache.get_many("other", [(3, 3)], now=60), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import csv
+import tempfile
+import unittest
+from datetime import datetime, timezone
+from pathlib import Path
+
+from parse_water_csv import CSV_PATH, iter_water_rows
+from water_reports import Observation, StoredSource, WaterHistory, keyed_rows, parse_report, row_location
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as handle:
+        return list(csv.reader(handle))
+
+
+class ParseTest(unittest.TestCase):
+    def test_parse_report(self):
+        text = (
+            "06/22/26 (Lana): Great flow\n"
+            "running well, near the road. \n"
+            "7/2/2025: Trickle\n"
+            "02/30/24 (Typo): not a date\n"
+            "06/22/26 (Lana): Great flow running well, near the road.\n"
+            "-----\n"
+            "No sign. Watch for a faint use trail.\n"
+            "08/11/16 (LVNPS): Bear canisters required."
+        )
+        observations, notes = parse_report(text)
+        self.assertEqual(observations, (
+            Observation("2026-06-22", "Lana", "Great flow running well, near the road."),
+            Observation("2025-07-02", "", "Trickle 02/30/24 (Typo): not a date"),
+        ))
+        self.assertEqual(notes, "No sign. Watch for a faint use trail.\n08/11/16 (LVNPS): Bear canisters required.")
+
+    def test_row_keys(self):
+        rows = [
+            ["", "1057.7", "WA1057\r\nPCTAID_490", "Raymond Canyon Creek", ""],
+            ["", "1058.0", "WA1058", "Seasonal Stream ", ""],
+            ["", "1070.9", "", "*Lost Lake", ""],
+            ["", "1071.0", "PCTAID_490", "Same ID again", ""],
+            ["Note", "about the reroute", "", "", ""],
+        ]
+        self.assertEqual([key for key, _ in keyed_rows(rows)],
+                         ["PCTAID_490", "WA1058", "@1070.9", "PCTAID_490#2"])
+
+    def test_observations_load_only_for_unresolved_shared_keys(self):
+        rows = [
+            ["", "1208.4", "", "Spring (upper)", ""],
+            ["", "1208.4", "", "Spring, renamed", "08/01/26 (Scout): flowing"],
+            ["", "1210.0", "WA1210", "Creek", ""],
+        ]
+        known = {
+            "@1208.4": StoredSource("old", "Spring (lower)"),
+            "@1208.4#2": StoredSource("old", "Spring (upper)"),
+            "WA1210": StoredSource("old", "Creek"),
+        }
+        calls = []
+
+        def observations(key):
+            calls.append(key)
+            return {Observation("2026-08-01", "Scout", "flowing")} if key == "@1208.4" else set()
+
+        self.assertEqual([key for key, _ in keyed_rows(rows, known, observations)],
+                         ["@1208.4#2", "@1208.4", "WA1210"])
+        self.assertEqual(calls, ["@1208.4"])
+
+    def test_water_rows_start_after_the_header(self):
+        rows = list(iter_water_rows(CSV_PATH))
+        self.assertEqual(rows[0][0], 1057.7)
+        self.assertEqual(len(rows), sum(1 for _ in keyed_rows(read_csv(CSV_PATH)[8:])))
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.history = WaterHistory(self.root / "water.sqlite")
+        self.rows = read_csv(CSV_PATH)
+        self.first = self.history.ingest(CSV_PATH, now=datetime(2026, 8, 2, tzinfo=timezone.utc))
+
+    def tearDown(self):
+        self.history.close()
+        self.tmp.cleanup()
+
+    def write(self, rows):
+        path = self.root / "report.csv"
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            csv.writer(handle).writerows(rows)
+        return path
+
+    def row(self, waypoint):
+        return next(i for i, row in enumerate(self.rows) if waypoint in row[2])
+
+    def test_first_ingest_and_unchanged_file(self):
+        self.assertEqual(self.first.sheet, "Northern California")
+        self.assertEqual(self.first.added, self.first.rows)
+        self.assertEqual(self.first.rows, 324)
+        again = self.history.ingest(CSV_PATH)
+        self.assertTrue(again.skipped)
+        self.assertEqual(len(self.history.snapshots()), 1)
+        self.assertEqual(self.history.snapshots()[0]["updated"], "2026-08-02")
+
+    def test_only_changed_rows_are_applied(self):
+        rock_creek = self.row("PCTAID_655")
+        self.rows[rock_creek][4] = "08/03/26 (Scout): low but flowing\n" + self.rows[rock_creek][4]
+        dropped = self.rows.pop(self.row("PCTAID_656"))
+        self.rows.append(["", "1499.9", "PCTAID_9999", "New spring", "08/03/26 (Scout): new"])
+        result = self.history.ingest(self.write(self.rows), sheet="Northern California")
+        self.assertEqual((result.added, result.changed, result.removed, result.observations), (1, 1, 1, 2))
+        self.assertEqual(result.unchanged, 322)
+
+        sources = self.history.sources_between(1420.0, 1500.0, since="2026-08-03")
+        self.assertEqual([s["waypoint"] for s in sources], ["PCTAID_655", "PCTAID_9999"])
+        self.assertEqual(sources[0]["observations"][0], {"observedOn": "2026-08-03", "observer": "Scout",
+                                                         "note": "low but flowing"})
+        everything = self.history.sources_between(0, 5000)
+        self.assertNotIn("PCTAID_656", [s["waypoint"] for s in everything])
+        kept = self.history.sources_between(0, 5000, include_removed=True)
+        self.assertIn("PCTAID_656", [s["waypoint"] for s in kept])
+
+        # The row comes back; its history was never lost.
+        self.rows.append(dropped)
+        result = self.history.ingest(self.write(self.rows), sheet="Northern California")
+        self.assertEqual((result.added, result.changed, result.removed, result.observations), (1, 0, 0, 0))
+
+    def test_history_outlives_the_sheet(self):
+        burney = self.row("PCTAID_648")
+        self.rows[burney][4] = "08/03/26 (Scout): spigot off"
+        self.history.ingest(self.write(self.rows), sheet="Northern California")
+        source = self.history.sources_between(1420.6, 1420.7)[0]
+        self.assertEqual(source["observations"][0]["note"], "spigot off")
+        self.assertIn("2021-08-08", [o["observedOn"] for o in source["observations"]])
+
+    def test_renaming_an_id_less_row_keeps_its_history(self):
+        strider = next(i for i, row in enumerate(self.rows) if row[3].strip().startswith("Strider Creek"))
+        self.assertEqual(self.rows[strider][2].split(), [])
+        mile = float(self.rows[strider][1])
+        before = self.history.sources_between(mile, mile)[0]
+        self.rows[strider][3] = "Strider Creek (north fork)"
+        result = self.history.ingest(self.write(self.rows), sheet="Northern California")
+        self.assertEqual((result.added, result.changed, result.removed, result.observations), (0, 1, 0, 0))
+        after = self.history.sources_between(mile, mile)[0]
+        self.assertEqual(after["name"], "Strider Creek (north fork)")
+        self.assertEqual(after["observations"], before["observations"])
+
+    def test_rows_sharing_a_mile_keep_their_own_histories(self):
+        twins = [i for i, row in enumerate(self.rows) if row[1] == "1208.4" and not row[2].split()]
+        self.assertEqual(len(twins), 2)
+        before = {s["name"]: s["observations"] for s in self.history.sources_between(1208.4, 1208.4)}
+        old_name = row_location(self.rows[twins[1]])
+        self.rows[twins[1]][3] = old_name + " (lower)"
+        self.rows.insert(twins[0], ["", "1208.4", "", "New seep", "08/03/26 (Scout): dripping"])
+        result = self.history.ingest(self.write(self.rows), sheet="Northern California")
+        self.assertEqual((result.added, result.changed, result.removed, result.observations), (1, 1, 0, 1))
+        after = {s["name"]: s["observations"] for s in self.history.sources_between(1208.4, 1208.4)}
+        self.assertEqual(len(after), 3)
+        self.assertEqual(after[old_name + " (lower)"], before[old_name])
+
+    def test_row_gaining_an_id_is_rekeyed(self):
+        lost = self.row_without_id()
+        mile = float(self.rows[lost][1])
+        before = self.history.sources_between(mile, mile)[0]
+        self.rows[lost][2] = "WA9999"
+        result = self.history.ingest(self.write(self.rows), sheet="Northern California")
+        self.assertEqual((result.added, result.changed, result.removed, result.observations), (0, 1, 0, 0))
+        after = self.history.sources_between(mile, mile)[0]
+        self.assertEqual(after["waypoint"], "WA9999")
+        self.assertEqual(after["observations"], before["observations"])
+
+    def row_without_id(self):
+        return next(i for i, row in enumerate(self.rows[8:], 8)
+                    if len(row) > 4 and not row[2].split() and "/" in row[4])
+
+    def test_range_query_is_mile_ordered(self):
+        sources = self.history.sources_between(1420.6, 1472.5, since="2026-06-01")
+        miles = [s["pctMile"] for s in sources]
+        self.assertEqual(miles, sorted(miles))
+        self.assertTrue(all(1420.6 <= mile <= 1472.5 for mile in miles))
+        self.assertTrue(all(o["observedOn"] >= "2026-06-01" for s in sources for o in s["observations"]))
+        self.assertEqual(len(sources), 27)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,350 @@
+"""Batched asyncio client for the USGS Elevation Point Query Service (EPQS).
+
+Lookups go through three layers:
+
+* an on-disk SQLite cache keyed by dataset and lat/lon rounded to
+  ``precision`` decimals (5 decimals is about 1 m), with a TTL and a row cap;
+* a token bucket that caps the request rate, plus a semaphore that caps the
+  number of requests in flight;
+* a keep-alive HTTP/1.1 connection pool with per-request timeouts and
+  exponential backoff with full jitter on timeouts, 429 and 5xx responses.
+
+Only the standard library is needed, so the client runs wherever NumPy does.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sqlite3
+import ssl
+import time
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EPQS_URL = "https://epqs.nationalmap.gov/v1/json"
+DEFAULT_DATASET = "epqs-3dep"
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / ".route-build" / "usgs_elevation.sqlite"
+NO_DATA = -1_000_000.0  # EPQS sentinel for points outside coverage
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+CacheKey = Tuple[int, int]
+
+
+class ElevationCache:
+    """SQLite cache of elevations in feet keyed by ``(dataset, lat, lon)``."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        ttl_seconds: float = 90 * 24 * 3600,
+        max_entries: int = 500_000,
+        precision: int = 5,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.precision = precision
+        self.scale = 10 ** precision
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS elevation (
+                dataset TEXT NOT NULL,
+                lat_key INTEGER NOT NULL,
+                lon_key INTEGER NOT NULL,
+                feet REAL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (dataset, lat_key, lon_key)
+            ) WITHOUT ROWID"""
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS elevation_age ON elevation (fetched_at)")
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "ElevationCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def key(self, lat: float, lon: float) -> CacheKey:
+        return int(round(lat * self.scale)), int(round(lon * self.scale))
+
+    def coordinate(self, key: CacheKey) -> Tuple[float, float]:
+        """Return the rounded ``(lat, lon)`` that a key stands for."""
+        return key[0] / self.scale, key[1] / self.scale
+
+    def get_many(self, dataset: str, keys: Iterable[CacheKey], now: Optional[float] = None) -> Dict[CacheKey, float]:
+        """Return cached feet (NaN for cached no-data points) for unexpired keys."""
+        cutoff = (time.time() if now is None else now) - self.ttl_seconds
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (lat_key INTEGER, lon_key INTEGER)")
+        self.db.execute("DELETE FROM wanted")
+        self.db.executemany("INSERT INTO wanted VALUES (?, ?)", keys)
+        rows = self.db.execute(
+            """SELECT e.lat_key, e.lon_key, e.feet FROM elevation e
+               JOIN wanted w ON e.lat_key = w.lat_key AND e.lon_key = w.lon_key
+               WHERE e.dataset = ? AND e.fetched_at >= ?""",
+            (dataset, cutoff),
+        )
+        return {(lat_key, lon_key): np.nan if feet is None else feet for lat_key, lon_key, feet in rows}
+
+    def put_many(self, dataset: str, values: Dict[CacheKey, float], now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO elevation VALUES (?, ?, ?, ?, ?)",
+                (
+                    (dataset, lat_key, lon_key, None if np.isnan(feet) else float(feet), now)
+                    for (lat_key, lon_key), feet in values.items()
+                ),
+            )
+        self.evict(now)
+
+    def evict(self, now: Optional[float] = None) -> int:
+        """Drop expired rows, then the oldest rows beyond ``max_entries``."""
+        cutoff = (time.time() if now is None else now) - self.ttl_seconds
+        with self.db:
+            removed = self.db.execute("DELETE FROM elevation WHERE fetched_at < ?", (cutoff,)).rowcount
+            excess = len(self) - self.max_entries
+            if excess > 0:
+                removed += self.db.execute(
+                    """DELETE FROM elevation WHERE (dataset, lat_key, lon_key) IN (
+                        SELECT dataset, lat_key, lon_key FROM elevation ORDER BY fetched_at LIMIT ?
+                    )""",
+                    (excess,),
+                ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM elevation").fetchone()[0]
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self.tokens) / self.rate)
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, body: bytes) -> None:
+        super().__init__(f"HTTP {status}: {body[:120]!r}")
+        self.status = status
+
+
+class ConnectionPool:
+    """Minimal keep-alive HTTP/1.1 GET client over asyncio streams."""
+
+    def __init__(self, endpoint: str, size: int) -> None:
+        parts = urllib.parse.urlsplit(endpoint)
+        self.host = parts.hostname or "localhost"
+        self.secure = parts.scheme == "https"
+        self.port = parts.port or (443 if self.secure else 80)
+        self.path = parts.path or "/"
+        self.size = size
+        self.opened = 0
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._ssl = ssl.create_default_context() if self.secure else None
+
+    async def get(self, query: Dict[str, object]) -> Tuple[int, bytes]:
+        if self._idle:
+            reader, writer = self._idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self._ssl)
+            self.opened += 1
+        try:
+            target = f"{self.path}?{urllib.parse.urlencode(query)}"
+            writer.write(
+                f"GET {target} HTTP/1.1\r\nHost: {self.host}\r\nAccept: application/json\r\n"
+                f"Connection: keep-alive\r\n\r\n".encode("ascii")
+            )
+            await writer.drain()
+            status, headers = await _read_head(reader)
+            body = await _read_body(reader, headers)
+        except BaseException:
+            writer.close()
+            raise
+        if headers.get("connection", "").lower() == "close" or len(self._idle) >= self.size:
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+        return status, body
+
+    async def close(self) -> None:
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+
+async def _read_head(reader: asyncio.StreamReader) -> Tuple[int, Dict[str, str]]:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError("connection closed before response")
+    status = int(line.split()[1])
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            return status, headers
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+
+async def _read_body(reader: asyncio.StreamReader, headers: Dict[str, str]) -> bytes:
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await reader.readline()
+                return b"".join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if "content-length" in headers:
+        return await reader.readexactly(int(headers["content-length"]))
+    return await reader.read()
+
+
+@dataclass
+class ClientStats:
+    points: int = 0
+    unique: int = 0
+    cache_hits: int = 0
+    requests: int = 0
+    retries: int = 0
+    failures: int = 0
+    connections: int = 0
+    seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.unique if self.unique else 1.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.points:,} points ({self.unique:,} unique), {self.hit_rate:.1%} from cache, "
+            f"{self.requests:,} requests over {self.connections} connections, "
+            f"{self.retries} retries, {self.failures} failures in {self.seconds:.2f}s"
+        )
+
+
+class UsgsElevationClient:
+    """Look up ground elevations in feet for many points at once."""
+
+    def __init__(
+        self,
+        cache: ElevationCache,
+        endpoint: str = EPQS_URL,
+        dataset: str = DEFAULT_DATASET,
+        concurrency: int = 8,
+        rate: float = 10.0,
+        timeout: float = 10.0,
+        retries: int = 4,
+        backoff: float = 0.5,
+        max_backoff: float = 20.0,
+    ) -> None:
+        self.cache = cache
+        self.endpoint = endpoint
+        self.dataset = dataset
+        self.concurrency = concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = ClientStats()
+
+    def elevations(self, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        """Blocking wrapper around :meth:`fetch`."""
+        return asyncio.run(self.fetch(lats, lons))
+
+    async def fetch(self, lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+        """Return feet for each point; NaN where USGS has no data or every retry failed."""
+        started = time.perf_counter()
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keys = [self.cache.key(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+        unique = list(dict.fromkeys(keys))
+        values = self.cache.get_many(self.dataset, unique)
+        missing = [key for key in unique if key not in values]
+        self.stats.points += len(keys)
+        self.stats.unique += len(unique)
+        self.stats.cache_hits += len(unique) - len(missing)
+
+        if missing:
+            pool = ConnectionPool(self.endpoint, self.concurrency)
+            bucket = TokenBucket(self.rate)
+            limit = asyncio.Semaphore(self.concurrency)
+            try:
+                fetched = await asyncio.gather(*(self._fetch_one(pool, bucket, limit, key) for key in missing))
+            finally:
+                await pool.close()
+                self.stats.connections += pool.opened
+            found = {key: feet for key, feet in zip(missing, fetched) if feet is not None}
+            self.cache.put_many(self.dataset, found)
+            values.update(found)
+
+        self.stats.seconds += time.perf_counter() - started
+        return np.array([values.get(key, np.nan) for key in keys], dtype=np.float64)
+
+    async def _fetch_one(
+        self, pool: ConnectionPool, bucket: TokenBucket, limit: asyncio.Semaphore, key: CacheKey
+    ) -> Optional[float]:
+        """Return feet (NaN for no-data), or None when the point could not be fetched."""
+        lat, lon = self.cache.coordinate(key)
+        query = {"x": f"{lon:.{self.cache.precision}f}", "y": f"{lat:.{self.cache.precision}f}",
+                 "units": "Feet", "wkid": 4326}
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats.retries += 1
+                ceiling = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                await asyncio.sleep(random.uniform(0, ceiling))
+            async with limit:
+                await bucket.acquire()
+                self.stats.requests += 1
+                try:
+                    status, body = await asyncio.wait_for(pool.get(query), self.timeout)
+                except (asyncio.TimeoutError, OSError, ValueError, asyncio.IncompleteReadError):
+                    continue
+            if status in RETRY_STATUSES:
+                continue
+            try:
+                if status != 200:
+                    raise HttpError(status, body)
+                feet = float(json.loads(body)["value"])
+            except (HttpError, KeyError, TypeError, ValueError):
+                break
+            return np.nan if feet <= NO_DATA else feet
+        self.stats.failures += 1
+        return None
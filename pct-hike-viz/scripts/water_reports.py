@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""Incremental pctwater.com report ingestion into a SQLite history indexed by trail mile.
+
+Every data row of a report CSV is keyed by its waypoint ID (or, for the
+few rows without one, by its mile) and hashed. An ingest compares those
+hashes with what the store already holds for the sheet, and parses and
+writes only the rows that are new or changed. A row whose key changes
+while its mile stays put, say when it gains a waypoint ID, is re-keyed
+with its history rather than recorded as one source added and another
+removed.
+Unchanged rows cost one digest each. A file identical to the sheet's last
+snapshot is skipped before any row is hashed.
+
+A row's report cell holds dated entries, newest first, one per line::
+
+    06/22/26 (Lana): Great flow
+
+A line that does not start with a date continues the entry above it. Lines
+after a ``-----`` rule are standing notes about the source. Dated entries
+are added to the history and never deleted, so observations that pctwater
+drops after 12 months stay queryable. Rows gone from the sheet are marked
+removed rather than deleted.
+
+    python scripts/water_reports.py ingest                          # the checked-in NorCal sheet
+    python scripts/water_reports.py ingest reports/*.csv
+    python scripts/water_reports.py query 1420.6 1472.5 --since 2026-06-01
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import AbstractSet, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from parse_water_csv import CSV_PATH, iter_report_records
+import route_trace
+
+DEFAULT_STORE_PATH = Path(__file__).resolve().parents[1] / ".route-build" / "water_reports.sqlite"
+
+_ENTRY = re.compile(r"^(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\s*(?:\(([^)]*)\))?\s*:\s*(.*)$")
+_RULE = re.compile(r"^-{3,}$")
+_SHEET = re.compile(r"--\s*(.+?)\s*:")
+_UPDATED = re.compile(r"Updated\s+(\d{1,2})/(\d{1,2})/(\d{4})")
+
+
+@dataclass(frozen=True)
+class Observation:
+    observed_on: str
+    observer: str
+    note: str
+
+
+@dataclass(frozen=True)
+class SourceRow:
+    key: str
+    mile: float
+    waypoints: Tuple[str, ...]
+    location: str
+    reliability: Optional[str]
+    notes: str
+    observations: Tuple[Observation, ...]
+    digest: str
+
+
+@dataclass(frozen=True)
+class StoredSource:
+    """What the store remembers about a key, for matching rows that share one."""
+
+    digest: str
+    location: str
+
+
+@dataclass(frozen=True)
+class IngestResult:
+    sheet: str
+    rows: int
+    added: int
+    changed: int
+    removed: int
+    unchanged: int
+    observations: int
+    skipped: bool = False
+
+    def summary(self) -> str:
+        if self.skipped:
+            return f"{self.sheet}: unchanged since the last snapshot ({self.rows} rows)"
+        return (
+            f"{self.sheet}: {self.rows} rows, {self.added} added, {self.changed} changed, "
+            f"{self.removed} removed, {self.unchanged} unchanged, {self.observations} new observations"
+        )
+
+
+def _entry_date(month: str, day: str, year: str) -> Optional[str]:
+    try:
+        return date(int(year) + (2000 if len(year) == 2 else 0), int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def parse_report(text: str) -> Tuple[Tuple[Observation, ...], str]:
+    """Split a report cell into dated observations and the undated notes around them."""
+    entries: List[List[str]] = []
+    notes: List[str] = []
+    after_rule = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if _RULE.match(line):
+            after_rule = True
+            continue
+        match = None if after_rule else _ENTRY.match(line)
+        observed_on = match and _entry_date(*match.group(1, 2, 3))
+        if observed_on:
+            entries.append([observed_on, (match.group(4) or "").strip(), match.group(5).strip()])
+        elif entries and not after_rule:
+            entries[-1][2] = f"{entries[-1][2]} {line}".strip()
+        else:
+            notes.append(line)
+    unique = dict.fromkeys(Observation(*entry) for entry in entries)
+    return tuple(unique), "\n".join(notes)
+
+
+def row_digest(row: List[str]) -> str:
+    return hashlib.blake2b("\x1f".join(cell.strip() for cell in row).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_location(row: List[str]) -> str:
+    return " ".join(row[3].split()).lstrip("*").strip()
+
+
+def parse_row(key: str, row: List[str], digest: str) -> SourceRow:
+    location = " ".join(row[3].split())
+    stars = len(location) - len(location.lstrip("*"))
+    reliability = {1: "reliable", 2: "year-round"}.get(min(stars, 2))
+    observations, notes = parse_report(row[4] if len(row) > 4 else "")
+    return SourceRow(key, float(row[1]), tuple(row[2].split()), row_location(row), reliability, notes,
+                     observations, digest)
+
+
+def row_key(row: List[str]) -> str:
+    """The PCTA waypoint ID, else the Halfmile ID, else ``@`` and the mile.
+
+    The location is left out so that renaming a source keeps its key.
+    """
+    waypoints = row[2].split()
+    for waypoint in waypoints:
+        if waypoint.startswith("PCTAID_"):
+            return waypoint
+    if waypoints:
+        return waypoints[0]
+    return f"@{float(row[1]):.1f}"
+
+
+def _suffix(key: str) -> int:
+    return int(key.rpartition("#")[2]) if "#" in key else 1
+
+
+def keyed_rows(
+    records: Iterable[List[str]],
+    known: Optional[Dict[str, StoredSource]] = None,
+    observations: Optional[Callable[[str], AbstractSet[Observation]]] = None,
+) -> List[Tuple[str, List[str]]]:
+    """``(key, row)`` for every data row; rows sharing a key get ``#2``, ``#3``... suffixes.
+
+    Rows that share a key take back the stored key (from ``known``) with the
+    same digest, else the same location, else an observation in common, and
+    only then the rest in sheet order. Inserting or renaming one of them
+    therefore does not move the others' histories. Without ``known``,
+    suffixes follow sheet order. ``observations(key)`` returns a stored
+    key's history; it is called at most once per key, and only for keys
+    the first two tiers left unmatched.
+    """
+    rows = []
+    for row in records:
+        if len(row) < 4:
+            continue
+        try:
+            float(row[1])
+        except ValueError:
+            continue
+        rows.append(row)
+    known = known or {}
+    groups: Dict[str, List[int]] = {}
+    for index, row in enumerate(rows):
+        groups.setdefault(row_key(row), []).append(index)
+    loaded: Dict[str, AbstractSet[Observation]] = {}
+
+    def shares_observation(key: str, row: List[str]) -> bool:
+        if observations is None:
+            return False
+        if key not in loaded:
+            loaded[key] = observations(key)
+        return bool(loaded[key]) and not loaded[key].isdisjoint(parse_report(row[4] if len(row) > 4 else "")[0])
+
+    tiers = (
+        lambda key, row: known[key].digest == row_digest(row),
+        lambda key, row: known[key].location == row_location(row),
+        shares_observation,
+    )
+    stored: Dict[str, List[str]] = {}
+    for key in known:
+        stored.setdefault(key.partition("#")[0], []).append(key)
+    keys: List[str] = [""] * len(rows)
+    for base, members in groups.items():
+        free = sorted(stored.get(base, ()), key=_suffix)
+        used = {_suffix(key) for key in free}
+        pending = list(members)
+        # One row and at most one stored key (nearly every group) needs no matching.
+        for same in tiers if len(members) > 1 or len(free) > 1 else ():
+            for index in list(pending):
+                match = next((key for key in free if same(key, rows[index])), None)
+                if match is not None:
+                    keys[index] = match
+                    free.remove(match)
+                    pending.remove(index)
+        for index in pending:
+            if free:
+                keys[index] = free.pop(0)
+                continue
+            number = next(n for n in range(1, len(used) + 2) if n not in used)
+            used.add(number)
+            keys[index] = base if number == 1 else f"{base}#{number}"
+    return list(zip(keys, rows))
+
+
+def sheet_name(preamble: List[List[str]], fallback: str) -> str:
+    """``Northern California`` from a ``Pacific Crest Trail Water Report -- Northern California : ...`` title."""
+    if preamble and preamble[0]:
+        match = _SHEET.search(preamble[0][0])
+        if match:
+            return match.group(1)
+    return fallback
+
+
+def sheet_updated(preamble: List[List[str]]) -> Optional[str]:
+    for cell in (preamble[0] if preamble else []):
+        match = _UPDATED.search(cell)
+        if match:
+            return _entry_date(match.group(1), match.group(2), match.group(3))
+    return None
+
+
+class WaterHistory:
+    """SQLite store of water sources and every dated observation ever ingested."""
+
+    def __init__(self, path: Path = DEFAULT_STORE_PATH) -> None:
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(
+            """CREATE TABLE IF NOT EXISTS sources (
+                sheet TEXT NOT NULL,
+                key TEXT NOT NULL,
+                mile REAL NOT NULL,
+                waypoints TEXT NOT NULL,
+                location TEXT NOT NULL,
+                reliability TEXT,
+                notes TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                first_seen TEXT NOT NULL,
+                changed_at TEXT NOT NULL,
+                removed_at TEXT,
+                PRIMARY KEY (sheet, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sources_mile ON sources (mile);
+            CREATE TABLE IF NOT EXISTS observations (
+                sheet TEXT NOT NULL,
+                key TEXT NOT NULL,
+                observed_on TEXT NOT NULL,
+                observer TEXT NOT NULL,
+                note TEXT NOT NULL,
+                mile REAL NOT NULL,
+                first_seen TEXT NOT NULL,
+                PRIMARY KEY (sheet, key, observed_on, observer, note)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS observations_mile ON observations (mile, observed_on);
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                sheet TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                updated TEXT,
+                ingested_at TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                added INTEGER NOT NULL,
+                changed INTEGER NOT NULL,
+                removed INTEGER NOT NULL,
+                observations INTEGER NOT NULL
+            );"""
+        )
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "WaterHistory":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def ingest(self, csv_path: Path, sheet: Optional[str] = None, now: Optional[datetime] = None) -> IngestResult:
+        """Apply one report CSV to the store, touching only rows whose digest changed."""
+        raw = Path(csv_path).read_bytes()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        stamp = (now or datetime.now(timezone.utc)).isoformat(timespec="seconds")
+        preamble: List[List[str]] = []
+        records = iter_report_records(raw.decode("utf-8").splitlines(keepends=True), preamble)
+        first = next(records, None)
+        sheet = sheet or sheet_name(preamble, Path(csv_path).stem)
+        last = self.db.execute(
+            "SELECT sha256, rows FROM snapshots WHERE sheet = ? ORDER BY id DESC LIMIT 1", (sheet,)
+        ).fetchone()
+        if last is not None and last[0] == sha256:
+            return IngestResult(sheet, last[1], 0, 0, 0, last[1], 0, skipped=True)
+
+        stored = self.db.execute(
+            "SELECT key, digest, removed_at, mile, location FROM sources WHERE sheet = ?", (sheet,)
+        ).fetchall()
+        known = {key: (digest, removed_at, mile) for key, digest, removed_at, mile, _ in stored}
+
+        def observations(key: str) -> Set[Observation]:
+            return {Observation(*entry) for entry in self.db.execute(
+                "SELECT observed_on, observer, note FROM observations WHERE sheet = ? AND key = ?", (sheet, key)
+            )}
+
+        rows = keyed_rows(
+            ([first] if first is not None else []) + list(records),
+            {key: StoredSource(digest, location) for key, digest, _, _, location in stored},
+            observations,
+        )
+        current = {key for key, _ in rows}
+        # Live keys missing from this sheet, by mile: a new key at one of these miles is the same source re-keyed.
+        vacated: Dict[float, List[str]] = {}
+        for key, (_, removed_at, mile) in known.items():
+            if key not in current and removed_at is None:
+                vacated.setdefault(mile, []).append(key)
+        seen = set()
+        added = changed = new_observations = 0
+        with self.db:
+            for key, row in rows:
+                seen.add(key)
+                digest = row_digest(row)
+                previous = known.get(key)
+                if previous is None and vacated.get(float(row[1])):
+                    old_key = vacated[float(row[1])].pop(0)
+                    self._rekey(sheet, old_key, key)
+                    previous = known.pop(old_key)
+                if previous is not None and previous[:2] == (digest, None):
+                    continue
+                source = parse_row(key, row, digest)
+                if previous is None:
+                    added += 1
+                    self.db.execute(
+                        "INSERT INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                        (sheet, key, source.mile, " ".join(source.waypoints), source.location, source.reliability,
+                         source.notes, digest, stamp, stamp),
+                    )
+                else:
+                    changed += previous[1] is None
+                    added += previous[1] is not None
+                    self.db.execute(
+                        """UPDATE sources SET mile = ?, waypoints = ?, location = ?, reliability = ?, notes = ?,
+                           digest = ?, changed_at = ?, removed_at = NULL WHERE sheet = ? AND key = ?""",
+                        (source.mile, " ".join(source.waypoints), source.location, source.reliability, source.notes,
+                         digest, stamp, sheet, key),
+                    )
+                    self.db.execute("UPDATE observations SET mile = ? WHERE sheet = ? AND key = ?",
+                                    (source.mile, sheet, key))
+                before = self.db.total_changes
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO observations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((sheet, key, o.observed_on, o.observer, o.note, source.mile, stamp) for o in source.observations),
+                )
+                new_observations += self.db.total_changes - before
+
+            gone = [key for key, (_, removed_at, _) in known.items() if key not in seen and removed_at is None]
+            self.db.executemany(
+                "UPDATE sources SET removed_at = ? WHERE sheet = ? AND key = ?", ((stamp, sheet, key) for key in gone)
+            )
+            self.db.execute(
+                "INSERT INTO snapshots (sheet, sha256, updated, ingested_at, rows, added, changed, removed, observations)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (sheet, sha256, sheet_updated(preamble), stamp, len(seen), added, changed, len(gone), new_observations),
+            )
+        return IngestResult(sheet, len(seen), added, changed, len(gone), len(seen) - added - changed, new_observations)
+
+    def _rekey(self, sheet: str, old: str, new: str) -> None:
+        for table in ("sources", "observations"):
+            self.db.execute(f"UPDATE {table} SET key = ? WHERE sheet = ? AND key = ?", (new, sheet, old))
+
+    def sources_between(self, start_mile: float, end_mile: float, since: Optional[str] = None,
+                        include_removed: bool = False) -> List[dict]:
+        """Sources between two trail miles, each with its observations on or after ``since``, newest first.
+
+        With ``since``, only sources reported on or after that ISO date are
+        returned. Both lookups are range scans of a mile index.
+        """
+        removed = "" if include_removed else "AND s.removed_at IS NULL"
+        if since is None:
+            rows = self.db.execute(
+                f"""SELECT s.sheet, s.key, s.mile, s.location, s.reliability, s.waypoints,
+                           o.observed_on, o.observer, o.note
+                    FROM sources s LEFT JOIN observations o ON o.sheet = s.sheet AND o.key = s.key
+                    WHERE s.mile BETWEEN ? AND ? {removed}
+                    ORDER BY s.mile, s.sheet, s.key, o.observed_on DESC""",
+                (start_mile, end_mile),
+            )
+        else:
+            rows = self.db.execute(
+                f"""SELECT s.sheet, s.key, s.mile, s.location, s.reliability, s.waypoints,
+                           o.observed_on, o.observer, o.note
+                    FROM observations o JOIN sources s ON s.sheet = o.sheet AND s.key = o.key
+                    WHERE o.mile BETWEEN ? AND ? AND o.observed_on >= ? {removed}
+                    ORDER BY s.mile, s.sheet, s.key, o.observed_on DESC""",
+                (start_mile, end_mile, since),
+            )
+        sources: Dict[Tuple[str, str], dict] = {}
+        for sheet, key, mile, location, reliability, waypoints, observed_on, observer, note in rows:
+            source = sources.get((sheet, key))
+            if source is None:
+                source = sources[(sheet, key)] = {
+                    "sheet": sheet,
+                    "waypoint": key,
+                    "waypoints": waypoints.split(),
+                    "pctMile": mile,
+                    "name": location,
+                    "reliability": reliability,
+                    "observations": [],
+                }
+            if observed_on is not None:
+                source["observations"].append({"observedOn": observed_on, "observer": observer, "note": note})
+        return list(sources.values())
+
+    def snapshots(self, sheet: Optional[str] = None) -> List[dict]:
+        rows = self.db.execute(
+            "SELECT sheet, updated, ingested_at, rows, added, changed, removed, observations FROM snapshots"
+            + (" WHERE sheet = ?" if sheet else "") + " ORDER BY id",
+            (sheet,) if sheet else (),
+        )
+        columns = ("sheet", "updated", "ingestedAt", "rows", "added", "changed", "removed", "observations")
+        return [dict(zip(columns, row)) for row in rows]
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest pctwater.com reports into a mile-indexed history.")
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE_PATH, help="SQLite history file")
+    # Also accepted after the subcommand, as in ``hike_cli.py water ... --store PATH``.
+    store = argparse.ArgumentParser(add_help=False)
+    store.add_argument("--store", type=Path, default=argparse.SUPPRESS, help="SQLite history file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", parents=[store], help="apply report CSVs, touching only changed rows")
+    ingest.add_argument("csv", type=Path, nargs="*", default=[CSV_PATH])
+    ingest.add_argument("--sheet", help="sheet name (default: taken from the report title)")
+    query = commands.add_parser("query", parents=[store], help="sources between two miles, optionally reported since a date")
+    query.add_argument("start", type=float)
+    query.add_argument("end", type=float)
+    query.add_argument("--since", help="ISO date, e.g. 2026-06-01")
+    query.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    route_trace.configure(args)
+
+    with WaterHistory(args.store) as history:
+        if args.command == "ingest":
+            for path in args.csv:
+                with route_trace.span("water_ingest", path=str(path)) as span:
+                    result = history.ingest(path, args.sheet)
+                    span.count("rows", result.rows)
+                    span.count("changed", result.added + result.changed + result.removed)
+                print(result.summary())
+            return
+
+        started = time.perf_counter()
+        sources = history.sources_between(args.start, args.end, args.since)
+        elapsed = time.perf_counter() - started
+        if args.json:
+            print(json.dumps(sources, indent=2))
+            return
+        for source in sources:
+            latest = source["observations"][0] if source["observations"] else None
+            report = f"{latest['observedOn']} ({latest['observer']}): {latest['note'][:70]}" if latest else "no reports"
+            print(f"{source['pctMile']:8.1f}  {source['name'][:36]:<36}  {report}")
+        print(f"{len(sources)} sources in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,107 @@
-import json
-import xml.etree.ElementTree as ET
-import os
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "scripts"))
+
+from geodesy import FEET_PER_METER  # noqa: E402
+from dem_sampler import DemSampler  # noqa: E402
+from fit_decoder import decode_fit  # noqa: E402
+from gpx_stream import read_gpx  # noqa: E402
+import artifact_writer  # noqa: E402
+import route_trace  # noqa: E402
 
 # Paths
-GPX_PATH = "../COURSE_334289912.gpx"
-JSON_SRC_PATH = "src/hike_data.json"
-JSON_PUBLIC_PATH = "public/data/hike_data.json"
+JSON_PUBLIC_PATH = artifact_writer.HIKE_DATA_PATH
+
+def points_to_path(coords):
+    """Convert ``[lon, lat, ele_m]`` rows to route.path lists in feet.
+
+    Rows without an elevation keep the historical ``[lon, lat]`` shape.
+    """
+    ele_ft = np.round(coords[:, 2] * FEET_PER_METER, 1)
+    has_ele = ~np.isnan(ele_ft)
+    lonlat = coords[:, :2].tolist()
+    return [
+        [lon, lat, ele] if present else [lon, lat]
+        for (lon, lat), ele, present in zip(lonlat, ele_ft.tolist(), has_ele.tolist())
+    ]
+
+def read_gpx_coords(gpx_path):
+    """Read every ``<trkseg>`` and ``<rte>`` point as ``[lon, lat, ele_m]`` rows.
+
+    Blocks are read in document order through the streaming reader, so memory
+    stays flat however large the file is.
+    """
+    with route_trace.span("gpx_parse", path=str(gpx_path)) as span:
+        gpx, stats = read_gpx(gpx_path)
+        span.count("points", stats.points)
+        span.count("bytes_read", stats.bytes_read)
+    print(f"Read {stats.summary()} across {len(gpx.parts)} track/route block(s).")
+    return gpx.coords
+
+def read_fit_coords(fit_path):
+    """Decode a Garmin FIT course into ``[lon, lat, ele_m]`` rows."""
+    with route_trace.span("fit_decode", path=str(fit_path)) as span:
+        course, stats = decode_fit(fit_path)
+        span.count("points", stats.points)
+        span.count("bytes_read", stats.bytes_read)
+    print(f"Decoded {stats.summary()} from course {course.name!r}.")
+    return course.coords
+
+def read_track_coords(path):
+    """Dispatch to the GPX or FIT reader based on the file extension."""
+    if Path(path).suffix.lower() == ".fit":
+        return read_fit_coords(path)
+    return read_gpx_coords(path)
+
+def apply_dem(coords, tiles):
+    """Replace track elevations with DEM samples wherever the tiles cover a point."""
+    with route_trace.span("dem_sample") as span:
+        sampler = DemSampler.from_paths(tiles)
+        dem_m = sampler.sample(coords[:, 0], coords[:, 1])
+        span.count("points", len(coords))
+        span.count("tile_loads", sampler.loads)
+    covered = ~np.isnan(dem_m)
+    coords = coords.copy()
+    coords[covered, 2] = dem_m[covered]
+    print(f"Sampled {int(covered.sum())} of {len(coords)} elevations from {len(sampler.sources)} DEM tile(s).")
+    return coords
 
 def parse_gpx(gpx_path):
     """Parse GPX file and extract lat/lon/elevation points."""
-    tree = ET.parse(gpx_path)
-    root = tree.getroot()
-    ns = {'gpx': 'http://www.topografix.com/GPX/1/1'}
-    
-    points = []
-    for trkpt in root.findall('.//gpx:trkpt', ns):
-        lat_str = trkpt.get('lat')
-        lon_str = trkpt.get('lon')
-        # Skip points missing coordinates
-        if lat_str is None or lon_str is None:
-            continue
-        lat = float(lat_str)
-        lon = float(lon_str)
-        ele_elem = trkpt.find('gpx:ele', ns)
-        if ele_elem is not None and ele_elem.text is not None:
-            ele = float(ele_elem.text)
-            # Convert meters to feet
-            ele_ft = ele * 3.28084
-            points.append([lon, lat, round(ele_ft, 1)])
-        else:
-            points.append([lon, lat])
-    return points
-
-def update_json(json_path, new_path_data):
-    with open(json_path, 'r') as f:
-        data = json.load(f)
+    return points_to_path(read_gpx_coords(gpx_path))
+
+def parse_track(path):
+    """Parse a GPX or FIT file into route.path lists."""
+    return points_to_path(read_track_coords(path))
+
+def protected_reason(route):
+    """Why ``route.path`` must not be replaced by a raw track, or None.
+
+    The active path is the PCTA centerline with a routeMile column; GPS tracks
+    are comparison evidence and carry no route miles.
+    """
+    geometry_source = route.get('metadata', {}).get('geometry_source', '')
+    if geometry_source.startswith('PCTA'):
+        return f"route.path comes from the {geometry_source.split(',')[0]}"
+    if any(len(row) > 3 for row in route.get('path', [])):
+        return "route.path rows carry a routeMile column the track would drop"
+    return None
+
+def update_json(json_path, new_path_data, mirrors=(), force=False):
+    """Replace route.path in ``json_path`` and republish it, with ``mirrors``, in one pass.
+
+    Raises ``ValueError`` instead of overwriting a protected path (see
+    :func:`protected_reason`) unless ``force`` is set.
+    """
+    data = route_trace.load_json(json_path)
+    reason = None if force else protected_reason(data.get('route', {}))
+    if reason:
+        raise ValueError(f"{reason}; pass --force to replace it anyway")
     
     # Update the route path
     if 'route' in data:
@@ -48,19 +115,31 @@ def update_json(json_path, new_path_data):
             data['route']['properties']['min_elevation'] = min(eles)
             data['route']['properties']['max_elevation'] = max(eles)
             
-    with open(json_path, 'w') as f:
-        json.dump(data, f, indent=2)
+    return artifact_writer.publish_json(json_path, data, mirrors)
 
-def main():
-    print("Parsing GPX...")
-    points = parse_gpx(GPX_PATH)
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="Replace route.path with a GPX or FIT track.")
+    parser.add_argument("source", help="GPX or FIT file to ingest")
+    parser.add_argument("--dem", nargs="+", metavar="TILE", help="take elevations from local DEM tiles or directories")
+    parser.add_argument("--force", action="store_true",
+                        help="replace route.path even if it is the PCTA centerline or carries routeMile")
+    route_trace.add_trace_arguments(parser)
+    args = parser.parse_args(argv)
+    route_trace.configure(args)
+
+    print(f"Parsing {args.source}...")
+    coords = read_track_coords(args.source)
+    if args.dem:
+        coords = apply_dem(coords, args.dem)
+    points = points_to_path(coords)
     print(f"Found {len(points)} points with elevation.")
     
-    print("Updating src/hike_data.json...")
-    update_json(JSON_SRC_PATH, points)
-    
-    print("Updating public/data/hike_data.json...")
-    update_json(JSON_PUBLIC_PATH, points)
+    print("Updating public/data/hike_data.json and its mirrors...")
+    try:
+        result = update_json(JSON_PUBLIC_PATH, points, artifact_writer.HIKE_DATA_MIRRORS, force=args.force)
+    except ValueError as error:
+        parser.error(str(error))
+    print(artifact_writer.describe(result))
     
     print("Done.")
 
@@ -1,10 +1,30 @@
 #!/usr/bin/env python3
-"""Validate GPS elevations against USGS National Map Elevation API."""
+"""Validate GPS elevations against USGS National Map Elevation API.
 
-import urllib.request
-import json
-import time
-import concurrent.futures
+Every route vertex is checked, not just the camps. Lookups are batched through
+an async, rate-limited client backed by an on-disk SQLite cache, so repeat
+runs make almost no network requests.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT / "pct-hike-viz" / "scripts"))
+
+import route_data  # noqa: E402
+from usgs_elevation import (  # noqa: E402
+    DEFAULT_CACHE_PATH,
+    EPQS_URL,
+    ElevationCache,
+    UsgsElevationClient,
+)
+
+HIKE_DATA_PATH = REPO_ROOT / "pct-hike-viz" / "public" / "data" / "hike_data.json"
 
 waypoints = [
     ("Burney Falls Trailhead", 41.013480, -121.620709, "3,020 ft"),
@@ -14,37 +34,81 @@ waypoints = [
     ("Indian Springs Camp", 41.173417, -121.897491, "5,605 ft"),
 ]
 
-def process_waypoint(waypoint):
-    name, lat, lon, gps_elev = waypoint
-    url = f"https://epqs.nationalmap.gov/v1/json?x={lon}&y={lat}&units=Feet&wkid=4326"
-    try:
-        with urllib.request.urlopen(url) as response:
-            data = json.loads(response.read())
-            usgs_elev = round(float(data['value']))
-            gps_feet = int(gps_elev.replace(',', '').replace(' ft', ''))
-            diff = gps_feet - usgs_elev
-            pct_error = abs(diff / usgs_elev * 100)
-            
-            # Color code based on error
-            status = "✓" if pct_error < 3.0 else "⚠" if pct_error < 5.0 else "✗"
-            
-            return f"{name:<25} {gps_feet:>6}ft  {usgs_elev:>6}ft  {diff:>+5}ft  {pct_error:>4.1f}% {status}"
-    except Exception as e:
-        return f"{name:<25} {gps_elev:<10} ERROR: {e}"
-
-print("=" * 75)
-print("GPS ELEVATION VALIDATION vs. USGS NATIONAL MAP")
-print("=" * 75)
-print(f"\n{'Location':<25} {'GPS':<10} {'USGS':<10} {'Diff':<8} {'%Err':<6}")
-print("-" * 75)
-
-# Use ThreadPoolExecutor to make requests concurrently
-with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-    # Map preserves the order of results
-    results = executor.map(process_waypoint, waypoints)
-    for result in results:
-        print(result)
-
-print("-" * 75)
-print("\n✓ = <3% error (excellent)  |  ⚠ = 3-5% error (good)  |  ✗ = >5% error (check)")
-print("=" * 75)
+
+def status_for(pct_error):
+    return "✓" if pct_error < 3.0 else "⚠" if pct_error < 5.0 else "✗"
+
+
+def format_waypoint(waypoint, usgs_feet):
+    name, _, _, gps_elev = waypoint
+    if np.isnan(usgs_feet):
+        return f"{name:<25} {gps_elev:<10} ERROR: no USGS elevation"
+    usgs_elev = round(float(usgs_feet))
+    gps_feet = int(gps_elev.replace(',', '').replace(' ft', ''))
+    diff = gps_feet - usgs_elev
+    pct_error = abs(diff / usgs_elev * 100)
+    return f"{name:<25} {gps_feet:>6}ft  {usgs_elev:>6}ft  {diff:>+5}ft  {pct_error:>4.1f}% {status_for(pct_error)}"
+
+
+def summarize_route(gps_feet, usgs_feet):
+    valid = ~(np.isnan(gps_feet) | np.isnan(usgs_feet))
+    diff = gps_feet[valid] - usgs_feet[valid]
+    pct_error = np.abs(diff / usgs_feet[valid] * 100)
+    lines = [f"Vertices compared: {int(valid.sum()):,} of {gps_feet.size:,}"]
+    if diff.size:
+        lines += [
+            f"Mean diff: {diff.mean():+.1f}ft   Mean |diff|: {np.abs(diff).mean():.1f}ft   "
+            f"P95 |diff|: {np.percentile(np.abs(diff), 95):.1f}ft   Max |diff|: {np.abs(diff).max():.1f}ft",
+            f"✓ {int((pct_error < 3.0).sum()):,}   ⚠ {int(((pct_error >= 3.0) & (pct_error < 5.0)).sum()):,}   "
+            f"✗ {int((pct_error >= 5.0).sum()):,}",
+        ]
+    return lines
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hike-data", type=Path, default=HIKE_DATA_PATH)
+    parser.add_argument("--endpoint", default=EPQS_URL, help="EPQS-compatible endpoint (e.g. a local stub)")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE_PATH)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=10.0, help="requests per second")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--camps-only", action="store_true", help="skip the per-vertex route check")
+    args = parser.parse_args(argv)
+
+    route = None if args.camps_only else route_data.route_columns(args.hike_data)
+    lats = [lat for _, lat, _, _ in waypoints]
+    lons = [lon for _, _, lon, _ in waypoints]
+    if route is not None:
+        lats = np.concatenate((lats, route.lat))
+        lons = np.concatenate((lons, route.lon))
+
+    with ElevationCache(args.cache) as cache:
+        client = UsgsElevationClient(
+            cache, endpoint=args.endpoint, concurrency=args.concurrency, rate=args.rate, timeout=args.timeout
+        )
+        usgs_feet = client.elevations(lats, lons)
+
+    print("=" * 75)
+    print("GPS ELEVATION VALIDATION vs. USGS NATIONAL MAP")
+    print("=" * 75)
+    print(f"\n{'Location':<25} {'GPS':<10} {'USGS':<10} {'Diff':<8} {'%Err':<6}")
+    print("-" * 75)
+    for waypoint, feet in zip(waypoints, usgs_feet):
+        print(format_waypoint(waypoint, feet))
+    print("-" * 75)
+
+    if route is not None:
+        print("\nROUTE VERTICES")
+        print("-" * 75)
+        for line in summarize_route(np.asarray(route.ele_ft), usgs_feet[len(waypoints):]):
+            print(line)
+        print("-" * 75)
+
+    print("\n✓ = <3% error (excellent)  |  ⚠ = 3-5% error (good)  |  ✗ = >5% error (check)")
+    print(f"USGS lookups: {client.stats.summary()}")
+    print("=" * 75)
+
+
+if __name__ == "__main__":
+    main()